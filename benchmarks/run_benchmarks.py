@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Time and memory-profile each stage of converting synthetic trajectories
+(parse, filter, pack, serialize, write) across a sweep of sizes,
+and write the results as JSON
+
+    python benchmarks/run_benchmarks.py --scales 1 2 4 --output results.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+import simulariumio
+from simulariumio import AgentData, TrajectoryConverter
+from simulariumio.filters import CropFilter
+from simulariumio.serializers import (
+    FrameSerializer,
+    JsonFrameSerializer,
+    NumpyFrameSerializer,
+    OrjsonFrameSerializer,
+)
+
+from synthetic_data import FILE_CASES, IN_MEMORY_CASES, BenchmarkCase
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+STAGES = ["parse", "filter", "pack", "serialize", "write"]
+SERIALIZERS = {
+    "json": JsonFrameSerializer,
+    "numpy": NumpyFrameSerializer,
+    "orjson": OrjsonFrameSerializer,
+}
+
+
+def _get_max_rss() -> int:
+    """
+    Get the peak resident memory of this process so far in bytes,
+    or None if it's not available on this platform
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return int(max_rss if sys.platform == "darwin" else 1024 * max_rss)
+
+
+def _measure(
+    function: Callable[[], Any], trace_memory: bool
+) -> Tuple[Any, Dict[str, float]]:
+    """
+    Run the function and get its result and its wall time, CPU time,
+    and, if trace_memory is True, peak memory allocated while it ran
+    """
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = function()
+    stats = {
+        "wall_time": time.perf_counter() - wall_start,
+        "cpu_time": time.process_time() - cpu_start,
+    }
+    if trace_memory:
+        stats["peak_allocated"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    stats["max_rss"] = _get_max_rss()
+    return result, stats
+
+
+def _pack(agent_data: AgentData) -> List[Tuple[int, np.ndarray]]:
+    """
+    Pack every frame, generating type IDs first
+    as writing the trajectory info does
+    """
+    agent_data.get_type_mapping()
+    return list(TrajectoryConverter._get_frame_buffers(agent_data))
+
+
+def _run_stages(
+    case: BenchmarkCase,
+    output_dir: str,
+    trace_memory: bool,
+    serializer: FrameSerializer,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Run each stage of converting the case once
+    """
+    result = {}
+    converter, result["parse"] = _measure(case.parse, trace_memory)
+    data = converter._data
+    # keep the center of the box
+    half_box = 0.25 * np.array(data.box_size, dtype=float)
+    _, result["filter"] = _measure(
+        lambda: converter.filter_data([CropFilter(-half_box, half_box)]),
+        trace_memory,
+    )
+    buffers, result["pack"] = _measure(lambda: _pack(data.agent_data), trace_memory)
+    times = data.agent_data.times
+    _, result["serialize"] = _measure(
+        lambda: serializer.serialize_frames(
+            (t, float(times[t]), local_buf) for t, local_buf in buffers
+        ),
+        trace_memory,
+    )
+    _, result["write"] = _measure(
+        lambda: converter.write_JSON(os.path.join(output_dir, "benchmark")),
+        trace_memory,
+    )
+    return result
+
+
+def run_case(
+    name: str,
+    scale: int,
+    repeat: int,
+    trace_memory: bool,
+    seed: int,
+    serializer: FrameSerializer = None,
+) -> List[Dict[str, Any]]:
+    """
+    Generate the case at the scale and get the results for each stage,
+    times are the min and median of the repeats, memory is measured
+    in an extra run since tracing allocations slows Python code down
+    """
+    if serializer is None:
+        serializer = JsonFrameSerializer()
+    with tempfile.TemporaryDirectory() as output_dir:
+        if name in FILE_CASES:
+            case = FILE_CASES[name](scale, output_dir, seed=seed)
+        else:
+            case = IN_MEMORY_CASES[name](scale, seed=seed)
+        runs = [_run_stages(case, output_dir, False, serializer) for _ in range(repeat)]
+        memory_run = (
+            _run_stages(case, output_dir, True, serializer) if trace_memory else None
+        )
+    results = []
+    for stage in STAGES:
+        wall_times = [run[stage]["wall_time"] for run in runs]
+        cpu_times = [run[stage]["cpu_time"] for run in runs]
+        results.append(
+            {
+                "case": name,
+                "scale": scale,
+                "size": case.size,
+                "stage": stage,
+                "serializer": type(serializer).__name__,
+                "repeat": repeat,
+                "wall_time_min": min(wall_times),
+                "wall_time_median": statistics.median(wall_times),
+                "cpu_time_min": min(cpu_times),
+                "peak_allocated": (
+                    memory_run[stage]["peak_allocated"] if memory_run else None
+                ),
+                "max_rss": runs[-1][stage]["max_rss"],
+            }
+        )
+    return results
+
+
+def get_environment() -> Dict[str, Any]:
+    """
+    Describe where the benchmarks ran, so results can be compared
+    """
+    return {
+        "simulariumio": simulariumio.__version__,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "time": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def main():
+    all_cases = [*IN_MEMORY_CASES, *FILE_CASES]
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        choices=all_cases,
+        default=all_cases,
+        help="the synthetic inputs to benchmark (default: all)",
+    )
+    parser.add_argument(
+        "--scales",
+        nargs="+",
+        type=int,
+        default=[1, 2, 4],
+        help="the sizes to sweep, input dimensions grow linearly with scale",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="timed runs of each stage"
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="skip the extra run that traces memory allocations",
+    )
+    parser.add_argument(
+        "--serializer",
+        choices=list(SERIALIZERS),
+        default="json",
+        help="how the serialize stage writes the frames (default: json)",
+    )
+    parser.add_argument(
+        "--significant-digits",
+        type=int,
+        default=None,
+        help="digits the numpy and orjson serializers write "
+        "positions with (default: full precision)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", help="path to write the JSON results (default: stdout)"
+    )
+    args = parser.parse_args()
+    if args.serializer == "json":
+        if args.significant_digits is not None:
+            parser.error("--significant-digits needs the numpy or orjson serializer")
+        serializer = JsonFrameSerializer()
+    else:
+        serializer = SERIALIZERS[args.serializer](args.significant_digits)
+    results = []
+    for name in args.cases:
+        for scale in args.scales:
+            log.info(f"benchmarking {name} at scale {scale}")
+            try:
+                results += run_case(
+                    name, scale, args.repeat, not args.no_memory, args.seed, serializer
+                )
+            except ImportError as e:
+                # the reader or generator for this input isn't installed
+                results.append(
+                    {
+                        "case": name,
+                        "scale": scale,
+                        "skipped": f"{type(e).__name__}: {e}",
+                    }
+                )
+                break
+            except Exception as e:
+                results.append(
+                    {"case": name, "scale": scale, "error": f"{type(e).__name__}: {e}"}
+                )
+    output = json.dumps(
+        {"environment": get_environment(), "results": results}, indent=2
+    )
+    if args.output is None:
+        print(output)
+        return
+    with open(args.output, "w") as output_file:
+        output_file.write(output)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # hide the converters' progress messages
+    logging.getLogger("simulariumio").setLevel(logging.WARNING)
+    main()
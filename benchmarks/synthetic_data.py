@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Generators for synthetic trajectories of each input shape
+that simulariumio converts, sized by a scale factor,
+for benchmarking the conversion pipeline
+"""
+
+import logging
+import os
+from typing import Callable, Dict, NamedTuple
+
+import numpy as np
+
+from simulariumio import AgentData, TrajectoryConverter, TrajectoryData, UnitData
+from simulariumio.constants import VIZ_TYPE
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+BOX_SIZE: float = 100.0
+N_TYPES: int = 4
+
+
+class BenchmarkCase(NamedTuple):
+    # make a converter from the generated input (the parse stage)
+    parse: Callable[[], TrajectoryConverter]
+    # the dimensions of the generated input
+    size: Dict[str, int]
+
+
+def _random_walk(
+    rng: np.random.Generator, shape: tuple, step: float = 1.0
+) -> np.ndarray:
+    """
+    Get positions (shape = shape + [3]) that take a random step
+    along the first axis, starting inside the box
+    """
+    start = rng.uniform(-0.4 * BOX_SIZE, 0.4 * BOX_SIZE, (1,) + shape[1:] + (3,))
+    steps = rng.normal(0.0, step, shape + (3,))
+    steps[0] = 0.0
+    return start + np.cumsum(steps, axis=0)
+
+
+def _type_names(type_indices: np.ndarray, n_agents: np.ndarray) -> list:
+    return [
+        [f"type{type_index}" for type_index in frame[: int(n)]]
+        for frame, n in zip(type_indices, n_agents)
+    ]
+
+
+def dense_spheres(scale: int, seed: int = 0) -> BenchmarkCase:
+    """
+    The same spheres, diffusing, in every frame
+    """
+    rng = np.random.default_rng(seed)
+    n_frames, n_agents = 20 * scale, 500 * scale
+    type_indices = np.tile(rng.integers(0, N_TYPES, n_agents), (n_frames, 1))
+    n_agents_per_frame = np.full(n_frames, n_agents)
+    agent_data = AgentData(
+        times=np.arange(n_frames, dtype=float),
+        n_agents=n_agents_per_frame,
+        viz_types=np.full((n_frames, n_agents), VIZ_TYPE.DEFAULT),
+        unique_ids=np.tile(np.arange(n_agents, dtype=float), (n_frames, 1)),
+        types=_type_names(type_indices, n_agents_per_frame),
+        positions=_random_walk(rng, (n_frames, n_agents)),
+        radii=np.tile(rng.uniform(0.5, 2.0, n_agents), (n_frames, 1)),
+    )
+    return BenchmarkCase(
+        parse=lambda: TrajectoryConverter(
+            TrajectoryData(
+                box_size=np.full(3, BOX_SIZE), agent_data=agent_data, plots=[]
+            )
+        ),
+        size={"frames": n_frames, "agents": n_agents},
+    )
+
+
+def growing_population(scale: int, seed: int = 0) -> BenchmarkCase:
+    """
+    Spheres that are added in every frame, so most of each frame's
+    agent slots are padding early in the trajectory
+    """
+    rng = np.random.default_rng(seed)
+    n_frames, max_agents = 20 * scale, 1000 * scale
+    n_agents = np.linspace(1, max_agents, n_frames).astype(int)
+    type_indices = np.tile(rng.integers(0, N_TYPES, max_agents), (n_frames, 1))
+    agent_data = AgentData(
+        times=np.arange(n_frames, dtype=float),
+        n_agents=n_agents,
+        viz_types=np.full((n_frames, max_agents), VIZ_TYPE.DEFAULT),
+        unique_ids=np.tile(np.arange(max_agents, dtype=float), (n_frames, 1)),
+        types=_type_names(type_indices, n_agents),
+        positions=_random_walk(rng, (n_frames, max_agents)),
+        radii=np.ones((n_frames, max_agents)),
+    )
+    return BenchmarkCase(
+        parse=lambda: TrajectoryConverter(
+            TrajectoryData(
+                box_size=np.full(3, BOX_SIZE), agent_data=agent_data, plots=[]
+            )
+        ),
+        size={"frames": n_frames, "agents": max_agents},
+    )
+
+
+def _fiber_points(
+    rng: np.random.Generator, n_frames: int, n_fibers: int, n_points: int
+) -> np.ndarray:
+    """
+    Get the points (shape = [frames, fibers, points, 3]) of fibers
+    that wiggle in place
+    """
+    start = rng.uniform(-0.3 * BOX_SIZE, 0.3 * BOX_SIZE, (1, n_fibers, 1, 3))
+    directions = rng.normal(0.0, 1.0, (1, n_fibers, 1, 3))
+    directions /= np.linalg.norm(directions, axis=-1, keepdims=True)
+    along = np.arange(n_points)[np.newaxis, np.newaxis, :, np.newaxis]
+    wiggle = rng.normal(0.0, 0.05, (n_frames, n_fibers, n_points, 3))
+    return start + directions * along * (0.2 * BOX_SIZE / n_points) + wiggle
+
+
+def long_fibers(scale: int, seed: int = 0) -> BenchmarkCase:
+    """
+    Fibers with many subpoints in every frame
+    """
+    rng = np.random.default_rng(seed)
+    n_frames, n_fibers, n_points = 20 * scale, 50 * scale, 200
+    n_agents = np.full(n_frames, n_fibers)
+    agent_data = AgentData(
+        times=np.arange(n_frames, dtype=float),
+        n_agents=n_agents,
+        viz_types=np.full((n_frames, n_fibers), VIZ_TYPE.FIBER),
+        unique_ids=np.tile(np.arange(n_fibers, dtype=float), (n_frames, 1)),
+        types=_type_names(np.zeros((n_frames, n_fibers), dtype=int), n_agents),
+        positions=np.zeros((n_frames, n_fibers, 3)),
+        radii=np.full((n_frames, n_fibers), 0.5),
+        n_subpoints=np.full((n_frames, n_fibers), n_points),
+        subpoints=_fiber_points(rng, n_frames, n_fibers, n_points),
+    )
+    return BenchmarkCase(
+        parse=lambda: TrajectoryConverter(
+            TrajectoryData(
+                box_size=np.full(3, BOX_SIZE), agent_data=agent_data, plots=[]
+            )
+        ),
+        size={"frames": n_frames, "agents": n_fibers, "subpoints": n_points},
+    )
+
+
+def cytosim_report(scale: int, output_dir: str, seed: int = 0) -> BenchmarkCase:
+    """
+    A Cytosim fiber_points.txt report of fibers with many points
+    """
+    from simulariumio.cytosim import (
+        CytosimConverter,
+        CytosimData,
+        CytosimObjectInfo,
+    )
+
+    rng = np.random.default_rng(seed)
+    n_frames, n_fibers, n_points = 10 * scale, 50 * scale, 50
+    points = _fiber_points(rng, n_frames, n_fibers, n_points)
+    path = os.path.join(output_dir, "fiber_points.txt")
+    with open(path, "w") as report:
+        for t in range(n_frames):
+            report.write(f"% frame {t}\n% time {0.1 * t:.1f}\n")
+            report.write("% id pos_x pos_y pos_z\n")
+            for f in range(n_fibers):
+                report.write(f"% fiber f0:{f + 1}:{f}\n\n")
+                report.writelines(
+                    f" {f + 1} {x:.6f} {y:.6f} {z:.6f}\n" for x, y, z in points[t, f]
+                )
+            report.write("% end\n\n")
+    return BenchmarkCase(
+        parse=lambda: CytosimConverter(
+            CytosimData(
+                box_size=np.full(3, BOX_SIZE),
+                object_info={"fibers": CytosimObjectInfo(filepath=path)},
+            )
+        ),
+        size={"frames": n_frames, "agents": n_fibers, "subpoints": n_points},
+    )
+
+
+PHYSICELL_LABELS = [
+    ("ID", 1),
+    ("position", 3),
+    ("total_volume", 1),
+    ("cell_type", 1),
+    ("cycle_model", 1),
+    ("current_phase", 1),
+]
+
+
+def _physicell_xml(t: int, time: float) -> str:
+    labels = []
+    index = 0
+    for name, size in PHYSICELL_LABELS:
+        labels.append(f'<label index="{index}" size="{size}">{name}</label>')
+        index += size
+    coordinates = " ".join(str(c) for c in np.linspace(-BOX_SIZE, BOX_SIZE, 5))
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<MultiCellDS version="2" type="snapshot/simulation">
+<metadata>
+<current_time units="min">{time}</current_time>
+<current_runtime units="sec">0.0</current_runtime>
+</metadata>
+<microenvironment><domain name="microenvironment">
+<mesh type="Cartesian" uniform="true" regular="true" units="micron">
+<x_coordinates delimiter=" ">{coordinates}</x_coordinates>
+<y_coordinates delimiter=" ">{coordinates}</y_coordinates>
+<z_coordinates delimiter=" ">0.0</z_coordinates>
+</mesh>
+</domain></microenvironment>
+<cellular_information><cell_populations><cell_population type="individual">
+<custom>
+<simplified_data type="matlab" source="PhysiCell">
+<labels>{"".join(labels)}</labels>
+<filename>output{t:08d}_cells_physicell.mat</filename>
+</simplified_data>
+</custom>
+</cell_population></cell_populations></cellular_information>
+</MultiCellDS>
+"""
+
+
+def physicell_snapshots(scale: int, output_dir: str, seed: int = 0) -> BenchmarkCase:
+    """
+    PhysiCell MultiCellDS XML and MATLAB snapshots of a growing
+    population of cells (requires scipy to write the MATLAB files)
+    """
+    import scipy.io
+    from simulariumio.physicell import PhysicellConverter, PhysicellData
+
+    rng = np.random.default_rng(seed)
+    n_frames, max_cells = 10 * scale, 500 * scale
+    positions = _random_walk(rng, (n_frames, max_cells))
+    for t, n_cells in enumerate(np.linspace(1, max_cells, n_frames).astype(int)):
+        cells = np.zeros((sum(size for _, size in PHYSICELL_LABELS), n_cells))
+        cells[0] = np.arange(n_cells)
+        cells[1:4] = positions[t, :n_cells].T
+        cells[4] = 2500.0
+        cells[5] = rng.integers(0, N_TYPES, n_cells)
+        scipy.io.savemat(
+            os.path.join(output_dir, f"output{t:08d}_cells_physicell.mat"),
+            {"cells": cells},
+        )
+        with open(os.path.join(output_dir, f"output{t:08d}.xml"), "w") as xml_file:
+            xml_file.write(_physicell_xml(t, 60.0 * t))
+    return BenchmarkCase(
+        parse=lambda: PhysicellConverter(
+            PhysicellData(
+                box_size=np.full(3, 2.0 * BOX_SIZE),
+                timestep=60.0,
+                path_to_output_dir=output_dir,
+                time_units=UnitData("min"),
+            )
+        ),
+        size={"frames": n_frames, "agents": max_cells},
+    )
+
+
+def readdy_h5(scale: int, output_dir: str, seed: int = 0) -> BenchmarkCase:
+    """
+    A ReaDDy trajectory of diffusing particles, written by simulating
+    with ReaDDy (requires readdy)
+    """
+    import readdy
+    from simulariumio.readdy import ReaddyConverter, ReaddyData
+
+    rng = np.random.default_rng(seed)
+    n_frames, n_particles = 10 * scale, 500 * scale
+    path = os.path.join(output_dir, "particles.h5")
+    system = readdy.ReactionDiffusionSystem(
+        box_size=[BOX_SIZE, BOX_SIZE, BOX_SIZE], unit_system=None
+    )
+    for type_index in range(N_TYPES):
+        system.add_species(f"type{type_index}", diffusion_constant=1.0)
+    simulation = system.simulation(kernel="SingleCPU")
+    simulation.output_file = path
+    type_indices = rng.integers(0, N_TYPES, n_particles)
+    positions = rng.uniform(-0.4 * BOX_SIZE, 0.4 * BOX_SIZE, (n_particles, 3))
+    for type_index in range(N_TYPES):
+        simulation.add_particles(
+            f"type{type_index}", positions[type_indices == type_index]
+        )
+    simulation.record_trajectory(stride=1)
+    simulation.show_progress = False
+    simulation.run(n_steps=n_frames - 1, timestep=0.01)
+    return BenchmarkCase(
+        parse=lambda: ReaddyConverter(
+            ReaddyData(
+                box_size=np.full(3, BOX_SIZE),
+                timestep=0.01,
+                path_to_readdy_h5=path,
+                radii={f"type{t}": 1.0 for t in range(N_TYPES)},
+            )
+        ),
+        size={"frames": n_frames, "agents": n_particles},
+    )
+
+
+# cases that are generated in memory
+IN_MEMORY_CASES = {
+    "dense_spheres": dense_spheres,
+    "growing_population": growing_population,
+    "long_fibers": long_fibers,
+}
+
+# cases that are written to files in an output directory
+FILE_CASES = {
+    "cytosim_report": cytosim_report,
+    "physicell_snapshots": physicell_snapshots,
+    "readdy_h5": readdy_h5,
+}
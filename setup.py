@@ -13,6 +13,15 @@ physicell_requirements = [
     "scipy>=1.5.2",
 ]
 
+fast_json_requirements = [
+    "orjson>=3.4",
+]
+
+compression_requirements = [
+    "zstandard>=0.15",
+    "lz4>=3.1",
+]
+
 setup_requirements = [
     "pytest-runner>=5.2",
 ]
@@ -53,10 +62,14 @@ extra_requirements = {
     "test": test_requirements,
     "dev": dev_requirements,
     "physicell": physicell_requirements,
+    "fast-json": fast_json_requirements,
+    "compression": compression_requirements,
     "all": [
         *requirements,
         *dev_requirements,
-        *physicell_requirements
+        *physicell_requirements,
+        *fast_json_requirements,
+        *compression_requirements,
     ]
 }
 
@@ -73,7 +86,10 @@ setup(
     ],
     description="Simularium Conversion helps convert simulation outputs to the format consumed by the Simularium viewer.",
     entry_points={
-        "console_scripts": [],
+        "console_scripts": [
+            "simulariumio=simulariumio.cli:main",
+            "simulariumio-service=simulariumio.service:main",
+        ],
     },
     install_requires=requirements,
     license="Allen Institute Software License",
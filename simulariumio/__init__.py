@@ -15,6 +15,14 @@ def get_module_version():
 
 from .trajectory_converter import TrajectoryConverter  # noqa: F401
 from .file_converter import FileConverter  # noqa: F401
+from .delta_encoding import DeltaEncoding  # noqa: F401
+from .parse_cache import ParseCache  # noqa: F401
+from .instrumentation import (  # noqa: F401
+    ConversionStats,
+    StageStats,
+    ConversionProgress,
+    CancellationToken,
+)
 
 from .data_objects import (  # noqa: F401
     TrajectoryData,
@@ -22,4 +30,9 @@ from .data_objects import (  # noqa: F401
     UnitData,
     ScatterPlotData,
     HistogramPlotData,
+    HistogramBins,
+    PrecisionData,
+    SpatialIndex,
 )
+from .conversion_job import ConversionJob  # noqa: F401
+from .service import convert, ConversionService, send_job  # noqa: F401
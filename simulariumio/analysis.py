@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .data_objects import AgentData, HistogramBins
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+# number of frames to load into memory at once
+DEFAULT_CHUNK_SIZE: int = 100
+# max number of coordinates to compare at once for pairwise distances
+PAIRWISE_BLOCK_SIZE: int = 2**22
+
+###############################################################################
+
+
+class BaseTypes:
+    names: List[str]
+    type_ids: np.ndarray
+    indices: np.ndarray
+
+    def __init__(self, agent_data: AgentData):
+        """
+        This object looks up the agent type names without state tags
+        (the part of the name before "#") for the type IDs
+        in an AgentData, so that agents of the same type
+        in different states are analyzed together
+
+        Parameters
+        ----------
+        agent_data : AgentData
+            The agent data to get the type names for
+        """
+        type_mapping = agent_data.get_type_mapping()
+        self.type_ids = np.array(
+            sorted(int(type_id) for type_id in type_mapping), dtype=int
+        )
+        self.names = []
+        self.indices = np.zeros(self.type_ids.size, dtype=int)
+        for i, type_id in enumerate(self.type_ids):
+            type_name = type_mapping[str(type_id)]["name"].split("#")[0]
+            if type_name not in self.names:
+                self.names.append(type_name)
+            self.indices[i] = self.names.index(type_name)
+
+    def get_bins(self, type_ids: np.ndarray, include: np.ndarray) -> np.ndarray:
+        """
+        Get the index of the base type name for each type ID,
+        or the number of names for agents that aren't included
+        """
+        n_types = len(self.names)
+        if n_types < 1:
+            return np.zeros(type_ids.shape, dtype=int)
+        lookup = np.clip(
+            np.searchsorted(self.type_ids, type_ids.astype(int)),
+            0,
+            self.type_ids.size - 1,
+        )
+        return np.where(include, self.indices[lookup], n_types)
+
+    def sum_per_type(self, bins: np.ndarray, weights: np.ndarray = None) -> np.ndarray:
+        """
+        Sum the weights (or count the agents if there are no weights)
+        of each base type in each frame of bins (shape = [frames, agents])
+        """
+        n_types = len(self.names)
+        n_frames = bins.shape[0]
+        frame_bins = bins + (n_types + 1) * np.arange(n_frames)[:, np.newaxis]
+        # agents that aren't included are summed in an extra bin that's dropped
+        return np.reshape(
+            np.bincount(
+                frame_bins.ravel(),
+                weights=weights.ravel() if weights is not None else None,
+                minlength=n_frames * (n_types + 1),
+            ),
+            (n_frames, n_types + 1),
+        )[:, :n_types].astype(float)
+
+
+def get_chunks(total_steps: int, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """
+    Get the start and end frame of each chunk of frames
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk size must be at least 1, got {chunk_size}")
+    for start in range(0, total_steps, chunk_size):
+        yield start, min(start + chunk_size, total_steps)
+
+
+def _get_valid_agents(agent_data: AgentData, start: int, end: int) -> np.ndarray:
+    """
+    Get whether each agent slot in the frames holds an agent
+    """
+    return (
+        np.arange(agent_data.positions.shape[1])[np.newaxis, :]
+        < agent_data.n_agents[start:end].astype(int)[:, np.newaxis]
+    )
+
+
+def _get_fibers(agent_data: AgentData, start: int, end: int) -> np.ndarray:
+    """
+    Get whether each agent slot in the frames holds subpoints
+    """
+    if agent_data.n_subpoints is None or agent_data.subpoints is None:
+        return np.zeros((end - start, agent_data.positions.shape[1]), dtype=bool)
+    return agent_data.n_subpoints[start:end] > 0
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """
+    Divide, with a result of 0 where the denominator is 0
+    """
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros_like(numerator),
+        where=denominator > 0,
+    )
+
+
+def count_agents(
+    agent_data: AgentData, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Count the agents of each base type in each frame,
+    returns the type names and counts (shape = [timesteps, types])
+    """
+    base_types = BaseTypes(agent_data)
+    counts = np.zeros((agent_data.times.size, len(base_types.names)))
+    for start, end in get_chunks(agent_data.times.size, chunk_size):
+        bins = base_types.get_bins(
+            agent_data.type_ids[start:end],
+            _get_valid_agents(agent_data, start, end),
+        )
+        counts[start:end] = base_types.sum_per_type(bins)
+    return base_types.names, counts
+
+
+def get_mean_fiber_lengths(
+    agent_data: AgentData, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Get the mean length along the subpoints of the agents
+    of each base type with subpoints (fibers) in each frame,
+    returns the type names, mean lengths, and fiber counts
+    (both shape = [timesteps, types])
+    """
+    base_types = BaseTypes(agent_data)
+    total_steps = agent_data.times.size
+    lengths = np.zeros((total_steps, len(base_types.names)))
+    counts = np.zeros((total_steps, len(base_types.names)))
+    if agent_data.subpoints is None or agent_data.subpoints.shape[2] < 2:
+        return base_types.names, lengths, counts
+    n_segments = agent_data.subpoints.shape[2] - 1
+    for start, end in get_chunks(total_steps, chunk_size):
+        bins = base_types.get_bins(
+            agent_data.type_ids[start:end],
+            _get_valid_agents(agent_data, start, end)
+            & _get_fibers(agent_data, start, end),
+        )
+        segment_lengths = np.linalg.norm(
+            np.diff(agent_data.subpoints[start:end], axis=2), axis=-1
+        )
+        # ignore the segments after the last subpoint
+        is_segment = (
+            np.arange(n_segments)
+            < agent_data.n_subpoints[start:end].astype(int)[..., np.newaxis] - 1
+        )
+        fiber_lengths = np.sum(np.where(is_segment, segment_lengths, 0.0), axis=2)
+        counts[start:end] = base_types.sum_per_type(bins)
+        lengths[start:end] = _divide(
+            base_types.sum_per_type(bins, fiber_lengths), counts[start:end]
+        )
+    return base_types.names, lengths, counts
+
+
+def get_radii_of_gyration(
+    agent_data: AgentData, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Get the radius of gyration of the positions of the agents
+    of each base type without subpoints in each frame,
+    returns the type names, radii of gyration, and agent counts
+    (both shape = [timesteps, types])
+    """
+    base_types = BaseTypes(agent_data)
+    total_steps = agent_data.times.size
+    radii = np.zeros((total_steps, len(base_types.names)))
+    counts = np.zeros((total_steps, len(base_types.names)))
+    for start, end in get_chunks(total_steps, chunk_size):
+        bins = base_types.get_bins(
+            agent_data.type_ids[start:end],
+            _get_valid_agents(agent_data, start, end)
+            & ~_get_fibers(agent_data, start, end),
+        )
+        positions = agent_data.positions[start:end]
+        counts[start:end] = base_types.sum_per_type(bins)
+        centers = np.stack(
+            [
+                _divide(
+                    base_types.sum_per_type(bins, positions[..., dim]),
+                    counts[start:end],
+                )
+                for dim in range(3)
+            ],
+            axis=-1,
+        )
+        mean_squares = _divide(
+            base_types.sum_per_type(bins, np.sum(positions**2, axis=-1)),
+            counts[start:end],
+        )
+        # <|r - <r>|^2> = <|r|^2> - |<r>|^2
+        radii[start:end] = np.sqrt(
+            np.maximum(mean_squares - np.sum(centers**2, axis=-1), 0.0)
+        )
+    return base_types.names, radii, counts
+
+
+def get_mean_squared_displacements(
+    agent_data: AgentData, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Get the mean squared displacement since the first frame
+    of the agents of each base type in the first frame,
+    tracked by unique ID, in each frame.
+    Returns the type names, mean squared displacements,
+    and the number of tracked agents in each frame
+    (both shape = [timesteps, types])
+    """
+    base_types = BaseTypes(agent_data)
+    total_steps = agent_data.times.size
+    n_types = len(base_types.names)
+    displacements = np.zeros((total_steps, n_types))
+    counts = np.zeros((total_steps, n_types))
+    if total_steps < 1:
+        return base_types.names, displacements, counts
+    n_reference = int(agent_data.n_agents[0])
+    reference_uids = agent_data.unique_ids[0][:n_reference]
+    reference_positions = agent_data.positions[0][:n_reference]
+    reference_bins = base_types.get_bins(
+        agent_data.type_ids[0][:n_reference], np.ones(n_reference, dtype=bool)
+    )
+    for start, end in get_chunks(total_steps, chunk_size):
+        unique_ids = agent_data.unique_ids[start:end]
+        positions = agent_data.positions[start:end]
+        n_agents = agent_data.n_agents[start:end].astype(int)
+        agent_ix = np.stack(
+            [
+                AgentData._get_agent_indices(
+                    unique_ids[t][: n_agents[t]], reference_uids
+                )
+                for t in range(end - start)
+            ]
+        ).reshape((end - start, n_reference))
+        tracked = agent_ix >= 0
+        offsets = (
+            np.take_along_axis(
+                positions, np.maximum(agent_ix, 0)[..., np.newaxis], axis=1
+            )
+            - reference_positions
+        )
+        bins = np.where(tracked, reference_bins, n_types)
+        counts[start:end] = base_types.sum_per_type(bins)
+        displacements[start:end] = _divide(
+            base_types.sum_per_type(bins, np.sum(offsets**2, axis=-1)),
+            counts[start:end],
+        )
+    return base_types.names, displacements, counts
+
+
+def _get_pairwise_distance_blocks(
+    agent_data: AgentData,
+    base_types: BaseTypes,
+    time_index: int,
+    max_distance: float = None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Get the base type index and distances for each block of pairs
+    of agents of the same base type without subpoints at one frame,
+    only including distances up to max_distance if it's given
+    """
+    time_index = range(agent_data.times.size)[time_index]
+    t = slice(time_index, time_index + 1)
+    bins = base_types.get_bins(
+        agent_data.type_ids[t],
+        _get_valid_agents(agent_data, t.start, t.stop)
+        & ~_get_fibers(agent_data, t.start, t.stop),
+    )[0]
+    for type_index in range(len(base_types.names)):
+        positions = agent_data.positions[time_index][bins == type_index]
+        n_positions = positions.shape[0]
+        # compare blocks of agents to all the agents after them
+        block_size = max(1, PAIRWISE_BLOCK_SIZE // (3 * max(n_positions, 1)))
+        for block_start in range(0, n_positions - 1, block_size):
+            block_end = min(block_start + block_size, n_positions - 1)
+            block_distances = np.linalg.norm(
+                positions[block_start:block_end, np.newaxis]
+                - positions[np.newaxis, block_start + 1 :],
+                axis=-1,
+            )
+            is_pair = (
+                np.arange(block_start + 1, n_positions)[np.newaxis, :]
+                > np.arange(block_start, block_end)[:, np.newaxis]
+            )
+            if max_distance is not None:
+                is_pair &= block_distances <= max_distance
+            yield type_index, block_distances[is_pair]
+
+
+def get_pairwise_distances(
+    agent_data: AgentData, time_index: int = -1, max_distance: float = None
+) -> Dict[str, np.ndarray]:
+    """
+    Get the distances between the positions of each pair of agents
+    of the same base type without subpoints at one frame,
+    only including distances up to max_distance if it's given.
+    Returns a dict of base type name to distances
+    """
+    base_types = BaseTypes(agent_data)
+    distances = {}
+    for type_index, block_distances in _get_pairwise_distance_blocks(
+        agent_data, base_types, time_index, max_distance
+    ):
+        distances.setdefault(type_index, []).append(block_distances)
+    return {
+        base_types.names[type_index]: np.concatenate(distances[type_index])
+        for type_index in sorted(distances)
+    }
+
+
+def get_binned_pairwise_distances(
+    agent_data: AgentData,
+    bin_width: float,
+    time_indices: List[int] = None,
+    max_distance: float = None,
+) -> Dict[str, HistogramBins]:
+    """
+    Count the distances between the positions of each pair of agents
+    of the same base type without subpoints in bins, over all
+    the given frames, without keeping the distances.
+    If max_distance is given the bins are fixed from 0 to max_distance,
+    otherwise they cover the distances.
+    Returns a dict of base type name to bins
+    """
+    base_types = BaseTypes(agent_data)
+    if time_indices is None:
+        time_indices = range(agent_data.times.size)
+    result = {}
+    for time_index in time_indices:
+        for type_index, block_distances in _get_pairwise_distance_blocks(
+            agent_data, base_types, time_index, max_distance
+        ):
+            type_name = base_types.names[type_index]
+            if type_name not in result:
+                result[type_name] = HistogramBins(
+                    bin_width,
+                    min_value=0.0,
+                    max_value=max_distance,
+                )
+            result[type_name].add_values(block_distances)
+    return result
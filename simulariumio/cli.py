@@ -0,0 +1,374 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List
+
+from .conversion_job import ConversionJob
+from .instrumentation import ConversionStats, get_max_rss
+from .service import _warm_up
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+JOB_KEYS = ["input_type", "input_options", "output_path", "filters", "output_options"]
+
+
+def read_manifest(manifest_path: str) -> List[ConversionJob]:
+    """
+    Read the conversion jobs from a JSON manifest, which is
+    either a list of jobs or a dict with a list of "jobs"
+    and optionally "defaults" shared by every job.
+    Each job is described as in ConversionJob.from_dict,
+    the defaults' input_options and output_options are merged
+    with each job's, the other defaults are used if the job
+    doesn't set them
+    """
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    defaults = manifest.get("defaults", {})
+    for key in defaults:
+        if key not in JOB_KEYS:
+            raise ValueError(f"manifest defaults must be in {JOB_KEYS}, got {key}")
+    result = []
+    for job_info in manifest["jobs"]:
+        info = dict(defaults)
+        info.update(job_info)
+        for key in ["input_options", "output_options"]:
+            info[key] = {**defaults.get(key, {}), **job_info.get(key, {})}
+        result.append(ConversionJob.from_dict(info))
+    return result
+
+
+def _limit_memory(max_memory: int):
+    """
+    Set up a worker process: import the converters, then limit
+    its address space so a job that uses too much memory fails
+    with MemoryError instead of exhausting the machine
+    """
+    try:
+        _warm_up()
+    except Exception as e:
+        # the pool restarts workers whose setup raises, forever,
+        # so let the jobs fail instead
+        log.warning(f"Couldn't import the converters: {e!r}")
+    if max_memory is not None and resource is not None:
+        _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, hard_limit))
+
+
+def _run_job(job_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the job in a worker process and return its result,
+    a failed job returns its error instead of raising
+    so the other jobs keep running
+    """
+    job = ConversionJob.from_dict(job_info)
+    stats = ConversionStats()
+    start = time.perf_counter()
+    result = {"outputPath": job.output_path, "status": "done", "error": None}
+    try:
+        # a job that fails doesn't leave partly written files
+        job.run(stats)
+        job.write_record()
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = repr(e)
+    result["wallTime"] = time.perf_counter() - start
+    result["maxRSS"] = get_max_rss()
+    result["stats"] = stats.to_dict()
+    return result
+
+
+def _get_result(job: ConversionJob, status: str, error: str = None) -> Dict[str, Any]:
+    """
+    Get the result of a job that didn't run in a worker
+    """
+    return {
+        "outputPath": job.output_path,
+        "status": status,
+        "error": error,
+        "wallTime": 0.0,
+        "maxRSS": None,
+        "stats": {},
+    }
+
+
+def _start_workers(
+    n_processes: int, max_memory: int, max_jobs_per_worker: int
+) -> ProcessPoolExecutor:
+    options = {}
+    # replacing workers is only supported in Python 3.11+
+    if max_jobs_per_worker and sys.version_info >= (3, 11):
+        options["max_tasks_per_child"] = max_jobs_per_worker
+    return ProcessPoolExecutor(
+        n_processes, initializer=_limit_memory, initargs=(max_memory,), **options
+    )
+
+
+def _run_in_pool(
+    jobs: List[ConversionJob],
+    indices: List[int],
+    n_processes: int,
+    max_memory: int,
+    max_jobs_per_worker: int,
+    on_result: Callable[[int, Dict[str, Any]], None],
+) -> List[int]:
+    """
+    Run the jobs at the indices, at most n_processes at a time so each
+    submitted job is running, and pass each result to on_result.
+    If a worker dies, every job running in the pool fails,
+    so the pool is replaced and the indices of those jobs are returned
+    """
+    n_running = n_processes if n_processes is not None else os.cpu_count() or 1
+    waiting = list(reversed(indices))
+    running = {}
+    died = []
+    executor = _start_workers(n_processes, max_memory, max_jobs_per_worker)
+    try:
+        while waiting or running:
+            broken = False
+            while waiting and len(running) < n_running:
+                index = waiting.pop()
+                try:
+                    future = executor.submit(_run_job, jobs[index].to_dict())
+                except BrokenProcessPool:
+                    waiting.append(index)
+                    broken = True
+                    break
+                running[future] = index
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        on_result(index, future.result())
+                    except BrokenProcessPool:
+                        died.append(index)
+                        broken = True
+            if broken:
+                # the other running jobs fail too
+                for future in list(running):
+                    index = running.pop(future)
+                    try:
+                        on_result(index, future.result())
+                    except BrokenProcessPool:
+                        died.append(index)
+                log.warning("A worker process died, restarting the workers")
+                executor.shutdown(wait=True)
+                executor = _start_workers(n_processes, max_memory, max_jobs_per_worker)
+    finally:
+        executor.shutdown(wait=True)
+    return died
+
+
+def run_jobs(
+    jobs: List[ConversionJob],
+    n_processes: int = None,
+    max_memory: int = None,
+    max_jobs_per_worker: int = 1,
+    force: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Run the conversion jobs in a pool of worker processes
+    and return the result of each job, in order.
+    If a worker process dies, e.g. when it's killed for running
+    out of memory, the jobs that were running are run again
+    one at a time, and a job whose worker dies again fails
+
+    Parameters
+    ----------
+    jobs : List[ConversionJob]
+        The jobs to run
+    n_processes : int (optional)
+        The number of worker processes, i.e. jobs run at once
+        Default: None (the number of CPUs)
+    max_memory : int (optional)
+        The most memory in bytes each worker process can map,
+        including the loaded libraries, jobs that need more
+        fail with MemoryError
+        (not supported on Windows)
+        Default: None (no limit)
+    max_jobs_per_worker : int (optional)
+        Replace each worker process after it runs this many jobs,
+        so memory a job leaves allocated is returned to the system,
+        0 or None keeps the workers (requires Python 3.11+)
+        Default: 1
+    force : bool (optional)
+        Run every job, even if its output is up to date
+        Default: False
+    """
+    results = [None] * len(jobs)
+    job_indices = []
+    for index, job in enumerate(jobs):
+        if not force and job.is_up_to_date():
+            log.info(f"Skipping {job.output_path}, it is up to date")
+            results[index] = _get_result(job, "skipped")
+        else:
+            job_indices.append(index)
+    n_finished = 0
+
+    def on_result(index: int, result: Dict[str, Any]):
+        nonlocal n_finished
+        n_finished += 1
+        log.info(
+            f"[{n_finished}/{len(job_indices)}] {result['status']} "
+            f"{result['outputPath']} in {result['wallTime']:.2f} s"
+            + (f": {result['error']}" if result["error"] else "")
+        )
+        results[index] = result
+
+    if not job_indices:
+        return results
+    died = _run_in_pool(
+        jobs, job_indices, n_processes, max_memory, max_jobs_per_worker, on_result
+    )
+    for index in died:
+        # run again alone, to find which of the jobs killed the worker
+        if _run_in_pool(jobs, [index], 1, max_memory, max_jobs_per_worker, on_result):
+            on_result(
+                index, _get_result(jobs[index], "failed", "the worker process died")
+            )
+    return results
+
+
+def get_summary(results: List[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+    """
+    Get the number of jobs done, skipped, and failed,
+    the total wall time, and each job's result
+    """
+    counts = {
+        status: sum(1 for result in results if result["status"] == status)
+        for status in ["done", "skipped", "failed"]
+    }
+    return {
+        **counts,
+        "wallTime": wall_time,
+        "jobTime": sum(result["wallTime"] for result in results),
+        "failures": [
+            {"outputPath": result["outputPath"], "error": result["error"]}
+            for result in results
+            if result["status"] == "failed"
+        ],
+        "jobs": results,
+    }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """
+    Get a table of each job's status and time, and the totals
+    """
+    lines = [f"{'status':<8} {'time (s)':>10} {'max RSS (MB)':>13}  output"]
+    for result in summary["jobs"]:
+        max_rss = (
+            f"{result['maxRSS'] / 2**20:.1f}" if result["maxRSS"] is not None else "-"
+        )
+        lines.append(
+            f"{result['status']:<8} {result['wallTime']:>10.2f} "
+            f"{max_rss:>13}  {result['outputPath']}"
+        )
+    lines.append(
+        f"{summary['done']} done, {summary['skipped']} skipped, "
+        f"{summary['failed']} failed in {summary['wallTime']:.2f} s "
+        f"({summary['jobTime']:.2f} s in jobs)"
+    )
+    for failure in summary["failures"]:
+        lines.append(f"FAILED {failure['outputPath']}: {failure['error']}")
+    return "\n".join(lines)
+
+
+def _get_arguments(args: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="simulariumio",
+        description="Convert the simulation outputs listed in a manifest "
+        "to .simularium files, in parallel",
+    )
+    parser.add_argument(
+        "manifest",
+        help="JSON file listing the jobs, each with input_type, "
+        "input_options, output_path, and optionally filters and output_options",
+    )
+    parser.add_argument(
+        "-j",
+        "--processes",
+        type=int,
+        default=None,
+        help="number of jobs to run at once (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=float,
+        default=None,
+        help="most memory in GB each worker process can map, including "
+        "the loaded libraries (default: no limit)",
+    )
+    parser.add_argument(
+        "--max-jobs-per-worker",
+        type=int,
+        default=1,
+        help="replace each worker process after this many jobs, 0 keeps them, "
+        "requires Python 3.11+ (default: 1)",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="convert every job, even if its output is up to date",
+    )
+    parser.add_argument(
+        "--summary", default=None, help="also save the summary as JSON to this path"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="log each stage of each job"
+    )
+    return parser.parse_args(args)
+
+
+def main(args: List[str] = None) -> int:
+    arguments = _get_arguments(args)
+    logging.basicConfig(
+        level=logging.INFO if arguments.verbose else logging.WARNING,
+        format="%(asctime)s %(name)s %(levelname)s: %(message)s",
+    )
+    # progress is always shown
+    log.setLevel(logging.INFO)
+    jobs = read_manifest(arguments.manifest)
+    start = time.perf_counter()
+    results = run_jobs(
+        jobs,
+        n_processes=arguments.processes,
+        max_memory=(
+            int(arguments.max_memory * 2**30)
+            if arguments.max_memory is not None
+            else None
+        ),
+        max_jobs_per_worker=arguments.max_jobs_per_worker,
+        force=arguments.force,
+    )
+    summary = get_summary(results, time.perf_counter() - start)
+    print(format_summary(summary))
+    if arguments.summary is not None:
+        with open(arguments.summary, "w") as summary_file:
+            json.dump(summary, summary_file, indent=4)
+    return 1 if summary["failed"] > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
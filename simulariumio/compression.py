@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gzip
+import io
+import logging
+import queue
+import threading
+from typing import IO, Any
+
+from .exceptions import UnsupportedCompressionError
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+SUPPORTED_COMPRESSION_EXTENSIONS = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+    "lz4": ".lz4",
+}
+
+COMPRESSION_MAGIC_BYTES = {
+    "gzip": b"\x1f\x8b",
+    "zstd": b"\x28\xb5\x2f\xfd",
+    "lz4": b"\x04\x22\x4d\x18",
+}
+
+# sentinel queued to ask the compression thread to flush
+_FLUSH = object()
+
+###############################################################################
+
+
+def get_compression_extension(compression: str = None) -> str:
+    """
+    Return the file extension to add after .simularium
+    for the given compression codec
+    """
+    if compression is None:
+        return ""
+    if compression not in SUPPORTED_COMPRESSION_EXTENSIONS:
+        raise UnsupportedCompressionError(compression)
+    return SUPPORTED_COMPRESSION_EXTENSIONS[compression]
+
+
+def _open_compressed_binary(
+    path: str, compression: str, compression_level: int = None
+) -> IO[bytes]:
+    """
+    Open a binary file object that compresses what is written to it
+    """
+    if compression == "gzip":
+        return gzip.open(
+            path,
+            "wb",
+            compresslevel=6 if compression_level is None else compression_level,
+        )
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                "zstd compression requires zstandard, "
+                "install it with `pip install simulariumio[compression]`"
+            )
+        compressor = zstandard.ZstdCompressor(
+            level=3 if compression_level is None else compression_level
+        )
+        return compressor.stream_writer(open(path, "wb"), closefd=True)
+    if compression == "lz4":
+        try:
+            import lz4.frame
+        except ImportError:
+            raise ImportError(
+                "lz4 compression requires lz4, "
+                "install it with `pip install simulariumio[compression]`"
+            )
+        return lz4.frame.open(
+            path,
+            "wb",
+            compression_level=0 if compression_level is None else compression_level,
+        )
+    raise UnsupportedCompressionError(compression)
+
+
+class CompressedFileWriter:
+    path: str
+    compression: str
+    chunk_size: int
+
+    def __init__(
+        self,
+        path: str,
+        compression: str,
+        compression_level: int = None,
+        chunk_size: int = 1 << 20,
+        max_queued_chunks: int = 16,
+    ):
+        """
+        This object is a text file writer that compresses the text
+        in a background thread, so compression overlaps
+        with packing and serializing the next frames
+
+        Parameters
+        ----------
+        path : str
+            where to save the compressed file
+        compression : str
+            the codec to use, either "gzip", "zstd", or "lz4"
+        compression_level : int (optional)
+            the codec's compression level
+            Default: None (the codec's default for this writer)
+        chunk_size : int (optional)
+            the number of characters to buffer
+            before queueing them to be compressed
+            Default: 1 MiB
+        max_queued_chunks : int (optional)
+            the number of chunks that can wait to be compressed
+            before writes block, to bound memory
+            Default: 16
+        """
+        self.path = path
+        self.compression = compression
+        self.chunk_size = chunk_size
+        self._buffer = []
+        self._buffer_size = 0
+        self._error = None
+        self._file = _open_compressed_binary(path, compression, compression_level)
+        self._queue = queue.Queue(maxsize=max_queued_chunks)
+        self._thread = threading.Thread(target=self._compress, daemon=True)
+        self._thread.start()
+
+    def _compress(self):
+        """
+        Compress queued chunks until the None sentinel is received
+        """
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                if chunk is _FLUSH:
+                    self._file.flush()
+                else:
+                    self._file.write(chunk)
+            except Exception as e:
+                self._error = e
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _queue_buffer(self):
+        if self._buffer_size < 1:
+            return
+        self._queue.put("".join(self._buffer).encode("utf-8"))
+        self._buffer = []
+        self._buffer_size = 0
+
+    def write(self, text: str) -> int:
+        self._raise_error()
+        self._buffer.append(text)
+        self._buffer_size += len(text)
+        if self._buffer_size >= self.chunk_size:
+            self._queue_buffer()
+        return len(text)
+
+    def flush(self):
+        """
+        Queue the buffered text and ask the background thread to flush
+        once it is compressed, without waiting for it
+        """
+        self._raise_error()
+        self._queue_buffer()
+        self._queue.put(_FLUSH)
+
+    def close(self):
+        """
+        Compress the remaining text and close the file
+        """
+        if self._thread is None:
+            return
+        self._queue_buffer()
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args: Any):
+        self.close()
+
+
+def open_output_file(path: str, compression: str = None) -> IO[str]:
+    """
+    Open a text file for writing, compressed in a background thread
+    if a compression codec is given
+    """
+    if compression is None:
+        return open(path, "w+")
+    return CompressedFileWriter(path, compression)
+
+
+def open_input_file(path: str) -> IO[str]:
+    """
+    Open a text file for reading, transparently decompressing it
+    if it starts with the magic bytes of a supported codec
+    """
+    with open(path, "rb") as raw_file:
+        header = raw_file.read(4)
+    if header.startswith(COMPRESSION_MAGIC_BYTES["gzip"]):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if header.startswith(COMPRESSION_MAGIC_BYTES["zstd"]):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                f"{path} is zstd compressed, reading it requires zstandard, "
+                "install it with `pip install simulariumio[compression]`"
+            )
+        return io.TextIOWrapper(
+            zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True),
+            encoding="utf-8",
+        )
+    if header.startswith(COMPRESSION_MAGIC_BYTES["lz4"]):
+        try:
+            import lz4.frame
+        except ImportError:
+            raise ImportError(
+                f"{path} is lz4 compressed, reading it requires lz4, "
+                "install it with `pip install simulariumio[compression]`"
+            )
+        return lz4.frame.open(path, "rt", encoding="utf-8")
+    return open(path)
@@ -0,0 +1,401 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .compression import get_compression_extension
+from .data_objects import UnitData
+from .filters import (
+    Filter,
+    CropFilter,
+    EveryNthAgentFilter,
+    EveryNthSubpointFilter,
+    EveryNthTimestepFilter,
+    GridClusterFilter,
+    MultiplySpaceFilter,
+    MultiplyTimeFilter,
+    ReorderAgentsFilter,
+    SmoothPositionsFilter,
+    TransformSpatialAxesFilter,
+)
+from .instrumentation import ConversionStats
+from .parse_cache import ParseCache
+from .trajectory_converter import TrajectoryConverter
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+SUPPORTED_INPUT_TYPES = ["simularium", "cytosim", "readdy", "physicell"]
+
+# filters whose parameters can be written as JSON
+SUPPORTED_FILTERS = {
+    f.__name__: f
+    for f in [
+        CropFilter,
+        EveryNthAgentFilter,
+        EveryNthSubpointFilter,
+        EveryNthTimestepFilter,
+        GridClusterFilter,
+        MultiplySpaceFilter,
+        MultiplyTimeFilter,
+        ReorderAgentsFilter,
+        SmoothPositionsFilter,
+        TransformSpatialAxesFilter,
+    ]
+}
+
+SUPPORTED_OUTPUT_OPTIONS = [
+    "bundle_size",
+    "separate_files",
+    "n_processes",
+    "compression",
+    "deduplicate_static_agents",
+]
+
+# saved next to the output once a job finishes, see ConversionJob.write_record
+RECORD_EXTENSION = ".conversion.json"
+
+ARRAY_OPTIONS = ["box_size", "roi_min", "roi_max", "min_corner", "max_corner"]
+UNIT_OPTIONS = ["time_units", "spatial_units"]
+
+
+def _int_keys(value: Dict[Any, Any]) -> Dict[Any, Any]:
+    """
+    Convert the keys of a dict loaded from JSON that are integers
+    written as strings (e.g. type IDs) back to ints
+    """
+    return {
+        int(key) if isinstance(key, str) and key.lstrip("-").isdigit() else key: value
+        for key, value in value.items()
+    }
+
+
+def _get_output_paths(output_path: str, extension: str) -> List[str]:
+    """
+    Get the paths of the .simularium file and the bundle files,
+    in order, written at the output path
+    """
+    main_path = f"{output_path}.simularium{extension}"
+    bundle_paths = TrajectoryConverter._get_bundle_paths(output_path, extension)
+    return [main_path] + bundle_paths if os.path.exists(main_path) else []
+
+
+def _get_unit_data(value: Any) -> UnitData:
+    """
+    Get UnitData from a unit name or a dict with a name and magnitude
+    """
+    if isinstance(value, str):
+        return UnitData(value)
+    return UnitData(value["name"], float(value.get("magnitude", 1.0)))
+
+
+def _get_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert the JSON values of keyword arguments to the types
+    the data objects and filters expect
+    """
+    result = {}
+    for key, value in options.items():
+        if value is None:
+            result[key] = value
+        elif key in ARRAY_OPTIONS:
+            result[key] = np.array(value, dtype=float)
+        elif key in UNIT_OPTIONS:
+            result[key] = _get_unit_data(value)
+        elif key == "parse_cache":
+            result[key] = (
+                ParseCache(value) if isinstance(value, str) else ParseCache(**value)
+            )
+        elif isinstance(value, dict):
+            result[key] = _int_keys(value)
+        else:
+            result[key] = value
+    return result
+
+
+class ConversionJob:
+    input_type: str
+    input_options: Dict[str, Any]
+    output_path: str
+    filters: List[Dict[str, Any]]
+    output_options: Dict[str, Any]
+
+    def __init__(
+        self,
+        input_type: str,
+        input_options: Dict[str, Any],
+        output_path: str,
+        filters: List[Dict[str, Any]] = None,
+        output_options: Dict[str, Any] = None,
+    ):
+        """
+        This object describes one conversion with settings
+        that can be written as JSON, so it can be read from a manifest
+        or sent to another process to run
+
+        Parameters
+        ----------
+        input_type : str
+            The kind of input to convert.
+            Options: "simularium", "cytosim", "readdy", "physicell"
+        input_options : Dict[str, Any]
+            The keyword arguments for FileConverter (for "simularium",
+            e.g. input_path and stride) or for the converter's data object
+            (e.g. ReaddyData's path_to_readdy_h5 and timestep).
+            Arrays are lists, units are a name or a dict
+            with "name" and "magnitude", parse_cache is a cache directory,
+            and Cytosim's object_info maps each object type to a dict
+            with "filepath", "position_indices", and "agents",
+            which maps each type index to a dict with "name" and "radius"
+        output_path : str
+            Where to save the .simularium file
+        filters : List[Dict[str, Any]] (optional)
+            The filters to apply, in order, each a dict with
+            the filter's class name as "type" and its keyword arguments,
+            e.g. {"type": "MultiplySpaceFilter", "multiplier": 10.0}
+            Default: None (no filters)
+        output_options : Dict[str, Any] (optional)
+            The keyword arguments for TrajectoryConverter.write_JSON:
+            bundle_size, separate_files, n_processes, compression,
+            and deduplicate_static_agents
+            Default: None (write_JSON defaults)
+        """
+        if input_type not in SUPPORTED_INPUT_TYPES:
+            raise ValueError(
+                f"input type must be one of {SUPPORTED_INPUT_TYPES}, got {input_type}"
+            )
+        self.input_type = input_type
+        self.input_options = input_options
+        self.output_path = output_path
+        self.filters = filters if filters is not None else []
+        self.output_options = output_options if output_options is not None else {}
+        for filter_info in self.filters:
+            if filter_info.get("type") not in SUPPORTED_FILTERS:
+                raise ValueError(
+                    f"filter type must be one of {list(SUPPORTED_FILTERS)}, "
+                    f"got {filter_info.get('type')}"
+                )
+        for option in self.output_options:
+            if option not in SUPPORTED_OUTPUT_OPTIONS:
+                raise ValueError(
+                    f"output options must be in {SUPPORTED_OUTPUT_OPTIONS}, "
+                    f"got {option}"
+                )
+
+    @classmethod
+    def from_dict(cls, job_info: Dict[str, Any]):
+        """
+        Create a ConversionJob from a dict with "input_type",
+        "input_options", "output_path", and optionally "filters"
+        and "output_options"
+        """
+        return cls(
+            input_type=job_info["input_type"],
+            input_options=job_info["input_options"],
+            output_path=job_info["output_path"],
+            filters=job_info.get("filters"),
+            output_options=job_info.get("output_options"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the job's settings as a JSON serializable dict
+        """
+        return {
+            "input_type": self.input_type,
+            "input_options": self.input_options,
+            "output_path": self.output_path,
+            "filters": self.filters,
+            "output_options": self.output_options,
+        }
+
+    def get_input_paths(self) -> List[str]:
+        """
+        Get the paths of the files or directories the job reads
+        """
+        options = self.input_options
+        if self.input_type == "simularium":
+            return [options["input_path"]]
+        if self.input_type == "cytosim":
+            return [
+                object_info["filepath"]
+                for object_info in options["object_info"].values()
+            ]
+        if self.input_type == "readdy":
+            return [options["path_to_readdy_h5"]]
+        return [options["path_to_output_dir"]]
+
+    def get_output_paths(self) -> List[str]:
+        """
+        Get the paths of the .simularium file and any bundle files
+        the job has written
+        """
+        return _get_output_paths(self.output_path, self._get_extension())
+
+    def _get_extension(self) -> str:
+        return get_compression_extension(self.output_options.get("compression"))
+
+    def get_hash(self) -> str:
+        """
+        Get a hash of the job's settings, which changes
+        if any input, filter, or output option changes
+        """
+        job_data = json.dumps(self.to_dict(), sort_keys=True, default=str)
+        return hashlib.sha256(job_data.encode("utf-8")).hexdigest()
+
+    def get_record_path(self) -> str:
+        """
+        Get the path of the record of the finished job
+        """
+        return f"{self.output_path}{RECORD_EXTENSION}"
+
+    def write_record(self):
+        """
+        Save a record of the job's settings next to its output,
+        after the job finishes, for is_up_to_date to check
+        """
+        with open(self.get_record_path(), "w") as record_file:
+            json.dump({"jobHash": self.get_hash(), "job": self.to_dict()}, record_file)
+
+    def is_up_to_date(self) -> bool:
+        """
+        Whether the job finished with the same settings
+        (its record has the same hash), after every input file
+        was last modified, and its .simularium file still exists
+        """
+        record_path = self.get_record_path()
+        if not os.path.exists(record_path) or not self.get_output_paths():
+            return False
+        try:
+            with open(record_path) as record_file:
+                record = json.load(record_file)
+        except (OSError, ValueError):
+            return False
+        if record.get("jobHash") != self.get_hash():
+            return False
+        record_time = os.path.getmtime(record_path)
+        for input_path in self.get_input_paths():
+            if not os.path.exists(input_path):
+                return False
+            for file_path in ParseCache._get_file_paths(input_path):
+                if os.path.getmtime(file_path) > record_time:
+                    return False
+        return True
+
+    def remove_output_files(self):
+        """
+        Remove the .simularium file, bundle files, and the record
+        of the job
+        """
+        record_path = self.get_record_path()
+        if os.path.exists(record_path):
+            os.remove(record_path)
+        TrajectoryConverter._remove_output_files(
+            self.output_path, self._get_extension()
+        )
+
+    def get_filters(self) -> List[Filter]:
+        """
+        Create the job's filters
+        """
+        result = []
+        for filter_info in self.filters:
+            options = {
+                key: value for key, value in filter_info.items() if key != "type"
+            }
+            result.append(
+                SUPPORTED_FILTERS[filter_info["type"]](**_get_options(options))
+            )
+        return result
+
+    def get_converter(self, stats: ConversionStats = None) -> TrajectoryConverter:
+        """
+        Read the job's input with the converter for its input type
+        """
+        options = _get_options(self.input_options)
+        if self.input_type == "simularium":
+            from .file_converter import FileConverter
+
+            return FileConverter(**options, stats=stats)
+        # workers run many jobs, so don't share the data objects' default
+        # plots list between them
+        options.setdefault("plots", [])
+        if self.input_type == "cytosim":
+            from .cytosim import (
+                CytosimConverter,
+                CytosimData,
+                CytosimObjectInfo,
+                CytosimAgentInfo,
+            )
+
+            options["object_info"] = {
+                object_type: CytosimObjectInfo(
+                    filepath=object_info["filepath"],
+                    agents={
+                        int(type_index): CytosimAgentInfo(**agent_info)
+                        for type_index, agent_info in object_info.get(
+                            "agents", {}
+                        ).items()
+                    },
+                    position_indices=object_info.get("position_indices", [2, 3, 4]),
+                )
+                for object_type, object_info in self.input_options[
+                    "object_info"
+                ].items()
+            }
+            return CytosimConverter(CytosimData(**options), stats=stats)
+        if self.input_type == "readdy":
+            from .readdy import ReaddyConverter, ReaddyData
+
+            return ReaddyConverter(ReaddyData(**options), stats=stats)
+        from .physicell import PhysicellConverter, PhysicellData
+
+        if options.get("types") is not None:
+            options["types"] = {
+                type_id: _int_keys(type_info)
+                for type_id, type_info in options["types"].items()
+            }
+        return PhysicellConverter(PhysicellData(**options), stats=stats)
+
+    def run(self, stats: ConversionStats = None) -> List[str]:
+        """
+        Read, filter, and write the data, return the paths written.
+        The files are written to a temporary directory next to the output
+        and moved to the output path once they are all written,
+        so a job that is stopped partway doesn't leave
+        a partly written file at the output path
+        """
+        if stats is None:
+            stats = ConversionStats()
+        log.info(f"Converting {self.input_type} to {self.output_path}")
+        output_dir = os.path.dirname(os.path.abspath(self.output_path))
+        os.makedirs(output_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix=".simulariumio-", dir=output_dir)
+        try:
+            converter = self.get_converter(stats)
+            filters = self.get_filters()
+            data = converter._data if not filters else converter.filter_data(filters)
+            temp_path = os.path.join(temp_dir, os.path.basename(self.output_path))
+            TrajectoryConverter.write_external_JSON(
+                data, temp_path, **self.output_options, stats=stats
+            )
+            self.remove_output_files()
+            # the .simularium file is moved last, since it's what
+            # get_output_paths looks for
+            temp_paths = _get_output_paths(temp_path, self._get_extension())
+            for path in temp_paths[1:] + temp_paths[:1]:
+                os.replace(path, os.path.join(output_dir, os.path.basename(path)))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return self.get_output_paths()
@@ -8,9 +8,11 @@ import sys
 import numpy as np
 
 from ..trajectory_converter import TrajectoryConverter
+from ..instrumentation import ConversionStats
 from ..data_objects import TrajectoryData, AgentData, UnitData
 from ..exceptions import DataError
 from ..constants import VIZ_TYPE
+from ..filters import CropFilter
 from .cytosim_data import CytosimData
 from .cytosim_object_info import CytosimObjectInfo
 
@@ -22,7 +24,7 @@ log = logging.getLogger(__name__)
 
 
 class CytosimConverter(TrajectoryConverter):
-    def __init__(self, input_data: CytosimData):
+    def __init__(self, input_data: CytosimData, stats: ConversionStats = None):
         """
         This object reads simulation trajectory outputs
         from CytoSim (https://gitlab.com/f.nedelec/cytosim)
@@ -34,8 +36,16 @@ class CytosimConverter(TrajectoryConverter):
         input_data : CytosimData
             An object containing info for reading
             Cytosim simulation trajectory outputs and plot data
+        stats : ConversionStats (optional)
+            Measures each stage of the conversion, reports progress,
+            and can cancel the conversion
+            Default: None (a new ConversionStats)
         """
-        self._data = self._read(input_data)
+        self.stats = stats if stats is not None else ConversionStats()
+        with self.stats.stage("parse") as stage:
+            self._data = self._read(input_data)
+            stage.count(self._data.agent_data)
+        self.stats.report("parse", stage.n_frames, stage.n_frames)
 
     def _ignore_line(self, line: str) -> bool:
         """
@@ -43,6 +53,95 @@ class CytosimConverter(TrajectoryConverter):
         """
         return len(line) < 1 or line[0:7] == "warning" or "report" in line
 
+    def _select_frames(
+        self, data_lines: List[str], input_data: CytosimData
+    ) -> List[str]:
+        """
+        Get the lines of a Cytosim output file for only the frames
+        from start_time to end_time, keeping every stride-th frame,
+        without parsing the data in the frames
+        """
+        if (
+            input_data.start_time is None
+            and input_data.end_time is None
+            and input_data.stride == 1
+        ):
+            return data_lines
+        header = []
+        frames = []
+        times = []
+        for line in data_lines:
+            if len(line) > 0 and line[0] == "%" and "frame" in line:
+                frames.append([])
+                times.append(0.0)
+            if len(frames) < 1:
+                header.append(line)
+                continue
+            frames[-1].append(line)
+            if len(line) > 0 and line[0] == "%" and "time" in line:
+                times[-1] = float(line.split()[2])
+        result = header
+        for t in TrajectoryConverter._get_frame_indices(
+            times, input_data.start_time, input_data.end_time, input_data.stride
+        ):
+            result += frames[t]
+        return result
+
+    def _crop_objects(
+        self,
+        data_lines: List[str],
+        is_fiber: bool,
+        position_indices: List[int],
+        crop_filter: CropFilter,
+    ) -> List[str]:
+        """
+        Remove the lines for objects outside the region of interest
+        from a Cytosim output file, so they aren't counted or parsed.
+        Fibers are removed if any of their points are outside it
+        """
+        # the object each line belongs to, or -1 for frame metadata
+        line_objects = np.full(len(data_lines), -1)
+        point_objects = []
+        points = []
+        n_objects = 0
+        current_object = -1
+        for i, line in enumerate(data_lines):
+            if self._ignore_line(line):
+                continue
+            columns = line.split()
+            if line[0] == "%":
+                current_object = -1
+                if is_fiber and len(columns) > 1 and "fiber" in columns[1]:
+                    current_object = n_objects
+                    line_objects[i] = current_object
+                    n_objects += 1
+                continue
+            if not is_fiber:
+                current_object = n_objects
+                n_objects += 1
+            if current_object < 0:
+                continue
+            line_objects[i] = current_object
+            point_objects.append(current_object)
+            points.append(
+                [
+                    float(columns[ix].strip("+,"))
+                    for ix in ([1, 2, 3] if is_fiber else position_indices)
+                ]
+            )
+        # keep objects with all their points inside the region
+        keep = np.ones(n_objects, dtype=bool)
+        np.logical_and.at(
+            keep,
+            np.array(point_objects, dtype=int),
+            crop_filter.in_box(np.reshape(np.array(points), (-1, 3))),
+        )
+        return [
+            line
+            for i, line in enumerate(data_lines)
+            if line_objects[i] < 0 or keep[line_objects[i]]
+        ]
+
     def _parse_object_type_dimensions(
         self,
         data_lines: List[str],
@@ -113,9 +212,8 @@ class CytosimConverter(TrajectoryConverter):
         data_columns: List[str],
         t: int,
         n: int,
-        scale_factor: float,
-        object_info: CytosimObjectInfo,
         result: AgentData,
+        raw_type_ids: np.ndarray,
         uids: Dict[int, int],
         used_unique_IDs: List[int],
         types: Dict[int, int],
@@ -149,41 +247,35 @@ class CytosimConverter(TrajectoryConverter):
         else:
             tid = types[raw_tid]
         result.type_ids[t][n] = tid
-        # type name
-        while n >= len(result.types[t]):
-            result.types[t].append("")
-        if raw_tid in object_info.agents:
-            result.types[t][n] = object_info.agents[raw_tid].name
-        else:
-            result.types[t][n] = object_type[:-1] + str(raw_tid)
-        # radius
-        result.radii[t][n] = (
-            (scale_factor * float(object_info.agents[raw_tid].radius))
-            if raw_tid in object_info.agents
-            else 1.0
-        )
+        # type index in Cytosim data, for display names and radii
+        raw_type_ids[t][n] = raw_tid
         return (result, uids, used_unique_IDs, types, used_type_IDs)
 
     def _parse_objects(
         self,
         object_type: str,
+        object_type_index: int,
         data_lines: List[str],
-        scale_factor: float,
         object_info: CytosimObjectInfo,
         result: AgentData,
+        raw_type_ids: np.ndarray,
+        object_type_ids: np.ndarray,
         used_unique_IDs: List[int],
         used_type_IDs: List[int],
     ) -> Tuple[Dict[str, Any], List[int], List[int]]:
         """
         Parse a Cytosim output file containing objects
-        (fibers, solids, singles, or couples) to get agents
+        (fibers, solids, singles, or couples) to get agents,
+        positions are in Cytosim's units (not scaled)
         """
         t = -1
         n = -1
         s = -1
         n_other_agents = 0
+        # times are only parsed from the first object type,
+        # the last time is still 0 until they are parsed
         parse_time = (
-            result.times.size > 1 and float(result.times[1]) < sys.float_info.epsilon
+            result.times.size > 0 and float(result.times[-1]) < sys.float_info.epsilon
         )
         types = {}
         uids = {}
@@ -195,6 +287,7 @@ class CytosimConverter(TrajectoryConverter):
             if line[0] == "%":
                 if "frame" in line:
                     # start of frame
+                    self.stats.check_cancelled("parse")
                     t += 1
                     n_other_agents = int(result.n_agents[t])
                     n = -1
@@ -218,9 +311,8 @@ class CytosimConverter(TrajectoryConverter):
                         columns,
                         t,
                         n_other_agents + n,
-                        scale_factor,
-                        object_info,
                         result,
+                        raw_type_ids,
                         uids,
                         used_unique_IDs,
                         types,
@@ -230,13 +322,16 @@ class CytosimConverter(TrajectoryConverter):
                     # end of frame
                     if is_fiber:
                         result.n_subpoints[t][n_other_agents + n] = s + 1
+                    object_type_ids[t][n_other_agents : n_other_agents + n + 1] = (
+                        object_type_index
+                    )
                     result.n_agents[t] += n + 1
                 continue
             elif is_fiber:
                 # each fiber point
                 s += 1
                 # position
-                result.subpoints[t][n_other_agents + n][s] = scale_factor * np.array(
+                result.subpoints[t][n_other_agents + n][s] = np.array(
                     [
                         float(columns[1].strip("+,")),
                         float(columns[2].strip("+,")),
@@ -257,36 +352,50 @@ class CytosimConverter(TrajectoryConverter):
                     columns,
                     t,
                     n_other_agents + n,
-                    scale_factor,
-                    object_info,
                     result,
+                    raw_type_ids,
                     uids,
                     used_unique_IDs,
                     types,
                     used_type_IDs,
                 )
                 # position
-                result.positions[t][n_other_agents + n] = scale_factor * (
-                    np.array(
-                        [
-                            float(columns[object_info.position_indices[0]].strip("+,")),
-                            float(columns[object_info.position_indices[1]].strip("+,")),
-                            float(columns[object_info.position_indices[2]].strip("+,")),
-                        ]
-                    )
+                result.positions[t][n_other_agents + n] = np.array(
+                    [
+                        float(columns[object_info.position_indices[0]].strip("+,")),
+                        float(columns[object_info.position_indices[1]].strip("+,")),
+                        float(columns[object_info.position_indices[2]].strip("+,")),
+                    ]
                 )
         return (result, used_unique_IDs, used_type_IDs)
 
-    def _read(self, input_data: CytosimData) -> TrajectoryData:
+    def _parse_data(
+        self, input_data: CytosimData
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
         """
-        Return a TrajectoryData object containing the CytoSim data
+        Parse the Cytosim output files into arrays of agent data
+        that don't depend on display names, radii, or scale,
+        only for the frames from start_time to end_time
+        and the objects inside the region of interest
         """
-        print("Reading Cytosim Data -------------")
         # load the data from Cytosim output .txt files
+        crop_filter = TrajectoryConverter._get_crop_filter(
+            input_data.roi_min, input_data.roi_max
+        )
         cytosim_data = {}
         for object_type in input_data.object_info:
+            self.stats.check_cancelled("parse")
             with open(input_data.object_info[object_type].filepath, "r") as myfile:
-                cytosim_data[object_type] = myfile.read().split("\n")
+                cytosim_data[object_type] = self._select_frames(
+                    myfile.read().split("\n"), input_data
+                )
+            if crop_filter is not None:
+                cytosim_data[object_type] = self._crop_objects(
+                    cytosim_data[object_type],
+                    "fiber" in object_type,
+                    input_data.object_info[object_type].position_indices,
+                    crop_filter,
+                )
         # parse
         (totalSteps, max_agents, max_subpoints) = self._parse_dimensions(cytosim_data)
         agent_data = AgentData(
@@ -299,24 +408,132 @@ class CytosimConverter(TrajectoryConverter):
             radii=np.ones((totalSteps, max_agents)),
             n_subpoints=np.zeros((totalSteps, max_agents)),
             subpoints=np.zeros((totalSteps, max_agents, max_subpoints, 3)),
-            draw_fiber_points=input_data.draw_fiber_points,
         )
         agent_data.type_ids = np.zeros((totalSteps, max_agents))
+        raw_type_ids = np.zeros((totalSteps, max_agents))
+        object_type_ids = np.zeros((totalSteps, max_agents))
         uids = []
         types = []
-        for object_type in input_data.object_info:
+        for object_type_index, object_type in enumerate(input_data.object_info):
             agent_data, uids, types = self._parse_objects(
                 object_type,
+                object_type_index,
                 cytosim_data[object_type],
-                input_data.scale_factor,
                 input_data.object_info[object_type],
                 agent_data,
+                raw_type_ids,
+                object_type_ids,
                 uids,
                 types,
             )
+        return (
+            {
+                "times": agent_data.times,
+                "n_agents": agent_data.n_agents,
+                "viz_types": agent_data.viz_types,
+                "unique_ids": agent_data.unique_ids,
+                "type_ids": agent_data.type_ids,
+                "positions": agent_data.positions,
+                "n_subpoints": agent_data.n_subpoints,
+                "subpoints": agent_data.subpoints,
+                "raw_type_ids": raw_type_ids,
+                "object_type_ids": object_type_ids,
+            },
+            {},
+        )
+
+    @staticmethod
+    def _get_agent_data(
+        parsed_data: Dict[str, np.ndarray], input_data: CytosimData
+    ) -> AgentData:
+        """
+        Create AgentData from the parsed Cytosim arrays,
+        adding the display names, radii, and scale
+        """
+        object_types = list(input_data.object_info.keys())
+        n_agents = parsed_data["n_agents"].astype(int)
+        total_steps = n_agents.size
+        radii = np.ones_like(parsed_data["unique_ids"])
+        types = [[] for t in range(total_steps)]
+        display_info = {}
+        for t in range(total_steps):
+            for n in range(n_agents[t]):
+                key = (
+                    int(parsed_data["object_type_ids"][t][n]),
+                    int(parsed_data["raw_type_ids"][t][n]),
+                )
+                if key not in display_info:
+                    object_type = object_types[key[0]]
+                    agents = input_data.object_info[object_type].agents
+                    display_info[key] = (
+                        (
+                            agents[key[1]].name,
+                            input_data.scale_factor * float(agents[key[1]].radius),
+                        )
+                        if key[1] in agents
+                        else (object_type[:-1] + str(key[1]), 1.0)
+                    )
+                types[t].append(display_info[key][0])
+                radii[t][n] = display_info[key][1]
+        return AgentData(
+            times=parsed_data["times"],
+            n_agents=parsed_data["n_agents"],
+            viz_types=parsed_data["viz_types"],
+            unique_ids=parsed_data["unique_ids"],
+            types=types,
+            positions=input_data.scale_factor * parsed_data["positions"],
+            radii=radii,
+            n_subpoints=parsed_data["n_subpoints"],
+            subpoints=input_data.scale_factor * parsed_data["subpoints"],
+            draw_fiber_points=input_data.draw_fiber_points,
+            type_ids=parsed_data["type_ids"],
+        )
+
+    def _read(self, input_data: CytosimData) -> TrajectoryData:
+        """
+        Return a TrajectoryData object containing the CytoSim data
+        """
+        log.info("Reading Cytosim Data")
+        crop_filter = TrajectoryConverter._get_crop_filter(
+            input_data.roi_min, input_data.roi_max
+        )
+        if input_data.parse_cache is None:
+            parsed_data, metadata = self._parse_data(input_data)
+        else:
+            parsed_data, metadata = input_data.parse_cache.load_or_parse(
+                [
+                    input_data.object_info[object_type].filepath
+                    for object_type in input_data.object_info
+                ],
+                {
+                    "converter": "cytosim",
+                    "position_indices": {
+                        object_type: list(
+                            input_data.object_info[object_type].position_indices
+                        )
+                        for object_type in input_data.object_info
+                    },
+                    "start_time": input_data.start_time,
+                    "end_time": input_data.end_time,
+                    "stride": input_data.stride,
+                    "roi": (
+                        None
+                        if crop_filter is None
+                        else [
+                            crop_filter.min_corner.tolist(),
+                            crop_filter.max_corner.tolist(),
+                        ]
+                    ),
+                },
+                lambda: self._parse_data(input_data),
+            )
+        agent_data = CytosimConverter._get_agent_data(parsed_data, input_data)
+        box_size = input_data.box_size
+        if crop_filter is not None:
+            box_size = crop_filter.get_box_size(box_size)
         # create TrajectoryData
         return TrajectoryData(
-            box_size=input_data.scale_factor * input_data.box_size,
+            box_size=input_data.scale_factor * box_size,
             agent_data=agent_data,
             time_units=UnitData("s"),
             spatial_units=UnitData("µm", 1.0 / input_data.scale_factor),
@@ -6,6 +6,7 @@ from typing import Any, Dict, List
 
 import numpy as np
 
+from ..parse_cache import ParseCache
 from .cytosim_object_info import CytosimObjectInfo
 
 ###############################################################################
@@ -21,6 +22,12 @@ class CytosimData:
     draw_fiber_points: bool
     scale_factor: float
     plots: List[Dict[str, Any]]
+    parse_cache: ParseCache
+    start_time: float
+    end_time: float
+    stride: int
+    roi_min: np.ndarray
+    roi_max: np.ndarray
 
     def __init__(
         self,
@@ -29,6 +36,12 @@ class CytosimData:
         draw_fiber_points: bool = False,
         scale_factor: float = 1.0,
         plots: List[Dict[str, Any]] = [],
+        parse_cache: ParseCache = None,
+        start_time: float = None,
+        end_time: float = None,
+        stride: int = 1,
+        roi_min: np.ndarray = None,
+        roi_max: np.ndarray = None,
     ):
         """
         This object holds simulation trajectory outputs
@@ -57,9 +70,39 @@ class CytosimData:
         plots : List[Dict[str, Any]] (optional)
             An object containing plot data already
             in Simularium format
+        parse_cache : ParseCache (optional)
+            A cache of parsed Cytosim data, used to skip parsing
+            the output files again if they and the position_indices
+            haven't changed
+            Default: None (always parse)
+        start_time : float (optional)
+            Only read frames at or after this time,
+            frames before it are skipped without being parsed
+            Default: None (start at the first frame)
+        end_time : float (optional)
+            Only read frames at or before this time
+            Default: None (end at the last frame)
+        stride : int (optional)
+            Only read every nth frame from start_time to end_time
+            Default: 1 (read every frame)
+        roi_min : np.ndarray (shape = [3]) (optional)
+            Only read agents inside the region from roi_min to roi_max,
+            in the same units as box_size. Agents outside it
+            (or fibers with any point outside it) are dropped
+            before the agent data arrays are allocated
+            Default: None (no minimum)
+        roi_max : np.ndarray (shape = [3]) (optional)
+            The maximum XYZ coordinates of the region to read
+            Default: None (no maximum)
         """
         self.box_size = box_size
         self.object_info = object_info
         self.draw_fiber_points = draw_fiber_points
         self.scale_factor = scale_factor
         self.plots = plots
+        self.parse_cache = parse_cache
+        self.start_time = start_time
+        self.end_time = end_time
+        self.stride = stride
+        self.roi_min = roi_min
+        self.roi_max = roi_max
@@ -4,5 +4,8 @@
 from .agent_data import AgentData  # noqa: F401
 from .trajectory_data import TrajectoryData  # noqa: F401
 from .unit_data import UnitData  # noqa: F401
+from .histogram_bins import HistogramBins  # noqa: F401
 from .histogram_plot_data import HistogramPlotData  # noqa: F401
 from .scatter_plot_data import ScatterPlotData  # noqa: F401
+from .precision_data import PrecisionData  # noqa: F401
+from .spatial_index import SpatialIndex  # noqa: F401
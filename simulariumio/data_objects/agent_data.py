@@ -3,14 +3,18 @@
 from __future__ import annotations
 
 import copy
+import json
 import logging
+import os
 from typing import List, Tuple, Dict, Any
 import math
 
 import numpy as np
 
 from ..constants import V1_SPATIAL_BUFFER_STRUCT
+from ..delta_encoding import DeltaEncoding
 from ..exceptions import DataError
+from .spatial_index import SpatialIndex
 
 ###############################################################################
 
@@ -18,6 +22,22 @@ log = logging.getLogger(__name__)
 
 ###############################################################################
 
+# array fields saved as .npy files by AgentData.save
+ARRAY_FIELDS = [
+    "times",
+    "n_agents",
+    "viz_types",
+    "unique_ids",
+    "positions",
+    "radii",
+    "n_subpoints",
+    "subpoints",
+    "type_ids",
+]
+INFO_FILE_NAME = "agent_data.json"
+
+###############################################################################
+
 
 class AgentData:
     times: np.ndarray
@@ -105,6 +125,7 @@ class AgentData:
         self.draw_fiber_points = draw_fiber_points
         self.type_ids = type_ids
         self.type_mapping = None
+        self._clear_spatial_indices()
 
     @staticmethod
     def _get_buffer_data_dimensions(buffer_data: Dict[str, Any]) -> Tuple[int]:
@@ -185,16 +206,64 @@ class AgentData:
                 result[t].append(type_mapping[str(int(type_ids[t][n]))]["name"])
         return result
 
+    def get_type_mapping(self) -> Dict[str, Any]:
+        """
+        Get the mapping of type ID (as a string) to display data
+        for the agents, generating type IDs if they aren't set
+        """
+        if self.type_ids is None:
+            self.type_ids, self.type_mapping = AgentData.get_type_ids_and_mapping(
+                self.types
+            )
+        if self.type_mapping is None:
+            # get the name for each type ID from the first agent with it
+            valid = (
+                np.arange(self.type_ids.shape[1])[np.newaxis, :]
+                < self.n_agents.astype(int)[:, np.newaxis]
+            )
+            type_ids, first_ix = np.unique(
+                self.type_ids[valid].astype(int), return_index=True
+            )
+            time_ix, agent_ix = np.nonzero(valid)
+            self.type_mapping = {
+                str(type_id): {"name": self.types[time_ix[i]][agent_ix[i]]}
+                for type_id, i in zip(type_ids, first_ix)
+            }
+        return self.type_mapping
+
+    @staticmethod
+    def _add_static_data_to_frames(buffer_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return a copy of simularium JSON data with the agents
+        in the spatialData's staticData appended to every frame
+        """
+        static_data = buffer_data["spatialData"].get("staticData")
+        if static_data is None:
+            return buffer_data
+        result = copy.copy(buffer_data)
+        result["spatialData"] = copy.copy(buffer_data["spatialData"])
+        result["spatialData"].pop("staticData")
+        result["spatialData"]["bundleData"] = [
+            dict(frame, data=list(frame["data"]) + list(static_data))
+            for frame in buffer_data["spatialData"]["bundleData"]
+        ]
+        return result
+
     @classmethod
     def from_buffer_data(cls, buffer_data: Dict[str, Any]):
         """
-        Create AgentData from a simularium JSON dict containing buffers
+        Create AgentData from a simularium JSON dict containing buffers,
+        decoding delta encoded spatial data and adding static agents
+        to every frame if needed
         """
+        buffer_data = AgentData._add_static_data_to_frames(
+            DeltaEncoding.decode_buffer_data(buffer_data)
+        )
         bundle_data = buffer_data["spatialData"]["bundleData"]
         total_steps, max_agents, max_subpoints = AgentData._get_buffer_data_dimensions(
             buffer_data
         )
-        print(
+        log.info(
             f"original dim = {total_steps} timesteps X "
             f"{max_agents} agents X {max_subpoints} subpoints"
         )
@@ -269,6 +338,358 @@ class AgentData:
             type_ids=type_ids,
         )
 
+    @staticmethod
+    def _get_collision_free_uids(
+        used_uids: np.ndarray, new_uids: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Map each of the new unique IDs to an ID that isn't used yet,
+        new IDs that don't collide with used IDs are kept unchanged,
+        returns the sorted unique new IDs and the ID each should become
+        """
+        raw_uids = np.unique(new_uids)
+        result_uids = np.copy(raw_uids)
+        collisions = np.isin(raw_uids, used_uids)
+        n_collisions = int(np.count_nonzero(collisions))
+        if n_collisions > 0:
+            max_uid = max(
+                np.amax(used_uids) if used_uids.size > 0 else 0,
+                np.amax(raw_uids),
+            )
+            result_uids[collisions] = max_uid + 1 + np.arange(n_collisions)
+        return raw_uids, result_uids
+
+    @staticmethod
+    def _merge_frames(
+        current: np.ndarray,
+        n_current: np.ndarray,
+        new: np.ndarray,
+        n_new: np.ndarray,
+        fill_value: float = 0.0,
+    ) -> np.ndarray:
+        """
+        Combine two arrays with shape [timesteps, agents, ...]
+        so that in each frame the new agents are packed
+        directly after the current agents
+        """
+        max_current = int(np.amax(n_current)) if n_current.size > 0 else 0
+        max_new = int(np.amax(n_new)) if n_new.size > 0 else 0
+        extra_dims = tuple(
+            max(current.shape[d], new.shape[d]) for d in range(2, current.ndim)
+        )
+        result = np.full(
+            (n_current.size, max_current + max_new) + extra_dims, fill_value
+        )
+        for data, n_agents, max_agents, offset in [
+            (current, n_current, max_current, np.zeros_like(n_current)),
+            (new, n_new, max_new, n_current),
+        ]:
+            time_ix, agent_ix = np.nonzero(
+                np.arange(max_agents)[np.newaxis, :] < n_agents[:, np.newaxis]
+            )
+            result[
+                (time_ix, offset[time_ix] + agent_ix)
+                + tuple(slice(0, d) for d in data.shape[2:])
+            ] = data[time_ix, agent_ix]
+        return result
+
+    @staticmethod
+    def _get_agent_indices(frame_uids: np.ndarray, uids: np.ndarray) -> np.ndarray:
+        """
+        Get the index of each unique ID in one frame's unique IDs,
+        or -1 if it isn't in the frame
+        """
+        if frame_uids.size < 1:
+            return np.full(uids.size, -1)
+        sorter = np.argsort(frame_uids)
+        ix = np.minimum(
+            np.searchsorted(frame_uids, uids, sorter=sorter), frame_uids.size - 1
+        )
+        return np.where(frame_uids[sorter[ix]] == uids, sorter[ix], -1)
+
+    def _agents_are_unchanged(
+        self, t0: int, agents0: np.ndarray, t1: int, agents1: np.ndarray
+    ) -> np.ndarray:
+        """
+        Check whether each agent at frame t0 has the same viz type, type ID,
+        position, radius, and subpoints as the matching agent at frame t1
+        """
+        result = (
+            (self.viz_types[t0][agents0] == self.viz_types[t1][agents1])
+            & (self.type_ids[t0][agents0] == self.type_ids[t1][agents1])
+            & np.all(
+                self.positions[t0][agents0] == self.positions[t1][agents1], axis=1
+            )
+            & (self.radii[t0][agents0] == self.radii[t1][agents1])
+        )
+        if self.n_subpoints is not None:
+            result &= self.n_subpoints[t0][agents0] == self.n_subpoints[t1][agents1]
+        if self.subpoints is not None:
+            result &= np.all(
+                np.reshape(
+                    self.subpoints[t0][agents0] == self.subpoints[t1][agents1],
+                    (agents0.size, -1),
+                ),
+                axis=1,
+            )
+        return result
+
+    def get_static_agent_mask(self) -> np.ndarray:
+        """
+        Get a mask with shape [timesteps, agents] that is True for agents
+        whose unique ID is in every frame with the same viz type, type ID,
+        position, radius, and subpoints. type_ids must already be set
+        """
+        total_steps = self.times.size
+        n_agents = self.n_agents.astype(int)
+        valid = (
+            np.arange(self.unique_ids.shape[1])[np.newaxis, :] < n_agents[:, np.newaxis]
+        )
+        if total_steps < 2:
+            return np.zeros_like(valid)
+        static_uids = np.unique(self.unique_ids[0][: n_agents[0]])
+        for t in range(1, total_steps):
+            if static_uids.size < 1:
+                break
+            previous_ix = AgentData._get_agent_indices(
+                self.unique_ids[t - 1][: n_agents[t - 1]], static_uids
+            )
+            current_ix = AgentData._get_agent_indices(
+                self.unique_ids[t][: n_agents[t]], static_uids
+            )
+            present = current_ix >= 0
+            unchanged = self._agents_are_unchanged(
+                t - 1, previous_ix[present], t, current_ix[present]
+            )
+            static_uids = static_uids[present][unchanged]
+        return valid & np.isin(self.unique_ids, static_uids)
+
+    @staticmethod
+    def _get_packed_order(
+        mask: np.ndarray, n_agents: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the order of agents in each frame that packs the agents
+        where the mask with shape [timesteps, agents] is True
+        at the start of the frame in their original order,
+        and which of the packed slots hold an agent
+        """
+        mask = mask & (
+            np.arange(mask.shape[1])[np.newaxis, :]
+            < n_agents.astype(int)[:, np.newaxis]
+        )
+        order = np.argsort(~mask, axis=1, kind="stable")
+        n_kept = np.count_nonzero(mask, axis=1)
+        max_agents = int(np.amax(n_kept)) if n_kept.size > 0 else 0
+        keep = np.arange(max_agents)[np.newaxis, :] < n_kept[:, np.newaxis]
+        return order, keep
+
+    @staticmethod
+    def _pack_agents(
+        array: np.ndarray,
+        order: np.ndarray,
+        keep: np.ndarray,
+        fill_value: float = 0.0,
+    ) -> np.ndarray:
+        """
+        Reorder an array with shape [timesteps, agents, ...]
+        by the order from _get_packed_order, and fill the empty slots
+        """
+        if array is None:
+            return None
+        ix = np.reshape(order, order.shape + (1,) * (array.ndim - 2))
+        result = np.take_along_axis(array, ix, axis=1)[:, : keep.shape[1]]
+        result[~keep] = fill_value
+        return result
+
+    def _clear_spatial_indices(self):
+        self._spatial_indices = {}
+        self._indexed_arrays = (self.positions, self.n_agents)
+
+    @staticmethod
+    def _get_default_cell_size(positions: np.ndarray) -> float:
+        """
+        Get a grid cell size for positions with shape [agents, 3]
+        so each cell has about one agent if they're evenly spread
+        """
+        if positions.shape[0] < 1:
+            return 1.0
+        extent = float(np.amax(np.ptp(positions, axis=0)))
+        if extent <= 0:
+            return 1.0
+        return extent / max(1.0, np.cbrt(positions.shape[0]))
+
+    def get_spatial_index(
+        self, time_index: int, cell_size: float = None
+    ) -> SpatialIndex:
+        """
+        Get a uniform grid index over the positions of the agents
+        at a timestep, for box and radius queries. Each index
+        is built the first time it's requested and cached until
+        the positions or n_agents arrays are replaced
+        (changing them in place doesn't clear the cache)
+
+        Parameters
+        ----------
+        time_index : int
+            The index of the timestep to index
+        cell_size : float (optional)
+            The size of the grid cells
+            Default: None (about one agent per cell)
+        """
+        if (
+            self._indexed_arrays[0] is not self.positions
+            or self._indexed_arrays[1] is not self.n_agents
+        ):
+            self._clear_spatial_indices()
+        positions = self.positions[time_index, : int(self.n_agents[time_index])]
+        if cell_size is None:
+            cell_size = AgentData._get_default_cell_size(positions)
+        key = (time_index, cell_size)
+        if key not in self._spatial_indices:
+            self._spatial_indices[key] = SpatialIndex(positions, cell_size)
+        return self._spatial_indices[key]
+
+    def get_agent_subset(self, mask: np.ndarray) -> AgentData:
+        """
+        Return new AgentData with only the agents where the mask
+        with shape [timesteps, agents] is True, packed at the start
+        of each frame in their original order
+        """
+        mask = mask & (
+            np.arange(mask.shape[1])[np.newaxis, :]
+            < self.n_agents.astype(int)[:, np.newaxis]
+        )
+        order, keep = AgentData._get_packed_order(mask, self.n_agents)
+
+        def take(array: np.ndarray, fill_value: float = 0.0) -> np.ndarray:
+            return AgentData._pack_agents(array, order, keep, fill_value)
+
+        result = AgentData(
+            times=np.copy(self.times),
+            n_agents=np.count_nonzero(keep, axis=1).astype(self.n_agents.dtype),
+            viz_types=take(self.viz_types),
+            unique_ids=take(self.unique_ids),
+            types=[
+                [self.types[t][n] for n in np.nonzero(mask[t])[0]]
+                for t in range(self.times.size)
+            ],
+            positions=take(self.positions),
+            radii=take(self.radii, 1.0),
+            n_subpoints=take(self.n_subpoints),
+            subpoints=take(self.subpoints),
+            draw_fiber_points=self.draw_fiber_points,
+            type_ids=take(self.type_ids),
+        )
+        result.type_mapping = self.type_mapping
+        return result
+
+    def get_frames(self, start: int, end: int) -> AgentData:
+        """
+        Return new AgentData with copies of the frames
+        from start up to (not including) end
+        """
+
+        def take(array: np.ndarray) -> np.ndarray:
+            return None if array is None else np.array(array[start:end])
+
+        result = AgentData(
+            times=take(self.times),
+            n_agents=take(self.n_agents),
+            viz_types=take(self.viz_types),
+            unique_ids=take(self.unique_ids),
+            types=[list(frame_types) for frame_types in self.types[start:end]],
+            positions=take(self.positions),
+            radii=take(self.radii),
+            n_subpoints=take(self.n_subpoints),
+            subpoints=take(self.subpoints),
+            draw_fiber_points=self.draw_fiber_points,
+            type_ids=take(self.type_ids),
+        )
+        result.type_mapping = self.type_mapping
+        return result
+
+    @staticmethod
+    def _concatenate_arrays(
+        arrays: List[np.ndarray], fill_value: float = 0.0
+    ) -> np.ndarray:
+        """
+        Stack arrays with shape [timesteps, agents, ...] along the timesteps,
+        padding the other dimensions to the largest size
+        """
+        shape = tuple(
+            max(array.shape[d] for array in arrays) for d in range(1, arrays[0].ndim)
+        )
+        result = np.full((sum(array.shape[0] for array in arrays),) + shape, fill_value)
+        start = 0
+        for array in arrays:
+            end = start + array.shape[0]
+            index = (slice(start, end),) + tuple(slice(0, d) for d in array.shape[1:])
+            result[index] = array
+            start = end
+        return result
+
+    @staticmethod
+    def concatenate_frames(agent_data: List[AgentData]) -> AgentData:
+        """
+        Return new AgentData with the frames of each AgentData in order,
+        type IDs are only kept if every AgentData has them
+        """
+        if len(agent_data) < 1:
+            raise DataError("no agent data to concatenate")
+
+        def stack(name: str, fill_value: float = 0.0) -> np.ndarray:
+            return AgentData._concatenate_arrays(
+                [getattr(data, name) for data in agent_data], fill_value
+            )
+
+        has_subpoints = any(data.subpoints is not None for data in agent_data)
+        if has_subpoints:
+            subpoint_arrays = [
+                (
+                    data.subpoints
+                    if data.subpoints is not None
+                    else np.zeros(data.positions.shape[:2] + (0, 3))
+                )
+                for data in agent_data
+            ]
+            n_subpoint_arrays = [
+                (
+                    data.n_subpoints
+                    if data.n_subpoints is not None
+                    else np.zeros(data.positions.shape[:2])
+                )
+                for data in agent_data
+            ]
+        result = AgentData(
+            times=np.concatenate([data.times for data in agent_data]),
+            n_agents=np.concatenate([data.n_agents for data in agent_data]),
+            viz_types=stack("viz_types"),
+            unique_ids=stack("unique_ids"),
+            types=[
+                list(frame_types) for data in agent_data for frame_types in data.types
+            ],
+            positions=stack("positions"),
+            radii=stack("radii", 1.0),
+            n_subpoints=(
+                AgentData._concatenate_arrays(n_subpoint_arrays)
+                if has_subpoints
+                else None
+            ),
+            subpoints=(
+                AgentData._concatenate_arrays(subpoint_arrays)
+                if has_subpoints
+                else None
+            ),
+            draw_fiber_points=agent_data[0].draw_fiber_points,
+            type_ids=(
+                stack("type_ids")
+                if all(data.type_ids is not None for data in agent_data)
+                else None
+            ),
+        )
+        return result
+
     def append_agents(self, new_agents: AgentData):
         """
         Concatenate the new AgentData with the current data,
@@ -283,28 +704,9 @@ class AgentData:
                 f"new data has {new_total_steps} steps, while "
                 f"existing data has {total_steps}"
             )
-        max_agents = int(np.amax(self.n_agents)) + int(np.amax(new_agents.n_agents))
-        # add agents
-        n_agents = np.add(self.n_agents, new_agents.n_agents)
-        self.viz_types = np.concatenate((self.viz_types, new_agents.viz_types), axis=1)
-        unique_ids = np.zeros((total_steps, max_agents))
-        types = []
-        type_ids = np.zeros((total_steps, max_agents))
-        self.positions = np.concatenate((self.positions, new_agents.positions), axis=1)
-        self.radii = np.concatenate((self.radii, new_agents.radii), axis=1)
-        if self.n_subpoints is not None and new_agents.n_subpoints is not None:
-            self.n_subpoints = np.concatenate(
-                (self.n_subpoints, new_agents.n_subpoints), axis=1
-            )
-        elif new_agents.n_subpoints is not None:
-            self.n_subpoints = np.copy(new_agents.n_subpoints)
-        if self.subpoints is not None and new_agents.subpoints is not None:
-            self.subpoints = np.concatenate(
-                (self.subpoints, new_agents.subpoints), axis=1
-            )
-        elif new_agents.subpoints is not None:
-            self.subpoints = np.copy(new_agents.subpoints)
-        # generate new unique IDs and type IDs so they don't overlap
+        n_current = self.n_agents.astype(int)
+        n_new = new_agents.n_agents.astype(int)
+        # generate type IDs if needed
         if self.type_ids is None:
             self.type_ids, tm = AgentData.get_type_ids_and_mapping(self.types)
         if new_agents.type_ids is None:
@@ -312,64 +714,161 @@ class AgentData:
                 new_agents.types
             )
         self.type_mapping = None
-        used_uids = list(np.unique(self.unique_ids))
-        new_uids = {}
-        for t in range(total_steps):
-            i = 0
-            types.append([])
-            n_a = int(self.n_agents[t])
-            for n in range(n_a):
-                unique_ids[t][i] = self.unique_ids[t][n]
-                type_ids[t][i] = self.type_ids[t][n]
-                types[t].append(self.types[t][n])
-                i += 1
-            n_a = int(new_agents.n_agents[t])
-            for n in range(n_a):
-                raw_uid = new_agents.unique_ids[t][n]
-                if raw_uid not in new_uids:
-                    uid = raw_uid
-                    while uid in used_uids:
-                        uid += 1
-                    new_uids[raw_uid] = uid
-                    used_uids.append(uid)
-                unique_ids[t][i] = new_uids[raw_uid]
-                type_ids[t][i] = new_agents.type_ids[t][n]
-                types[t].append(new_agents.types[t][n])
-                i += 1
-        self.unique_ids = unique_ids
-        self.types = types
-        self.type_ids = type_ids
-        self.n_agents = n_agents
+        # generate new unique IDs so they don't overlap
+        current_mask = (
+            np.arange(self.unique_ids.shape[1])[np.newaxis, :]
+            < n_current[:, np.newaxis]
+        )
+        new_mask = (
+            np.arange(new_agents.unique_ids.shape[1])[np.newaxis, :]
+            < n_new[:, np.newaxis]
+        )
+        raw_uids, result_uids = AgentData._get_collision_free_uids(
+            np.unique(self.unique_ids[current_mask]),
+            new_agents.unique_ids[new_mask],
+        )
+        new_unique_ids = np.zeros_like(new_agents.unique_ids)
+        new_unique_ids[new_mask] = result_uids[
+            np.searchsorted(raw_uids, new_agents.unique_ids[new_mask])
+        ]
+        # add agents
+        self.viz_types = AgentData._merge_frames(
+            self.viz_types, n_current, new_agents.viz_types, n_new
+        )
+        self.unique_ids = AgentData._merge_frames(
+            self.unique_ids, n_current, new_unique_ids, n_new
+        )
+        self.type_ids = AgentData._merge_frames(
+            self.type_ids, n_current, new_agents.type_ids, n_new
+        )
+        self.positions = AgentData._merge_frames(
+            self.positions, n_current, new_agents.positions, n_new
+        )
+        self.radii = AgentData._merge_frames(
+            self.radii, n_current, new_agents.radii, n_new, fill_value=1.0
+        )
+        if self.n_subpoints is not None or new_agents.n_subpoints is not None:
+            self.n_subpoints = AgentData._merge_frames(
+                (
+                    self.n_subpoints
+                    if self.n_subpoints is not None
+                    else np.zeros_like(self.radii)
+                ),
+                n_current,
+                (
+                    new_agents.n_subpoints
+                    if new_agents.n_subpoints is not None
+                    else np.zeros_like(new_agents.radii)
+                ),
+                n_new,
+            )
+        if self.subpoints is not None or new_agents.subpoints is not None:
+            self.subpoints = AgentData._merge_frames(
+                (
+                    self.subpoints
+                    if self.subpoints is not None
+                    else np.zeros(self.radii.shape + (0, 3))
+                ),
+                n_current,
+                (
+                    new_agents.subpoints
+                    if new_agents.subpoints is not None
+                    else np.zeros(new_agents.radii.shape + (0, 3))
+                ),
+                n_new,
+            )
+        self.types = [
+            list(self.types[t][: n_current[t]]) + list(new_agents.types[t][: n_new[t]])
+            for t in range(total_steps)
+        ]
+        self.n_agents = np.add(self.n_agents, new_agents.n_agents)
+
+    def save(self, output_dir: str):
+        """
+        Save the agent data to a directory, with each array
+        as a .npy file that can be memory-mapped by AgentData.load
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        for field in ARRAY_FIELDS:
+            array = getattr(self, field)
+            path = os.path.join(output_dir, f"{field}.npy")
+            if array is None:
+                if os.path.isfile(path):
+                    os.remove(path)
+                continue
+            np.save(path, array)
+        with open(os.path.join(output_dir, INFO_FILE_NAME), "w") as info_file:
+            json.dump(
+                {
+                    "types": self.types,
+                    "type_mapping": self.type_mapping,
+                    "draw_fiber_points": self.draw_fiber_points,
+                },
+                info_file,
+            )
+
+    @classmethod
+    def load(cls, input_dir: str, mmap_mode: str = "r"):
+        """
+        Load agent data saved by AgentData.save. By default the arrays
+        are memory-mapped read-only, so frames are only read from disk
+        when they're used and trajectories larger than RAM
+        can be filtered and written
+
+        Parameters
+        ----------
+        input_dir : str
+            the directory the agent data was saved in
+        mmap_mode : str (optional)
+            the mode to memory-map the arrays with, see numpy.load
+            Default: "r" (read-only, use None to load the arrays into RAM)
+        """
+        with open(os.path.join(input_dir, INFO_FILE_NAME)) as info_file:
+            info = json.load(info_file)
+        arrays = {}
+        for field in ARRAY_FIELDS:
+            path = os.path.join(input_dir, f"{field}.npy")
+            arrays[field] = (
+                np.load(path, mmap_mode=mmap_mode) if os.path.isfile(path) else None
+            )
+        result = cls(
+            types=info["types"],
+            draw_fiber_points=info["draw_fiber_points"],
+            **arrays,
+        )
+        result.type_mapping = info["type_mapping"]
+        return result
+
+    @staticmethod
+    def _copy_array(array: np.ndarray) -> np.ndarray:
+        """
+        Copy the array, unless it's read-only (e.g. memory-mapped
+        by AgentData.load) in which case it can be shared
+        """
+        if array is None:
+            return None
+        if isinstance(array, np.ndarray) and not array.flags.writeable:
+            return array
+        return np.copy(array)
 
     def __copy__(self):
-        result = type(self)()
+        result = type(self).__new__(type(self))
         result.__dict__.update(self.__dict__)
+        result._clear_spatial_indices()
         return result
 
     def __deepcopy__(self, memo):
-        if self.type_ids is None:
-            type_ids = None
-        else:
-            type_ids = np.copy(self.type_ids)
-        if self.n_subpoints is None:
-            n_subpoints = None
-        else:
-            n_subpoints = np.copy(self.n_subpoints)
-        if self.subpoints is None:
-            subpoints = None
-        else:
-            subpoints = np.copy(self.subpoints)
         result = type(self)(
-            times=np.copy(self.times),
-            n_agents=np.copy(self.n_agents),
-            viz_types=np.copy(self.viz_types),
-            unique_ids=np.copy(self.unique_ids),
+            times=AgentData._copy_array(self.times),
+            n_agents=AgentData._copy_array(self.n_agents),
+            viz_types=AgentData._copy_array(self.viz_types),
+            unique_ids=AgentData._copy_array(self.unique_ids),
             types=copy.deepcopy(self.types, memo),
-            positions=np.copy(self.positions),
-            radii=np.copy(self.radii),
-            n_subpoints=n_subpoints,
-            subpoints=subpoints,
+            positions=AgentData._copy_array(self.positions),
+            radii=AgentData._copy_array(self.radii),
+            n_subpoints=AgentData._copy_array(self.n_subpoints),
+            subpoints=AgentData._copy_array(self.subpoints),
             draw_fiber_points=self.draw_fiber_points,
-            type_ids=type_ids,
+            type_ids=AgentData._copy_array(self.type_ids),
         )
         return result
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import math
+
+import numpy as np
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class HistogramBins:
+    bin_width: float
+    min_value: float
+    max_value: float
+    first_bin: int
+    counts: np.ndarray
+    n_outside: int
+
+    def __init__(
+        self, bin_width: float, min_value: float = None, max_value: float = None
+    ):
+        """
+        This object accumulates the number of values in bins
+        of equal width, so a histogram can be built from chunks
+        of values without keeping them, and only the bins
+        are written to the plot data
+
+        Parameters
+        ----------
+        bin_width : float
+            The width of each bin
+        min_value : float (optional)
+            The lower edge of the first bin. If max_value is also given,
+            the bins are fixed to cover min_value to max_value
+            and values outside the range are not counted,
+            otherwise bins are added as needed to cover the values
+            Default: None (bins are aligned to multiples of bin_width)
+        max_value : float (optional)
+            The value the last bin must cover, if min_value is given
+            Default: None (bins are added as needed)
+        """
+        if bin_width <= 0:
+            raise ValueError(f"bin width must be positive, got {bin_width}")
+        if min_value is not None and max_value is not None and max_value < min_value:
+            raise ValueError(
+                f"histogram max value {max_value} is less "
+                f"than min value {min_value}"
+            )
+        self.bin_width = bin_width
+        self.min_value = min_value
+        self.max_value = max_value if min_value is not None else None
+        self.first_bin = 0
+        n_bins = (
+            max(math.ceil((max_value - min_value) / bin_width), 1)
+            if self.is_fixed()
+            else 0
+        )
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.n_outside = 0
+
+    def is_fixed(self) -> bool:
+        """
+        Whether the bins cover a fixed range
+        """
+        return self.max_value is not None
+
+    def _get_origin(self) -> float:
+        return self.min_value if self.min_value is not None else 0.0
+
+    def add_values(self, values: np.ndarray):
+        """
+        Count the values in the bins, values outside a fixed range
+        and values that aren't finite are counted in n_outside
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        finite = np.isfinite(values)
+        bins = np.zeros(values.size, dtype=np.int64)
+        bins[finite] = np.floor(
+            (values[finite] - self._get_origin()) / self.bin_width
+        ).astype(np.int64)
+        if self.is_fixed():
+            # the last bin includes the max value
+            bins[finite & (values == self.max_value)] = self.counts.size - 1
+            inside = finite & (bins >= 0) & (bins < self.counts.size)
+        else:
+            inside = finite
+            if not np.any(inside):
+                self.n_outside += values.size
+                return
+            self._extend(int(np.amin(bins[inside])), int(np.amax(bins[inside])))
+        self.n_outside += int(np.count_nonzero(~inside))
+        self.counts += np.bincount(
+            bins[inside] - self.first_bin, minlength=self.counts.size
+        )
+
+    def _extend(self, first_bin: int, last_bin: int):
+        """
+        Add empty bins so the bins cover first_bin to last_bin
+        """
+        if self.counts.size < 1:
+            self.first_bin = first_bin
+            self.counts = np.zeros(last_bin - first_bin + 1, dtype=np.int64)
+            return
+        n_before = max(self.first_bin - first_bin, 0)
+        n_after = max(last_bin - (self.first_bin + self.counts.size - 1), 0)
+        if n_before > 0 or n_after > 0:
+            self.counts = np.pad(self.counts, (n_before, n_after))
+            self.first_bin -= n_before
+
+    def get_edges(self) -> np.ndarray:
+        """
+        Get the edges of the bins (shape = [bins + 1])
+        """
+        return self._get_origin() + self.bin_width * (
+            self.first_bin + np.arange(self.counts.size + 1)
+        )
+
+    def get_centers(self) -> np.ndarray:
+        """
+        Get the center of each bin (shape = [bins])
+        """
+        edges = self.get_edges()
+        return 0.5 * (edges[:-1] + edges[1:])
@@ -6,6 +6,8 @@ from typing import Dict
 
 import numpy as np
 
+from .histogram_bins import HistogramBins
+
 ###############################################################################
 
 log = logging.getLogger(__name__)
@@ -17,9 +19,14 @@ class HistogramPlotData:
     title: str
     xaxis_title: str
     xtrace: np.ndarray
-    traces: Dict[str, np.ndarray]
-
-    def __init__(self, title: str, xaxis_title: str, traces: Dict[str, np.ndarray]):
+    traces: Dict[str, np.ndarray or HistogramBins]
+
+    def __init__(
+        self,
+        title: str,
+        xaxis_title: str,
+        traces: Dict[str, np.ndarray or HistogramBins],
+    ):
         """
         This object contains data for a scatterplot
 
@@ -29,9 +36,11 @@ class HistogramPlotData:
             A string display title for the plot
         xaxis_title: str
             A string label (with units) for the x-axis
-        traces: Dict[str, np.ndarray] (shape = [values])]
+        traces: Dict[str, np.ndarray or HistogramBins] (shape = [values])]
             A dictionary with trace display names as keys,
-            each mapped to a numpy ndarray of values
+            each mapped to a numpy ndarray of values,
+            or to HistogramBins with the values already counted,
+            so only the bins are written
         """
         self.title = title
         self.xaxis_title = xaxis_title
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import copy
+import logging
+import math
+from typing import Any, Dict
+
+import numpy as np
+from pint import UnitRegistry
+
+from .agent_data import AgentData
+from .unit_data import UnitData
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class PrecisionData:
+    position_decimals: int
+    radius_decimals: int
+    subpoint_decimals: int
+
+    def __init__(
+        self,
+        position_decimals: int = None,
+        radius_decimals: int = None,
+        subpoint_decimals: int = None,
+    ):
+        """
+        This object contains the number of decimal places
+        to keep for each spatial field when writing a trajectory,
+        values are rounded to this precision before they are serialized
+
+        Parameters
+        ----------
+        position_decimals : int (optional)
+            decimal places for agent positions
+            Default: None (full precision)
+        radius_decimals : int (optional)
+            decimal places for agent radii
+            Default: None (full precision)
+        subpoint_decimals : int (optional)
+            decimal places for subpoints, e.g. fiber points
+            Default: None (full precision)
+        """
+        self.position_decimals = position_decimals
+        self.radius_decimals = radius_decimals
+        self.subpoint_decimals = subpoint_decimals
+
+    @staticmethod
+    def _decimals_for_step(step: float) -> int:
+        """
+        Get the number of decimal places needed
+        to resolve values at the given step size
+        """
+        # round first so exact powers of ten don't gain a decimal place
+        return int(math.ceil(round(-math.log10(step), 9)))
+
+    @classmethod
+    def from_box_size(cls, box_size: np.ndarray, relative_precision: float = 1e-4):
+        """
+        Create PrecisionData with a fixed-point grid for all spatial fields
+        that is at least as fine as a fraction of the largest box dimension
+
+        Parameters
+        ----------
+        box_size : np.ndarray (shape = [3])
+            the XYZ dimensions of the simulation bounding volume
+        relative_precision : float (optional)
+            the grid step as a fraction of the largest box dimension
+            Default: 1e-4
+        """
+        decimals = cls._decimals_for_step(float(np.amax(box_size)) * relative_precision)
+        return cls(decimals, decimals, decimals)
+
+    @classmethod
+    def from_resolution(
+        cls, resolution: float, resolution_units: UnitData, spatial_units: UnitData
+    ):
+        """
+        Create PrecisionData with a fixed-point grid for all spatial fields
+        that is at least as fine as a physical resolution,
+        e.g. 0.1 nm for data in units of 10 nm keeps 2 decimal places
+
+        Parameters
+        ----------
+        resolution : float
+            the grid step in resolution_units
+        resolution_units : UnitData
+            the units of the resolution
+        spatial_units : UnitData
+            the units of the spatial data to write
+        """
+        ureg = UnitRegistry()
+        step = (
+            (resolution * resolution_units.magnitude * ureg(resolution_units.name))
+            / (spatial_units.magnitude * ureg(spatial_units.name))
+        ).to("dimensionless")
+        decimals = cls._decimals_for_step(float(step.magnitude))
+        return cls(decimals, decimals, decimals)
+
+    def apply(self, agent_data: AgentData) -> AgentData:
+        """
+        Return a shallow copy of the agent data
+        with spatial fields rounded to this precision
+        """
+        result = copy.copy(agent_data)
+        if self.position_decimals is not None:
+            result.positions = np.round(agent_data.positions, self.position_decimals)
+        if self.radius_decimals is not None:
+            result.radii = np.round(agent_data.radii, self.radius_decimals)
+        if self.subpoint_decimals is not None and agent_data.subpoints is not None:
+            result.subpoints = np.round(agent_data.subpoints, self.subpoint_decimals)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the decimal places for each field,
+        as recorded in the trajectoryInfo
+        """
+        return {
+            "positions": self.position_decimals,
+            "radii": self.radius_decimals,
+            "subpoints": self.subpoint_decimals,
+        }
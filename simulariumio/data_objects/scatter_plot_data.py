@@ -20,6 +20,7 @@ class ScatterPlotData:
     xtrace: np.ndarray
     ytraces: Dict[str, np.ndarray]
     render_mode: str
+    max_points: int
 
     def __init__(
         self,
@@ -29,6 +30,7 @@ class ScatterPlotData:
         xtrace: np.ndarray,
         ytraces: Dict[str, np.ndarray],
         render_mode: str = "markers",
+        max_points: int = None,
     ):
         """
         This object contains data for a scatterplot
@@ -54,10 +56,22 @@ class ScatterPlotData:
                 "markers" : draw as points
                 "lines" : connect points with line
             Default: "markers"
+        max_points: int (optional)
+            If there are more x values than this, downsample
+            each trace to at most this many points, keeping
+            the first and last points and the min and max y values
+            in each of (max_points - 2) / 2 evenly sized buckets
+            of points in between, so peaks aren't lost
+            Default: None (keep every point)
         """
+        if max_points is not None and max_points < 4:
+            raise ValueError(
+                f"max points must be at least 4 to downsample, got {max_points}"
+            )
         self.title = title
         self.xaxis_title = xaxis_title
         self.yaxis_title = yaxis_title
         self.xtrace = xtrace
         self.ytraces = ytraces
         self.render_mode = render_mode
+        self.max_points = max_points
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+
+import numpy as np
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class SpatialIndex:
+    positions: np.ndarray
+    cell_size: float
+
+    def __init__(self, positions: np.ndarray, cell_size: float):
+        """
+        This object is a uniform grid over the positions of the agents
+        in one frame, for finding the agents in a box or sphere
+        without checking every agent. Agents are bucketed by grid cell
+        with one vectorized sort, and a query only checks the agents
+        in the cells it overlaps
+
+        Parameters
+        ----------
+        positions : np.ndarray (shape = [agents, 3])
+            The XYZ position of each agent
+        cell_size : float
+            The size of the grid cells, queries are fastest
+            when a few agents are in each cell
+        """
+        if cell_size <= 0:
+            raise ValueError(f"cell size must be positive, got {cell_size}")
+        self.positions = positions
+        self.cell_size = cell_size
+        cells = self._get_cells(positions)
+        if cells.shape[0] > 0:
+            self._min_cell = np.amin(cells, axis=0)
+            self._grid_shape = np.amax(cells, axis=0) - self._min_cell + 1
+        else:
+            self._min_cell = np.zeros(3, dtype=np.int64)
+            self._grid_shape = np.ones(3, dtype=np.int64)
+        keys = self._get_keys(cells)
+        self._order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[self._order]
+
+    def _get_cells(self, points: np.ndarray) -> np.ndarray:
+        return np.floor(points / self.cell_size).astype(np.int64)
+
+    def _get_keys(self, cells: np.ndarray) -> np.ndarray:
+        """
+        Get a linear key for each grid cell, cells must be inside the grid
+        """
+        cells = cells - self._min_cell
+        n_y, n_z = self._grid_shape[1], self._grid_shape[2]
+        return (cells[..., 0] * n_y + cells[..., 1]) * n_z + cells[..., 2]
+
+    def _get_candidates(
+        self, min_corner: np.ndarray, max_corner: np.ndarray
+    ) -> np.ndarray:
+        """
+        Get the indices of agents in the grid cells that overlap a box
+        """
+        grid_min = self._min_cell
+        grid_max = self._min_cell + self._grid_shape - 1
+        # clip before casting, the corners may be infinite
+        min_cell = np.clip(
+            np.floor(min_corner / self.cell_size), grid_min, grid_max + 1
+        ).astype(np.int64)
+        max_cell = np.clip(
+            np.floor(max_corner / self.cell_size), grid_min - 1, grid_max
+        ).astype(np.int64)
+        if np.any(max_cell < min_cell):
+            return np.zeros(0, dtype=np.int64)
+        n_cells = np.prod(max_cell - min_cell + 1)
+        if n_cells > self._order.size:
+            # checking every agent is faster than visiting every cell
+            return np.arange(self._order.size)
+        cell_ranges = [np.arange(min_cell[d], max_cell[d] + 1) for d in range(3)]
+        cells = np.stack(np.meshgrid(*cell_ranges, indexing="ij"), axis=-1)
+        keys = self._get_keys(np.reshape(cells, (-1, 3)))
+        starts = np.searchsorted(self._sorted_keys, keys, side="left")
+        ends = np.searchsorted(self._sorted_keys, keys, side="right")
+        lengths = ends - starts
+        # concatenate the ranges of sorted agents in each cell
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self._order[offsets + np.arange(np.sum(lengths))]
+
+    def query_box(self, min_corner: np.ndarray, max_corner: np.ndarray) -> np.ndarray:
+        """
+        Get the sorted indices of the agents with positions
+        inside the axis-aligned box (inclusive)
+        """
+        min_corner = np.asarray(min_corner, dtype=float)
+        max_corner = np.asarray(max_corner, dtype=float)
+        candidates = self._get_candidates(min_corner, max_corner)
+        points = self.positions[candidates]
+        inside = np.all((points >= min_corner) & (points <= max_corner), axis=1)
+        return np.sort(candidates[inside])
+
+    def query_radius(self, center: np.ndarray, radius: float) -> np.ndarray:
+        """
+        Get the sorted indices of the agents with positions
+        within the radius of the center (inclusive)
+        """
+        center = np.asarray(center, dtype=float)
+        candidates = self._get_candidates(center - radius, center + radius)
+        offsets = self.positions[candidates] - center
+        inside = np.einsum("ij,ij->i", offsets, offsets) <= radius * radius
+        return np.sort(candidates[inside])
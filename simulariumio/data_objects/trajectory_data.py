@@ -9,6 +9,7 @@ import numpy as np
 
 from .agent_data import AgentData
 from .unit_data import UnitData
+from .spatial_index import SpatialIndex
 
 ###############################################################################
 
@@ -85,8 +86,29 @@ class TrajectoryData:
             plots=buffer_data["plotData"]["data"],
         )
 
+    def get_spatial_index(
+        self, time_index: int, cell_size: float = None
+    ) -> SpatialIndex:
+        """
+        Get a uniform grid index over the positions of the agents
+        at a timestep, for box and radius queries,
+        cached by the AgentData
+
+        Parameters
+        ----------
+        time_index : int
+            The index of the timestep to index
+        cell_size : float (optional)
+            The size of the grid cells
+            Default: None (the box divided into about one cell per agent)
+        """
+        n_agents = int(self.agent_data.n_agents[time_index])
+        if cell_size is None and n_agents > 0 and np.all(self.box_size > 0):
+            cell_size = float(np.cbrt(np.prod(self.box_size) / n_agents))
+        return self.agent_data.get_spatial_index(time_index, cell_size)
+
     def __copy__(self):
-        result = type(self)()
+        result = type(self).__new__(type(self))
         result.__dict__.update(self.__dict__)
         return result
 
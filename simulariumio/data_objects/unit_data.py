@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import copy
 import sys
 import logging
 from pint import UnitRegistry
@@ -76,8 +77,10 @@ class UnitData:
         return f"{magnitude}{self.name}"
 
     def __copy__(self):
-        result = type(self)(
-            name=self.name,
-            magnitude=self.magnitude,
-        )
+        # copy the quantity instead of building a new unit registry,
+        # which takes much longer
+        result = type(self).__new__(type(self))
+        result._quantity = copy.copy(self._quantity)
+        result.magnitude = self.magnitude
+        result.name = self.name
         return result
@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import copy
+import logging
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .constants import V1_SPATIAL_BUFFER_STRUCT
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+HEADER_SIZE = V1_SPATIAL_BUFFER_STRUCT.VALUES_PER_AGENT - 1
+POSITION_COLUMNS = slice(
+    V1_SPATIAL_BUFFER_STRUCT.POSX_INDEX, V1_SPATIAL_BUFFER_STRUCT.POSX_INDEX + 3
+)
+# columns that must match for an agent to be carried over in a delta frame
+STRUCTURE_COLUMNS = [
+    V1_SPATIAL_BUFFER_STRUCT.VIZ_TYPE_INDEX,
+    V1_SPATIAL_BUFFER_STRUCT.UID_INDEX,
+    V1_SPATIAL_BUFFER_STRUCT.TID_INDEX,
+    V1_SPATIAL_BUFFER_STRUCT.ROTX_INDEX,
+    V1_SPATIAL_BUFFER_STRUCT.ROTY_INDEX,
+    V1_SPATIAL_BUFFER_STRUCT.ROTZ_INDEX,
+    V1_SPATIAL_BUFFER_STRUCT.R_INDEX,
+    V1_SPATIAL_BUFFER_STRUCT.NSP_INDEX,
+]
+
+###############################################################################
+
+
+class FrameRecords:
+    headers: np.ndarray
+    subpoints: List[np.ndarray]
+
+    def __init__(self, headers: np.ndarray, subpoints: List[np.ndarray] = None):
+        """
+        This object holds one frame of packed agent records,
+        split into the fixed size header of each agent
+        (shape = [agents, VALUES_PER_AGENT - 1]) and the subpoint values
+        of each agent (None if no agent in the frame has subpoints)
+        """
+        self.headers = headers
+        self.subpoints = subpoints
+
+    @classmethod
+    def from_buffer(cls, buffer: np.ndarray):
+        """
+        Split a packed frame buffer into agent records
+        """
+        buffer = np.asarray(buffer, dtype=float)
+        nsp_values = buffer[V1_SPATIAL_BUFFER_STRUCT.NSP_INDEX :: HEADER_SIZE]
+        if buffer.size % HEADER_SIZE == 0 and not np.any(nsp_values):
+            # no agent has subpoints, so every record is the same size
+            return cls(np.reshape(buffer, (-1, HEADER_SIZE)).copy())
+        headers = []
+        subpoints = []
+        i = 0
+        while i + HEADER_SIZE <= buffer.size:
+            n_values = int(buffer[i + V1_SPATIAL_BUFFER_STRUCT.NSP_INDEX])
+            headers.append(buffer[i : i + HEADER_SIZE])
+            subpoints.append(
+                np.array(buffer[i + HEADER_SIZE : i + HEADER_SIZE + n_values])
+            )
+            i += HEADER_SIZE + n_values
+        return cls(np.reshape(np.array(headers), (-1, HEADER_SIZE)), subpoints)
+
+    def to_buffer(self) -> np.ndarray:
+        """
+        Pack the agent records into a frame buffer
+        """
+        if self.subpoints is None:
+            return self.headers.flatten()
+        parts = []
+        for n in range(self.headers.shape[0]):
+            parts.append(self.headers[n])
+            parts.append(self.subpoints[n])
+        return np.concatenate(parts) if parts else np.zeros(0)
+
+    def n_agents(self) -> int:
+        return self.headers.shape[0]
+
+    def head(self, n_agents: int):
+        """
+        Return a copy of the first n agent records
+        """
+        return self.take(np.arange(min(n_agents, self.n_agents())))
+
+    def take(self, indices: np.ndarray):
+        """
+        Return a copy of the agent records at the indices
+        """
+        return FrameRecords(
+            self.headers[indices],
+            (
+                None
+                if self.subpoints is None
+                else [np.copy(self.subpoints[n]) for n in indices]
+            ),
+        )
+
+    def append(self, other):
+        """
+        Return these records followed by the other records
+        """
+        if self.subpoints is None and other.subpoints is None:
+            subpoints = None
+        else:
+            subpoints = self._subpoint_list() + other._subpoint_list()
+        return FrameRecords(np.concatenate([self.headers, other.headers]), subpoints)
+
+    def _subpoint_list(self) -> List[np.ndarray]:
+        if self.subpoints is not None:
+            return self.subpoints
+        return [np.zeros(0) for n in range(self.headers.shape[0])]
+
+
+class DeltaEncoding:
+    keyframe_interval: int
+    delta_step: float
+    threshold: float
+
+    def __init__(
+        self,
+        keyframe_interval: int = 10,
+        delta_step: float = 1e-3,
+        threshold: float = None,
+    ):
+        """
+        This object encodes spatial data as periodic keyframes,
+        which store every agent, and delta frames in between,
+        which store the previous frame's agents that were removed,
+        quantized position and subpoint changes for the agents
+        carried over from the previous frame, keyed by their index
+        among the carried over agents, plus full records for new agents.
+        Agents are matched between frames by unique ID, and carried over
+        while their type, radius, and number of subpoints stay the same
+        and they stay in the same order.
+        Deltas are computed against the decoded values,
+        so errors don't accumulate between keyframes
+
+        Parameters
+        ----------
+        keyframe_interval : int (optional)
+            write a keyframe at least every this many frames
+            Default: 10
+        delta_step : float (optional)
+            the quantization step for deltas, in spatial units
+            Default: 1e-3
+        threshold : float (optional)
+            agents that moved less than this distance along every axis
+            are left out of a delta frame
+            Default: None (delta_step / 2, any change that survives
+            quantization is stored)
+        """
+        if keyframe_interval < 1:
+            raise ValueError(
+                f"keyframe interval must be at least 1, got {keyframe_interval}"
+            )
+        self.keyframe_interval = keyframe_interval
+        self.delta_step = delta_step
+        self.threshold = threshold if threshold is not None else delta_step / 2.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the encoding parameters, as recorded in the trajectoryInfo
+        """
+        return {
+            "type": "delta",
+            "keyframeInterval": self.keyframe_interval,
+            "deltaStep": self.delta_step,
+            "threshold": self.threshold,
+        }
+
+    @classmethod
+    def from_dict(cls, encoding_info: Dict[str, Any]):
+        """
+        Create DeltaEncoding from the parameters in the trajectoryInfo
+        """
+        return cls(
+            keyframe_interval=int(encoding_info["keyframeInterval"]),
+            delta_step=float(encoding_info["deltaStep"]),
+            threshold=float(encoding_info["threshold"]),
+        )
+
+    @staticmethod
+    def _get_kept_agents(previous: FrameRecords, current: FrameRecords) -> np.ndarray:
+        """
+        Get the index in the previous frame of each leading agent
+        in the current frame that can be carried over, i.e. the agent
+        with the same unique ID in the previous frame has the same structure,
+        and the agents carried over are in the same order in both frames
+        """
+        from .data_objects import AgentData
+
+        uid_index = V1_SPATIAL_BUFFER_STRUCT.UID_INDEX
+        previous_ix = AgentData._get_agent_indices(
+            previous.headers[:, uid_index], current.headers[:, uid_index]
+        )
+        kept = previous_ix >= 0
+        kept[kept] = np.all(
+            previous.headers[previous_ix[kept]][:, STRUCTURE_COLUMNS]
+            == current.headers[kept][:, STRUCTURE_COLUMNS],
+            axis=1,
+        )
+        kept[1:] &= previous_ix[1:] > previous_ix[:-1]
+        not_kept = np.nonzero(~kept)[0]
+        n_kept = int(not_kept[0]) if not_kept.size > 0 else kept.size
+        return previous_ix[:n_kept]
+
+    def _quantize(
+        self, current: np.ndarray, decoded: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the quantized deltas from the decoded values
+        to the current values, and which rows changed enough to store
+        """
+        deltas = current - decoded
+        changed = np.any(np.abs(deltas) >= self.threshold, axis=-1)
+        return np.round(deltas / self.delta_step), changed
+
+    def _encode_delta(
+        self, decoded: FrameRecords, current: FrameRecords, kept_ix: np.ndarray
+    ) -> Tuple[Dict[str, np.ndarray], FrameRecords]:
+        """
+        Encode the current frame as a delta from the decoded previous frame,
+        carrying over the agents at the kept indices of the previous frame,
+        return the delta and the records the decoder will reconstruct
+        """
+        n_kept = kept_ix.size
+        result = decoded.take(kept_ix)
+        # positions
+        quantized, changed = self._quantize(
+            current.headers[:n_kept, POSITION_COLUMNS],
+            result.headers[:, POSITION_COLUMNS],
+        )
+        changed_ix = np.nonzero(changed)[0]
+        result.headers[changed_ix, POSITION_COLUMNS] += (
+            self.delta_step * quantized[changed_ix]
+        )
+        position_deltas = np.concatenate(
+            [changed_ix[:, np.newaxis], quantized[changed_ix]], axis=1
+        ).flatten()
+        # subpoints
+        subpoint_deltas = []
+        if result.subpoints is not None and current.subpoints is not None:
+            for n in range(n_kept):
+                if result.subpoints[n].size < 1:
+                    continue
+                quantized, changed = self._quantize(
+                    current.subpoints[n], result.subpoints[n]
+                )
+                if not np.any(changed):
+                    continue
+                result.subpoints[n] += self.delta_step * quantized
+                subpoint_deltas.append(np.concatenate([[n], quantized]))
+        # agents that weren't carried over
+        appended = current.head(current.n_agents())
+        appended.headers = appended.headers[n_kept:]
+        if appended.subpoints is not None:
+            appended.subpoints = appended.subpoints[n_kept:]
+        result = result.append(appended)
+        delta = {
+            "removedAgents": np.setdiff1d(np.arange(decoded.n_agents()), kept_ix),
+            "positionDeltas": position_deltas,
+            "subpointDeltas": (
+                np.concatenate(subpoint_deltas) if subpoint_deltas else np.zeros(0)
+            ),
+            "appendedData": appended.to_buffer(),
+        }
+        return delta, result
+
+    def encode_frames(
+        self, frames: Iterator[Tuple[int, np.ndarray]]
+    ) -> Iterator[Tuple[int, np.ndarray, Dict[str, np.ndarray]]]:
+        """
+        Encode a sequence of (frame index, packed buffer),
+        yield (frame index, buffer, None) for keyframes
+        and (frame index, None, delta) for delta frames.
+        The first frame is always a keyframe, so ranges of frames
+        can be encoded independently
+        """
+        decoded = None
+        since_keyframe = 0
+        for t, buffer in frames:
+            current = FrameRecords.from_buffer(buffer)
+            kept_ix = (
+                DeltaEncoding._get_kept_agents(decoded, current)
+                if decoded is not None and since_keyframe < self.keyframe_interval
+                else np.zeros(0, dtype=int)
+            )
+            if kept_ix.size < 1:
+                decoded = current
+                since_keyframe = 1
+                yield t, buffer, None
+                continue
+            delta, decoded = self._encode_delta(decoded, current, kept_ix)
+            since_keyframe += 1
+            yield t, None, delta
+
+    def decode_frame(
+        self, previous: FrameRecords, delta: Dict[str, Any]
+    ) -> FrameRecords:
+        """
+        Reconstruct a frame from the previous decoded frame and a delta
+        """
+        result = previous.take(
+            np.delete(
+                np.arange(previous.n_agents()),
+                np.array(delta["removedAgents"], dtype=int),
+            )
+        )
+        position_deltas = np.reshape(np.array(delta["positionDeltas"]), (-1, 4))
+        changed_ix = position_deltas[:, 0].astype(int)
+        result.headers[changed_ix, POSITION_COLUMNS] += (
+            self.delta_step * position_deltas[:, 1:]
+        )
+        subpoint_deltas = np.array(delta["subpointDeltas"])
+        i = 0
+        while i < subpoint_deltas.size:
+            n = int(subpoint_deltas[i])
+            n_values = result.subpoints[n].size
+            result.subpoints[n] += (
+                self.delta_step * subpoint_deltas[i + 1 : i + 1 + n_values]
+            )
+            i += 1 + n_values
+        return result.append(FrameRecords.from_buffer(delta["appendedData"]))
+
+    @staticmethod
+    def decode_buffer_data(buffer_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return a copy of simularium JSON data with delta encoded
+        spatial data replaced by a full buffer for every frame
+        """
+        encoding_info = buffer_data["trajectoryInfo"].get("spatialEncoding")
+        if encoding_info is None or encoding_info["type"] != "delta":
+            return buffer_data
+        encoding = DeltaEncoding.from_dict(encoding_info)
+        result = copy.copy(buffer_data)
+        result["trajectoryInfo"] = copy.copy(buffer_data["trajectoryInfo"])
+        result["trajectoryInfo"].pop("spatialEncoding")
+        result["spatialData"] = copy.copy(buffer_data["spatialData"])
+        bundle_data = []
+        decoded = None
+        for frame in buffer_data["spatialData"]["bundleData"]:
+            if "delta" in frame:
+                decoded = encoding.decode_frame(decoded, frame["delta"])
+            else:
+                decoded = FrameRecords.from_buffer(frame["data"])
+            bundle_data.append(
+                {
+                    "frameNumber": frame["frameNumber"],
+                    "time": frame["time"],
+                    "data": decoded.to_buffer().tolist(),
+                }
+            )
+        result["spatialData"]["bundleData"] = bundle_data
+        return result
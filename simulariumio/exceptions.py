@@ -16,6 +16,20 @@ class UnsupportedPlotTypeError(Exception):
         return f"simulariumio does not support this plot type: '{self.plot_type}'."
 
 
+class UnsupportedCompressionError(Exception):
+    """
+    This exception is intended to communicate that the requested compression
+    codec is not one of the supported codecs.
+    """
+
+    def __init__(self, compression, **kwargs):
+        super().__init__(**kwargs)
+        self.compression = compression
+
+    def __str__(self):
+        return f"simulariumio does not support this compression: '{self.compression}'."
+
+
 class MissingDataError(Exception):
     """
     This exception is intended to communicate that the data provided
@@ -42,3 +56,17 @@ class DataError(Exception):
 
     def __str__(self):
         return f"Problem with Data: '{self.issue}'."
+
+
+class ConversionCancelled(Exception):
+    """
+    This exception is intended to communicate that a conversion was stopped
+    because its cancellation token was cancelled.
+    """
+
+    def __init__(self, stage_name, **kwargs):
+        super().__init__(**kwargs)
+        self.stage_name = stage_name
+
+    def __str__(self):
+        return f"Conversion cancelled during stage: '{self.stage_name}'."
@@ -3,10 +3,14 @@
 
 import json
 import logging
+import os
 from typing import Any, Dict
 
 from .trajectory_converter import TrajectoryConverter
 from .data_objects import TrajectoryData, UnitData
+from .compression import open_input_file
+from .delta_encoding import DeltaEncoding
+from .instrumentation import ConversionStats
 
 ###############################################################################
 
@@ -18,7 +22,14 @@ log = logging.getLogger(__name__)
 class FileConverter(TrajectoryConverter):
     current_trajectory_info_version: int = 2
 
-    def __init__(self, input_path: str):
+    def __init__(
+        self,
+        input_path: str,
+        start_time: float = None,
+        end_time: float = None,
+        stride: int = 1,
+        stats: ConversionStats = None,
+    ):
         """
         This object loads the data in .simularium JSON format
         at the input path
@@ -26,17 +37,85 @@ class FileConverter(TrajectoryConverter):
         Parameters
         ----------
         input_path: str
-            path to the .simularium JSON file to load
+            path to the .simularium JSON file to load,
+            which may be compressed with gzip, zstd, or lz4
+        start_time : float (optional)
+            Only load frames at or after this time
+            Default: None (start at the first frame)
+        end_time : float (optional)
+            Only load frames at or before this time
+            Default: None (end at the last frame)
+        stride : int (optional)
+            Only load every nth frame from start_time to end_time
+            Default: 1 (load every frame)
+        stats : ConversionStats (optional)
+            Measures each stage of the conversion, reports progress,
+            and can cancel the conversion
+            Default: None (a new ConversionStats)
         """
-        print("Reading Simularium JSON -------------")
-        with open(input_path) as simularium_file:
-            buffer_data = json.load(simularium_file)
-        if (
-            int(buffer_data["trajectoryInfo"]["version"])
-            < self.current_trajectory_info_version
-        ):
-            buffer_data = self.update_trajectory_info_version(buffer_data)
-        self._data = TrajectoryData.from_buffer_data(buffer_data)
+        log.info("Reading Simularium JSON")
+        self.stats = stats if stats is not None else ConversionStats()
+        with self.stats.stage("parse") as stage:
+            with open_input_file(input_path) as simularium_file:
+                buffer_data = json.load(simularium_file)
+            self.stats.check_cancelled("parse")
+            if "bundleFiles" in buffer_data["spatialData"]:
+                buffer_data = self._load_bundle_files(buffer_data, input_path)
+                self.stats.check_cancelled("parse")
+            if (
+                int(buffer_data["trajectoryInfo"]["version"])
+                < self.current_trajectory_info_version
+            ):
+                buffer_data = self.update_trajectory_info_version(buffer_data)
+            if start_time is not None or end_time is not None or stride != 1:
+                buffer_data = FileConverter._select_frames(
+                    buffer_data, start_time, end_time, stride
+                )
+            self._data = TrajectoryData.from_buffer_data(buffer_data)
+            stage.count(self._data.agent_data)
+        self.stats.report("parse", stage.n_frames, stage.n_frames)
+
+    @staticmethod
+    def _load_bundle_files(
+        buffer_data: Dict[str, Any], input_path: str
+    ) -> Dict[str, Any]:
+        """
+        Load the spatial data from the bundle files listed
+        in a manifest, the paths are relative to the manifest
+        """
+        input_dir = os.path.dirname(input_path)
+        bundle_data = []
+        for bundle_file in buffer_data["spatialData"].pop("bundleFiles"):
+            bundle_path = os.path.join(input_dir, bundle_file["file"])
+            with open_input_file(bundle_path) as bundle:
+                bundle_data += json.load(bundle)["bundleData"]
+        buffer_data["spatialData"]["bundleData"] = bundle_data
+        return buffer_data
+
+    @staticmethod
+    def _select_frames(
+        buffer_data: Dict[str, Any],
+        start_time: float = None,
+        end_time: float = None,
+        stride: int = 1,
+    ) -> Dict[str, Any]:
+        """
+        Keep only the frames from start_time to end_time,
+        and every stride-th frame in that range,
+        before the frames are unpacked into arrays
+        """
+        # delta encoded frames depend on the frames before them
+        buffer_data = DeltaEncoding.decode_buffer_data(buffer_data)
+        bundle_data = buffer_data["spatialData"]["bundleData"]
+        frame_indices = TrajectoryConverter._get_frame_indices(
+            [frame["time"] for frame in bundle_data], start_time, end_time, stride
+        )
+        buffer_data["spatialData"]["bundleData"] = [
+            bundle_data[t] for t in frame_indices
+        ]
+        buffer_data["spatialData"]["bundleSize"] = len(frame_indices)
+        buffer_data["trajectoryInfo"]["totalSteps"] = len(frame_indices)
+        return buffer_data
 
     def update_trajectory_info_version(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -61,7 +140,7 @@ class FileConverter(TrajectoryConverter):
                 "name": time_units.name,
             }
             data["trajectoryInfo"]["version"] = 2
-            print(
+            log.info(
                 f"Updated TrajectoryInfo v1 -> v{self.current_trajectory_info_version}"
             )
         return data
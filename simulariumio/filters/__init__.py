@@ -10,3 +10,7 @@ from .multiply_time_filter import MultiplyTimeFilter  # noqa: F401
 from .reorder_agents_filter import ReorderAgentsFilter  # noqa: F401
 from .add_agents_filter import AddAgentsFilter  # noqa: F401
 from .multiply_space_filter import MultiplySpaceFilter  # noqa: F401
+from .crop_filter import CropFilter  # noqa: F401
+from .grid_cluster_filter import GridClusterFilter  # noqa: F401
+from .windowed_filter import WindowedFilter  # noqa: F401
+from .smooth_positions_filter import SmoothPositionsFilter  # noqa: F401
@@ -15,6 +15,8 @@ log = logging.getLogger(__name__)
 
 class AddAgentsFilter(Filter):
     new_agent_data: AgentData
+    # the new agents are matched to frames by their index in the trajectory
+    frame_wise: bool = False
 
     def __init__(self, new_agent_data: AgentData):
         """
@@ -32,6 +34,6 @@ class AddAgentsFilter(Filter):
         """
         Add the given agents to each frame of the simularium data
         """
-        print("Filtering: add agents -------------")
+        log.info("Filtering: add agents")
         data.agent_data.append_agents(self.new_agent_data)
         return data
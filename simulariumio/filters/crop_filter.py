@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+
+import numpy as np
+
+from ..data_objects import TrajectoryData, AgentData
+from .filter import Filter
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class CropFilter(Filter):
+    min_corner: np.ndarray
+    max_corner: np.ndarray
+
+    def __init__(
+        self,
+        min_corner: np.ndarray = None,
+        max_corner: np.ndarray = None,
+    ):
+        """
+        This filter removes agents outside an axis-aligned box.
+        Agents with subpoints (fibers) are kept only if all their
+        subpoints are inside the box, other agents are kept
+        if their position is inside it. The box size is reduced
+        to the smallest box centered at the origin that contains
+        the cropped region, since agent positions are not moved
+
+        Parameters
+        ----------
+        min_corner : np.ndarray (shape = [3]) (optional)
+            The minimum XYZ coordinates of the region to keep
+            Default: None (no minimum)
+        max_corner : np.ndarray (shape = [3]) (optional)
+            The maximum XYZ coordinates of the region to keep
+            Default: None (no maximum)
+        """
+        self.min_corner = (
+            np.full(3, -np.inf)
+            if min_corner is None
+            else np.array(min_corner, dtype=float)
+        )
+        self.max_corner = (
+            np.full(3, np.inf)
+            if max_corner is None
+            else np.array(max_corner, dtype=float)
+        )
+        if self.min_corner.shape != (3,) or self.max_corner.shape != (3,):
+            raise ValueError("crop corners must be XYZ coordinates")
+        if np.any(self.min_corner > self.max_corner):
+            raise ValueError(
+                f"crop min corner {self.min_corner} is greater "
+                f"than max corner {self.max_corner}"
+            )
+
+    def in_box(self, points: np.ndarray) -> np.ndarray:
+        """
+        Get whether each of the XYZ points (shape = [..., 3])
+        is inside the box
+        """
+        return np.all(
+            (points >= self.min_corner) & (points <= self.max_corner), axis=-1
+        )
+
+    def get_agent_mask(
+        self,
+        positions: np.ndarray,
+        n_subpoints: np.ndarray = None,
+        subpoints: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Get whether each agent is inside the box,
+        using the subpoints (shape = [..., agents, subpoints, 3])
+        for agents with n_subpoints > 0
+        and the positions (shape = [..., agents, 3]) for the others
+        """
+        result = self.in_box(positions)
+        if n_subpoints is None or subpoints is None or subpoints.size < 1:
+            return result
+        n_subpoints = n_subpoints.astype(int)
+        is_subpoint = np.arange(subpoints.shape[-2]) < n_subpoints[..., np.newaxis]
+        subpoints_in_box = np.all(self.in_box(subpoints) | ~is_subpoint, axis=-1)
+        has_subpoints = n_subpoints > 0
+        result[has_subpoints] = subpoints_in_box[has_subpoints]
+        return result
+
+    def get_box_size(self, box_size: np.ndarray) -> np.ndarray:
+        """
+        Get the size of the box after cropping
+        """
+        return np.minimum(
+            box_size,
+            2.0 * np.maximum(np.abs(self.min_corner), np.abs(self.max_corner)),
+        )
+
+    def crop_agent_data(self, agent_data: AgentData) -> AgentData:
+        """
+        Return new AgentData with only the agents inside the box
+        """
+        mask = self.get_agent_mask(
+            agent_data.positions, agent_data.n_subpoints, agent_data.subpoints
+        )
+        return agent_data.get_agent_subset(mask)
+
+    def apply(self, data: TrajectoryData) -> TrajectoryData:
+        """
+        Remove agents outside the box from the data
+        """
+        log.info(f"Filtering: crop to {self.min_corner} - {self.max_corner}")
+        data.agent_data = self.crop_agent_data(data.agent_data)
+        data.box_size = self.get_box_size(data.box_size)
+        log.info(f"cropped to max {int(np.amax(data.agent_data.n_agents))} agents")
+        return data
@@ -42,7 +42,7 @@ class EveryNthAgentFilter(Filter):
         Reduce the number of agents in each frame of the simularium
         data by filtering out all but every nth agent
         """
-        print("Filtering: every Nth agent -------------")
+        log.info("Filtering: every Nth agent")
         # get filtered data
         total_steps = data.agent_data.times.size
         n_agents = np.zeros_like(data.agent_data.n_agents)
@@ -91,7 +91,7 @@ class EveryNthAgentFilter(Filter):
         data.agent_data.radii = radii
         data.agent_data.n_subpoints = n_subpoints
         data.agent_data.subpoints = subpoints
-        print(
+        log.info(
             f"filtered dims = {total_steps} timesteps X "
             f"{int(np.amax(n_agents))} agents X "
             f"{int(np.amax(data.agent_data.n_subpoints))} subpoints"
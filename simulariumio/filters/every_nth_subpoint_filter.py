@@ -43,7 +43,7 @@ class EveryNthSubpointFilter(Filter):
         Reduce the number of subpoints in each frame of the simularium
         data by filtering out all but every nth subpoint
         """
-        print("Filtering: every Nth subpoint -------------")
+        log.info("Filtering: every Nth subpoint")
         # get dimensions
         total_steps = data.agent_data.times.size
         max_agents = int(np.amax(data.agent_data.n_agents))
@@ -68,7 +68,7 @@ class EveryNthSubpointFilter(Filter):
                 n_subpoints[t][n] = i
         data.agent_data.n_subpoints = n_subpoints
         data.agent_data.subpoints = subpoints
-        print(
+        log.info(
             f"filtered dims = {total_steps} timesteps X "
             f"{max_agents} agents X {int(np.amax(n_subpoints))} subpoints"
         )
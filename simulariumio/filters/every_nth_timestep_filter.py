@@ -18,6 +18,8 @@ log = logging.getLogger(__name__)
 
 class EveryNthTimestepFilter(Filter):
     n: int
+    # which timesteps are kept depends on their index in the whole trajectory
+    frame_wise: bool = False
 
     def __init__(
         self,
@@ -39,7 +41,7 @@ class EveryNthTimestepFilter(Filter):
         Reduce the number of timesteps in each frame of the simularium
         data by filtering out all but every nth timestep
         """
-        print(f"Filtering: every {self.n}th timestep -------------")
+        log.info(f"Filtering: every {self.n}th timestep")
         if self.n < 2:
             raise Exception("N < 2: no timesteps will be filtered")
         # get filtered dimensions
@@ -86,7 +88,7 @@ class EveryNthTimestepFilter(Filter):
         data.agent_data.radii = radii
         data.agent_data.n_subpoints = n_subpoints
         data.agent_data.subpoints = subpoints
-        print(
+        log.info(
             f"filtered dims = {times.shape[0]} timesteps X "
             f"{max_agents} agents X {max_subpoints} subpoints"
         )
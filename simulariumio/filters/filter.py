@@ -14,6 +14,10 @@ log = logging.getLogger(__name__)
 
 
 class Filter(ABC):
+    # whether the filter can be applied to each chunk of frames on its own,
+    # so it can filter frames as they are read (see pipeline.filter_frames)
+    frame_wise: bool = True
+
     @abstractmethod
     def apply(self, data: TrajectoryData) -> TrajectoryData:
         pass
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+
+import numpy as np
+
+from .filter import Filter
+from ..data_objects import TrajectoryData, AgentData
+from ..constants import VIZ_TYPE
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class GridClusterFilter(Filter):
+    cell_size: float
+
+    def __init__(self, cell_size: float):
+        """
+        This filter reduces the number of agents in each frame
+        of simularium data by replacing all the agents of each type
+        in each cell of a uniform grid with one sphere,
+        at the volume weighted center of the agents, with the radius
+        of a sphere with their total volume. Each cluster keeps
+        the same unique ID in every frame it's in.
+        Agents with subpoints (fibers) are not clustered
+
+        Parameters
+        ----------
+        cell_size : float
+            the size of the grid cells, in the data's spatial units
+        """
+        if cell_size <= 0:
+            raise ValueError(f"cell size must be positive, got {cell_size}")
+        self.cell_size = cell_size
+
+    def cluster_agent_data(self, agent_data: AgentData) -> AgentData:
+        """
+        Return new AgentData with the agents clustered
+        """
+        total_steps = agent_data.times.size
+        max_agents = agent_data.positions.shape[1]
+        type_mapping = agent_data.get_type_mapping()
+        valid = (
+            np.arange(max_agents)[np.newaxis, :]
+            < agent_data.n_agents.astype(int)[:, np.newaxis]
+        )
+        has_subpoints = (
+            agent_data.n_subpoints > 0
+            if agent_data.n_subpoints is not None
+            else np.zeros_like(valid)
+        )
+        is_fiber = valid & has_subpoints
+        # key each agent to be clustered by its type and grid cell
+        time_ix, agent_ix = np.nonzero(valid & ~has_subpoints)
+        cells = np.floor(agent_data.positions[time_ix, agent_ix] / self.cell_size)
+        keys = np.concatenate(
+            [agent_data.type_ids[time_ix, agent_ix][:, np.newaxis], cells], axis=1
+        ).astype(np.int64)
+        cluster_keys, cluster_ids = np.unique(keys, axis=0, return_inverse=True)
+        cluster_ids = np.reshape(cluster_ids, -1)
+        # group the agents in each cluster in each frame
+        n_clusters = max(cluster_keys.shape[0], 1)
+        frame_clusters, group_ids = np.unique(
+            time_ix * n_clusters + cluster_ids, return_inverse=True
+        )
+        group_ids = np.reshape(group_ids, -1)
+        group_times = frame_clusters // n_clusters
+        group_clusters = frame_clusters % n_clusters
+        volumes = agent_data.radii[time_ix, agent_ix] ** 3
+        group_volumes = np.bincount(group_ids, weights=volumes).astype(float)
+        group_radii = np.cbrt(group_volumes)
+        group_positions = np.stack(
+            [
+                np.bincount(
+                    group_ids,
+                    weights=volumes * agent_data.positions[time_ix, agent_ix, dim],
+                )
+                for dim in range(3)
+            ],
+            axis=1,
+        ).astype(float)
+        # agents with no volume are weighted equally
+        no_volume = group_volumes <= 0
+        if np.any(no_volume):
+            unweighted = np.stack(
+                [
+                    np.bincount(
+                        group_ids, weights=agent_data.positions[time_ix, agent_ix, dim]
+                    )
+                    for dim in range(3)
+                ],
+                axis=1,
+            )
+            group_positions[no_volume] = unweighted[no_volume]
+            group_volumes[no_volume] = np.bincount(group_ids)[no_volume]
+        group_positions /= group_volumes[:, np.newaxis]
+        # each frame has its clusters, then its fibers
+        n_frame_clusters = np.bincount(group_times, minlength=total_steps)
+        n_frame_fibers = np.count_nonzero(is_fiber, axis=1)
+        n_agents = n_frame_clusters + n_frame_fibers
+        new_max_agents = int(np.amax(n_agents)) if total_steps > 0 else 0
+        first_group = np.concatenate([[0], np.cumsum(n_frame_clusters)[:-1]])
+        group_slots = np.arange(group_times.size) - first_group[group_times]
+        fiber_times, fiber_ix = np.nonzero(is_fiber)
+        fiber_slots = (
+            n_frame_clusters[fiber_times]
+            + (np.cumsum(is_fiber, axis=1) - 1)[fiber_times, fiber_ix]
+        )
+        first_uid = (
+            int(np.amax(agent_data.unique_ids[valid])) + 1 if np.any(valid) else 0
+        )
+        result = AgentData(
+            times=np.copy(agent_data.times),
+            n_agents=n_agents,
+            viz_types=np.full((total_steps, new_max_agents), VIZ_TYPE.DEFAULT),
+            unique_ids=np.zeros((total_steps, new_max_agents)),
+            types=[],
+            positions=np.zeros((total_steps, new_max_agents, 3)),
+            radii=np.ones((total_steps, new_max_agents)),
+            n_subpoints=(
+                np.zeros((total_steps, new_max_agents))
+                if agent_data.n_subpoints is not None
+                else None
+            ),
+            subpoints=(
+                np.zeros((total_steps, new_max_agents) + agent_data.subpoints.shape[2:])
+                if agent_data.subpoints is not None
+                else None
+            ),
+            draw_fiber_points=agent_data.draw_fiber_points,
+            type_ids=np.zeros((total_steps, new_max_agents)),
+        )
+        result.type_mapping = type_mapping
+        # clusters
+        result.unique_ids[group_times, group_slots] = first_uid + group_clusters
+        result.type_ids[group_times, group_slots] = cluster_keys[group_clusters, 0]
+        result.positions[group_times, group_slots] = group_positions
+        result.radii[group_times, group_slots] = group_radii
+        # fibers
+        for field in ["viz_types", "unique_ids", "type_ids", "positions", "radii"]:
+            getattr(result, field)[fiber_times, fiber_slots] = getattr(
+                agent_data, field
+            )[fiber_times, fiber_ix]
+        if result.subpoints is not None:
+            result.n_subpoints[fiber_times, fiber_slots] = agent_data.n_subpoints[
+                fiber_times, fiber_ix
+            ]
+            result.subpoints[fiber_times, fiber_slots] = agent_data.subpoints[
+                fiber_times, fiber_ix
+            ]
+        # type names
+        result.types = [
+            [
+                type_mapping[str(int(type_id))]["name"]
+                for type_id in result.type_ids[t][: n_agents[t]]
+            ]
+            for t in range(total_steps)
+        ]
+        return result
+
+    def apply(self, data: TrajectoryData) -> TrajectoryData:
+        """
+        Reduce the number of agents in each frame of the simularium
+        data by clustering agents of the same type in each grid cell
+        """
+        log.info(f"Filtering: grid clusters of size {self.cell_size}")
+        data.agent_data = self.cluster_agent_data(data.agent_data)
+        log.info(
+            f"filtered dims = {data.agent_data.times.size} timesteps X "
+            f"{int(np.amax(data.agent_data.n_agents))} agents"
+        )
+        return data
@@ -34,9 +34,7 @@ class MultiplySpaceFilter(Filter):
         """
         Multiply spatial values in the data
         """
-        print(
-            f"Filtering: multiplying spatial scale by {self.multiplier} -------------"
-        )
+        log.info(f"Filtering: multiplying spatial scale by {self.multiplier}")
         data.box_size = self.multiplier * data.box_size
         data.agent_data.positions = self.multiplier * data.agent_data.positions
         data.agent_data.radii = self.multiplier * data.agent_data.radii
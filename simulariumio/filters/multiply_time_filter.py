@@ -43,7 +43,7 @@ class MultiplyTimeFilter(Filter):
         """
         Multiply time values in the data
         """
-        print(f"Filtering: multiplying time by {self.multiplier} -------------")
+        log.info(f"Filtering: multiplying time by {self.multiplier}")
         # plot data
         if self.apply_to_plots:
             for p in range(len(data.plots)):
@@ -38,7 +38,7 @@ class ReorderAgentsFilter(Filter):
         Change the type IDs of the agents, so that the agents are listed
         and colored in a different order
         """
-        print("Filtering: reorder agents -------------")
+        log.info("Filtering: reorder agents")
         # get dimensions
         total_steps = data.agent_data.times.size
         max_agents = int(np.amax(data.agent_data.n_agents))
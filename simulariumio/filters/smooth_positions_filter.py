@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+
+import numpy as np
+
+from .windowed_filter import WindowedFilter
+from ..data_objects import AgentData, TrajectoryData
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class SmoothPositionsFilter(WindowedFilter):
+    half_width: int
+
+    def __init__(self, half_width: int):
+        """
+        This filter smooths the motion of agents by replacing
+        each agent's position with the mean of its positions
+        in the frames around it, matching agents by unique ID.
+        Fiber subpoints are not changed
+
+        Parameters
+        ----------
+        half_width : int
+            the number of frames before and after each frame to average
+        """
+        if half_width < 1:
+            raise ValueError(f"half width must be at least 1, got {half_width}")
+        self.half_width = half_width
+        self.n_before = half_width
+        self.n_after = half_width
+
+    def apply(self, data: TrajectoryData) -> TrajectoryData:
+        """
+        Return new data with each agent's position averaged
+        over the neighbouring frames
+        """
+        log.info(f"Filtering: smooth positions over {2 * self.half_width + 1} frames")
+        return super().apply(data)
+
+    def apply_window(
+        self, data: TrajectoryData, start: int, end: int
+    ) -> TrajectoryData:
+        """
+        Return new data with the frames from start to end,
+        with each agent's position averaged over the neighbouring frames
+        """
+        # this runs for each chunk of frames in the pipeline
+        log.debug(
+            f"Filtering: smooth positions over {2 * self.half_width + 1} frames "
+            f"for frames {start} to {end}"
+        )
+        agent_data = data.agent_data
+        total_steps = agent_data.times.size
+        n_agents = agent_data.n_agents.astype(int)
+        result = agent_data.get_frames(start, end)
+        for t in range(start, end):
+            uids = agent_data.unique_ids[t][: n_agents[t]]
+            position_sums = np.zeros((uids.size, 3))
+            counts = np.zeros(uids.size)
+            for t_other in range(
+                max(0, t - self.half_width), min(total_steps, t + self.half_width + 1)
+            ):
+                agent_ix = AgentData._get_agent_indices(
+                    agent_data.unique_ids[t_other][: n_agents[t_other]], uids
+                )
+                found = agent_ix >= 0
+                position_sums[found] += agent_data.positions[t_other][agent_ix[found]]
+                counts[found] += 1
+            result.positions[t - start][: uids.size] = (
+                position_sums / np.maximum(counts, 1)[:, np.newaxis]
+            )
+        return TrajectoryData(
+            box_size=data.box_size,
+            agent_data=result,
+            time_units=data.time_units,
+            spatial_units=data.spatial_units,
+            plots=data.plots,
+        )
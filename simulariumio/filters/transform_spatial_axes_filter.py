@@ -65,7 +65,7 @@ class TransformSpatialAxesFilter(Filter):
         """
         Transform spatial coordinates to rotate and/or reflect the scene
         """
-        print(f"Filtering: transform spatial axes {self.axes_mapping} -------------")
+        log.info(f"Filtering: transform spatial axes {self.axes_mapping}")
         # box size
         box_size = self._transform_coordinate(data.box_size, False)
         # get dimensions
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+from abc import abstractmethod
+
+from .filter import Filter
+from ..data_objects import TrajectoryData
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class WindowedFilter(Filter):
+    # the frames before and after each frame that are needed to filter it
+    n_before: int = 0
+    n_after: int = 0
+    frame_wise: bool = False
+
+    @abstractmethod
+    def apply_window(
+        self, data: TrajectoryData, start: int, end: int
+    ) -> TrajectoryData:
+        """
+        Return new data with the filtered frames from start
+        up to (not including) end, the frames before start and from end on
+        are only there as neighbours. The given data must not be changed
+        """
+        pass
+
+    def apply(self, data: TrajectoryData) -> TrajectoryData:
+        """
+        Filter every frame of the data
+        """
+        return self.apply_window(data, 0, data.agent_data.times.size)
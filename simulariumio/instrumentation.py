@@ -0,0 +1,425 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from .data_objects import AgentData
+from .exceptions import ConversionCancelled
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+def get_max_rss() -> int:
+    """
+    Get the peak resident memory of this process so far in bytes,
+    or None if it's not available on this platform
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return int(max_rss if sys.platform == "darwin" else 1024 * max_rss)
+
+
+class StageStats:
+    name: str
+    calls: int
+    wall_time: float
+    cpu_time: float
+    max_rss: int
+    peak_allocated: int
+    n_frames: int
+    n_agents: int
+    bytes_written: int
+
+    def __init__(self, name: str):
+        """
+        This object contains the measurements for one stage
+        of a conversion (e.g. "parse", "filter", "pack", "serialize",
+        or "write"), summed over every time the stage ran,
+        except the max RSS, peak allocations, and max agents
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage
+        """
+        self.name = name
+        self.calls = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.max_rss = None
+        self.peak_allocated = None
+        self.n_frames = 0
+        self.n_agents = 0
+        self.bytes_written = 0
+
+    def count(self, agent_data: AgentData, n_frames: int = None):
+        """
+        Add the number of frames the stage handled
+        (by default every frame of the agent data),
+        and record the max number of agents in a frame
+        """
+        self.n_frames += int(agent_data.times.size) if n_frames is None else n_frames
+        if agent_data.n_agents.size > 0:
+            self.n_agents = max(self.n_agents, int(np.amax(agent_data.n_agents)))
+
+    def add(self, other: "StageStats"):
+        """
+        Add the measurements of the same stage run somewhere else,
+        e.g. in a worker process, keeping the larger max RSS,
+        peak allocations, and max agents
+        """
+        self.calls += other.calls
+        self.wall_time += other.wall_time
+        self.cpu_time += other.cpu_time
+        if other.max_rss is not None:
+            self.max_rss = max(self.max_rss or 0, other.max_rss)
+        if other.peak_allocated is not None:
+            self.peak_allocated = max(self.peak_allocated or 0, other.peak_allocated)
+        self.n_frames += other.n_frames
+        self.n_agents = max(self.n_agents, other.n_agents)
+        self.bytes_written += other.bytes_written
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the measurements as a JSON serializable dict
+        """
+        return {
+            "calls": self.calls,
+            "wallTime": self.wall_time,
+            "cpuTime": self.cpu_time,
+            "maxRSS": self.max_rss,
+            "peakAllocated": self.peak_allocated,
+            "frames": self.n_frames,
+            "agents": self.n_agents,
+            "bytesWritten": self.bytes_written,
+        }
+
+
+class ConversionProgress:
+    stage: str
+    n_frames: int
+    total_frames: int
+    bytes_written: int
+
+    def __init__(
+        self,
+        stage: str,
+        n_frames: int,
+        total_frames: int = None,
+        bytes_written: int = 0,
+    ):
+        """
+        This object reports how far a running conversion has gotten
+
+        Parameters
+        ----------
+        stage : str
+            The name of the stage that is running
+        n_frames : int
+            The number of frames the stage has handled so far
+        total_frames : int (optional)
+            The number of frames the stage will handle, if known
+            Default: None
+        bytes_written : int (optional)
+            The number of uncompressed bytes written so far
+            in the whole conversion
+            Default: 0
+        """
+        self.stage = stage
+        self.n_frames = n_frames
+        self.total_frames = total_frames
+        self.bytes_written = bytes_written
+
+    def __repr__(self) -> str:
+        return (
+            f"ConversionProgress(stage={self.stage}, n_frames={self.n_frames}, "
+            f"total_frames={self.total_frames}, "
+            f"bytes_written={self.bytes_written})"
+        )
+
+
+class CancellationToken:
+    def __init__(self):
+        """
+        This object is shared with a running conversion so it can be
+        cancelled from another thread, e.g. when a job runs out of time.
+        The conversion raises ConversionCancelled at the next frame,
+        filter, or bundle of frames after cancel is called
+        """
+        self._event = threading.Event()
+
+    def cancel(self):
+        """
+        Ask the conversion to stop
+        """
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        Whether cancel was called
+        """
+        return self._event.is_set()
+
+
+class _CountingWriter:
+    def __init__(self, outfile: Any):
+        """
+        Wrap a text file to count the characters written to it,
+        which are bytes for JSON with only ASCII characters
+        """
+        self._outfile = outfile
+        self.n_written = 0
+
+    def write(self, text: str) -> int:
+        self.n_written += len(text)
+        return self._outfile.write(text)
+
+    def flush(self):
+        self._outfile.flush()
+
+    def take_count(self) -> int:
+        """
+        Get the number of characters written since the last call
+        """
+        n_written = self.n_written
+        self.n_written = 0
+        return n_written
+
+
+class _ActiveStage:
+    def __init__(self, stage: StageStats):
+        self.stage = stage
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.child_wall_time = 0.0
+        self.child_cpu_time = 0.0
+        self.peak_allocated = 0
+
+
+class ConversionStats:
+    stages: Dict[str, StageStats]
+    callbacks: List[Callable[[StageStats], None]]
+    progress_callbacks: List[Callable[[ConversionProgress], None]]
+    cancellation_token: CancellationToken
+    bytes_written: int
+
+    def __init__(
+        self,
+        callbacks: List[Callable[[StageStats], None]] = None,
+        progress_callbacks: List[Callable[[ConversionProgress], None]] = None,
+        cancellation_token: CancellationToken = None,
+    ):
+        """
+        This object measures the wall time, CPU time, memory,
+        and number of frames and agents for each stage of a conversion.
+        Stages can be nested, the times for a stage don't include
+        the time spent in stages inside it. Peak allocations
+        are only measured if tracemalloc is tracing.
+        It also reports progress while stages run, and stops
+        the conversion if the cancellation token is cancelled
+
+        Parameters
+        ----------
+        callbacks : List[Callable[[StageStats], None]] (optional)
+            Functions to call with the stage's stats
+            each time a stage finishes
+            Default: None
+        progress_callbacks : List[Callable[[ConversionProgress], None]] (optional)
+            Functions to call with the progress of the running stage
+            each time it handles a frame, a filter, or a bundle of frames
+            Default: None
+        cancellation_token : CancellationToken (optional)
+            When it is cancelled, the conversion raises ConversionCancelled
+            the next time it reports progress or starts a stage
+            Default: None (the conversion can't be cancelled)
+        """
+        self.stages = {}
+        self.callbacks = list(callbacks) if callbacks is not None else []
+        self.progress_callbacks = (
+            list(progress_callbacks) if progress_callbacks is not None else []
+        )
+        self.cancellation_token = cancellation_token
+        self.bytes_written = 0
+        self._active = []
+
+    def add_callback(self, callback: Callable[[StageStats], None]):
+        """
+        Call the function with the stage's stats each time a stage finishes
+        """
+        self.callbacks.append(callback)
+
+    def add_progress_callback(self, callback: Callable[[ConversionProgress], None]):
+        """
+        Call the function with the progress of the running stage
+        each time it handles a frame, a filter, or a bundle of frames
+        """
+        self.progress_callbacks.append(callback)
+
+    def check_cancelled(self, stage_name: str):
+        """
+        Raise ConversionCancelled if the cancellation token was cancelled
+        """
+        if self.cancellation_token is not None and self.cancellation_token.cancelled:
+            log.info(f"Conversion cancelled during {stage_name}")
+            raise ConversionCancelled(stage_name)
+
+    def report(
+        self,
+        stage_name: str,
+        n_frames: int,
+        total_frames: int = None,
+        bytes_written: int = 0,
+    ):
+        """
+        Pass the progress of the stage to the progress callbacks,
+        adding the bytes written since the last report,
+        then stop if the conversion was cancelled
+        """
+        self.bytes_written += bytes_written
+        if bytes_written > 0 and stage_name in self.stages:
+            self.stages[stage_name].bytes_written += bytes_written
+        if self.progress_callbacks:
+            progress = ConversionProgress(
+                stage_name, n_frames, total_frames, self.bytes_written
+            )
+            for callback in self.progress_callbacks:
+                callback(progress)
+        self.check_cancelled(stage_name)
+
+    def _enter(self, name: str) -> _ActiveStage:
+        self.check_cancelled(name)
+        if name not in self.stages:
+            self.stages[name] = StageStats(name)
+        if tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak"):
+            if self._active:
+                parent = self._active[-1]
+                parent.peak_allocated = max(
+                    parent.peak_allocated, tracemalloc.get_traced_memory()[1]
+                )
+            tracemalloc.reset_peak()
+        active = _ActiveStage(self.stages[name])
+        self._active.append(active)
+        return active
+
+    def _exit(self, active: _ActiveStage, count_call: bool = True):
+        wall_time = time.perf_counter() - active.wall_start
+        cpu_time = time.process_time() - active.cpu_start
+        self._active.remove(active)
+        stage = active.stage
+        if count_call:
+            stage.calls += 1
+        stage.wall_time += wall_time - active.child_wall_time
+        stage.cpu_time += cpu_time - active.child_cpu_time
+        stage.max_rss = get_max_rss()
+        if tracemalloc.is_tracing():
+            active.peak_allocated = max(
+                active.peak_allocated, tracemalloc.get_traced_memory()[1]
+            )
+            stage.peak_allocated = max(stage.peak_allocated or 0, active.peak_allocated)
+        if self._active:
+            parent = self._active[-1]
+            parent.child_wall_time += wall_time
+            parent.child_cpu_time += cpu_time
+            parent.peak_allocated = max(parent.peak_allocated, active.peak_allocated)
+
+    def _finish(self, stage: StageStats):
+        """
+        Log the stage's stats and pass them to the callbacks
+        """
+        log.info(
+            f"{stage.name}: {stage.wall_time:.3f} s wall, "
+            f"{stage.cpu_time:.3f} s CPU, {stage.n_frames} frames, "
+            f"max {stage.n_agents} agents"
+        )
+        for callback in self.callbacks:
+            callback(stage)
+
+    def add_stage(self, stage: StageStats):
+        """
+        Add the stats of a stage that ran somewhere else,
+        e.g. in a worker process, to the stage with the same name
+        """
+        if stage.name not in self.stages:
+            self.stages[stage.name] = StageStats(stage.name)
+        self.stages[stage.name].add(stage)
+        self._finish(self.stages[stage.name])
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        """
+        Measure the code in the with block as the named stage
+        """
+        active = self._enter(name)
+        try:
+            yield active.stage
+        finally:
+            self._exit(active)
+        self._finish(active.stage)
+
+    def timed_iter(
+        self,
+        name: str,
+        iterable: Iterable[Any],
+        agent_data: AgentData = None,
+        total_frames: int = None,
+        chunks: bool = False,
+    ) -> Iterator[Any]:
+        """
+        Measure getting each item from the iterable as the named stage,
+        and count and report the items as frames, or if chunks is True
+        the items are TrajectoryData and the frames in each are counted.
+        The stage is finished when the iterable is exhausted
+        """
+        iterator = iter(iterable)
+        n_frames = 0
+        while True:
+            active = self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                self._exit(active, count_call=False)
+            if chunks:
+                n_frames += int(item.agent_data.times.size)
+                if item.agent_data.n_agents.size > 0:
+                    active.stage.n_agents = max(
+                        active.stage.n_agents, int(np.amax(item.agent_data.n_agents))
+                    )
+            else:
+                n_frames += 1
+            self.report(name, n_frames, total_frames)
+            yield item
+        stage = self.stages[name]
+        stage.calls += 1
+        if agent_data is not None:
+            stage.count(agent_data, n_frames)
+        else:
+            stage.n_frames += n_frames
+        self._finish(stage)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the stats for each stage as a JSON serializable dict
+        """
+        return {name: stage.to_dict() for name, stage in self.stages.items()}
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .data_objects import AgentData
+from .delta_encoding import DeltaEncoding
+from .instrumentation import ConversionStats, StageStats
+from .serializers import FrameSerializer
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+SHARED_AGENT_FIELDS = [
+    "times",
+    "n_agents",
+    "viz_types",
+    "unique_ids",
+    "type_ids",
+    "positions",
+    "radii",
+    "n_subpoints",
+    "subpoints",
+]
+
+# the bundles submitted to the pool ahead of the one being written,
+# per process, so finished bundles don't pile up in memory
+MAX_QUEUED_PER_PROCESS = 2
+
+# state attached in each worker process by _init_worker
+_worker_agent_data = None
+_worker_fiber_point_uids = None
+_worker_serializer = None
+_worker_delta_encoding = None
+_worker_shared_memory = []
+
+###############################################################################
+
+
+def _share_array(array: np.ndarray, blocks: List[Any]) -> Tuple[str, Tuple, str]:
+    """
+    Copy the array into a new shared memory block,
+    return the info needed to attach to it from another process
+    """
+    from multiprocessing import shared_memory
+
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(block)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return (block.name, array.shape, array.dtype.str)
+
+
+def _get_npy_file_path(array: np.ndarray) -> str:
+    """
+    If the array is a whole .npy file memory-mapped by np.load
+    (e.g. by AgentData.load), return the file path so workers
+    can map it too instead of copying it to shared memory
+    """
+    if not isinstance(array, np.memmap) or array.filename is None:
+        return None
+    try:
+        with open(array.filename, "rb") as npy_file:
+            version = np.lib.format.read_magic(npy_file)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(npy_file)
+            else:
+                header = np.lib.format.read_array_header_2_0(npy_file)
+            data_offset = npy_file.tell()
+    except (OSError, ValueError):
+        return None
+    shape, fortran_order, dtype = header
+    # slices of the mapped array keep its filename and offset
+    if (
+        shape != array.shape
+        or dtype != array.dtype
+        or data_offset != array.offset
+        or fortran_order
+    ):
+        return None
+    return array.filename
+
+
+def _attach_array(array_info: Tuple[str, Tuple, str]) -> np.ndarray:
+    """
+    Attach to a shared memory block created by _share_array,
+    or memory-map the .npy file if the info is a file path
+    """
+    from multiprocessing import shared_memory
+
+    if isinstance(array_info, str):
+        return np.load(array_info, mmap_mode="r")
+    name, shape, dtype = array_info
+    block = shared_memory.SharedMemory(name=name)
+    _worker_shared_memory.append(block)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _init_worker(
+    array_infos: Dict[str, Tuple[str, Tuple, str]],
+    draw_fiber_points: bool,
+    fiber_point_uid_infos: Tuple[Tuple, Tuple],
+    serializer: FrameSerializer,
+    delta_encoding: DeltaEncoding,
+):
+    """
+    Create a read-only AgentData view of the shared arrays in a worker process
+    """
+    global _worker_agent_data, _worker_fiber_point_uids, _worker_serializer
+    global _worker_delta_encoding
+    arrays = {
+        field: _attach_array(array_infos[field]) if field in array_infos else None
+        for field in SHARED_AGENT_FIELDS
+    }
+    type_ids = arrays.pop("type_ids")
+    _worker_agent_data = AgentData(
+        types=None, draw_fiber_points=draw_fiber_points, type_ids=type_ids, **arrays
+    )
+    _worker_fiber_point_uids = (
+        tuple(_attach_array(info) for info in fiber_point_uid_infos)
+        if fiber_point_uid_infos is not None
+        else None
+    )
+    _worker_serializer = serializer
+    _worker_delta_encoding = delta_encoding
+
+
+def _pack_frames(frame_range: Tuple[int, int]) -> Tuple[str, List[StageStats]]:
+    """
+    Pack and serialize the frames in the range in a worker process,
+    return the serialized frames and the stats for the pack
+    and serialize stages
+    """
+    from .trajectory_converter import TrajectoryConverter
+
+    stats = ConversionStats()
+    result = TrajectoryConverter._serialize_frames(
+        _worker_agent_data,
+        frame_range[0],
+        frame_range[1],
+        _worker_fiber_point_uids,
+        _worker_serializer,
+        _worker_delta_encoding,
+        stats,
+    )
+    return result, list(stats.stages.values())
+
+
+def pack_frames_in_parallel(
+    agent_data: AgentData,
+    frame_ranges: List[Tuple[int, int]],
+    n_processes: int,
+    serializer: FrameSerializer,
+    fiber_point_uids: Tuple[np.ndarray, np.ndarray] = None,
+    delta_encoding: DeltaEncoding = None,
+    stats: ConversionStats = None,
+) -> Iterator[str]:
+    """
+    Pack and serialize the spatial data for each range of frames
+    in a pool of processes that read the agent data from shared memory
+    (or memory-map it, if it was memory-mapped from .npy files),
+    yield the serialized frames for each range in order.
+    At most two ranges per process are submitted ahead of the one
+    being written, so memory is bounded by a few bundles
+
+    Parameters
+    ----------
+    agent_data : AgentData
+        the agent data to pack, type_ids must already be set
+    frame_ranges : List[Tuple[int, int]]
+        the start and end (not included) frame of each range to pack
+    n_processes : int
+        the number of worker processes
+    serializer : FrameSerializer
+        the backend used to write the frames as JSON
+    fiber_point_uids : Tuple[np.ndarray, np.ndarray] (optional)
+        fiber agent unique IDs and the table of unique IDs
+        for spheres drawn at their points, required if
+        agent_data.draw_fiber_points is True
+    delta_encoding : DeltaEncoding (optional)
+        encode the frames in each range as a keyframe followed by deltas
+    stats : ConversionStats (optional)
+        add each worker's pack and serialize stats to these,
+        the times are summed over the workers
+    """
+    blocks = []
+    try:
+        array_infos = {}
+        for field in SHARED_AGENT_FIELDS:
+            array = getattr(agent_data, field)
+            if array is None:
+                continue
+            npy_file_path = _get_npy_file_path(array)
+            array_infos[field] = (
+                npy_file_path
+                if npy_file_path is not None
+                else _share_array(array, blocks)
+            )
+        fiber_point_uid_infos = (
+            tuple(_share_array(array, blocks) for array in fiber_point_uids)
+            if fiber_point_uids is not None
+            else None
+        )
+        with ProcessPoolExecutor(
+            max_workers=n_processes,
+            initializer=_init_worker,
+            initargs=(
+                array_infos,
+                agent_data.draw_fiber_points,
+                fiber_point_uid_infos,
+                serializer,
+                delta_encoding,
+            ),
+        ) as executor:
+            remaining_ranges = iter(frame_ranges)
+            futures = deque(
+                executor.submit(_pack_frames, frame_range)
+                for _, frame_range in zip(
+                    range(MAX_QUEUED_PER_PROCESS * n_processes), remaining_ranges
+                )
+            )
+            while futures:
+                serialized_frames, stages = futures.popleft().result()
+                if stats is not None:
+                    for stage in stages:
+                        stats.add_stage(stage)
+                for frame_range in remaining_ranges:
+                    futures.append(executor.submit(_pack_frames, frame_range))
+                    break
+                yield serialized_frames
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
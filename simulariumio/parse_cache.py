@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+CACHE_FILE_EXTENSION = ".npz"
+# key in the cached .npz for the JSON-encoded non-array data
+METADATA_KEY = "__metadata__"
+
+###############################################################################
+
+
+class ParseCache:
+    cache_dir: str
+    max_size: int
+    hash_contents: bool
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_size: int = 2**30,
+        hash_contents: bool = False,
+    ):
+        """
+        This object is an on-disk cache of parsed simulation data,
+        so converters can skip parsing input files that haven't
+        changed when only display settings (names, radii,
+        scale, etc) change. Each entry is saved as a .npz file
+        and the least recently used entries are deleted
+        when the cache grows larger than max_size
+
+        Parameters
+        ----------
+        cache_dir : str
+            the directory to save cached data in
+        max_size : int (optional)
+            the maximum total size of the cached files in bytes
+            Default: 1 GiB
+        hash_contents : bool (optional)
+            include a hash of each input file's contents in the key,
+            rather than only its path, size, and modification time
+            Default: False
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hash_contents = hash_contents
+
+    @staticmethod
+    def _get_file_paths(input_path: str) -> List[str]:
+        """
+        Get the files to key on for an input path,
+        every file in it if the path is a directory
+        """
+        if not os.path.isdir(input_path):
+            return [input_path]
+        return sorted(
+            os.path.join(input_path, file_name)
+            for file_name in os.listdir(input_path)
+            if os.path.isfile(os.path.join(input_path, file_name))
+        )
+
+    @staticmethod
+    def _hash_file_contents(file_path: str) -> str:
+        file_hash = hashlib.sha256()
+        with open(file_path, "rb") as input_file:
+            for chunk in iter(lambda: input_file.read(1 << 20), b""):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    def get_key(self, input_paths: List[str], options: Dict[str, Any]) -> str:
+        """
+        Get the cache key for parsing the input files or directories
+        with the given parse options, which must be JSON serializable
+        """
+        file_info = []
+        for input_path in input_paths:
+            for file_path in ParseCache._get_file_paths(input_path):
+                stat = os.stat(file_path)
+                info = [os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns]
+                if self.hash_contents:
+                    info.append(ParseCache._hash_file_contents(file_path))
+                file_info.append(info)
+        key_data = json.dumps(
+            {"files": file_info, "options": options}, sort_keys=True, default=str
+        )
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+    def _get_cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_FILE_EXTENSION)
+
+    def load(self, key: str) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Load the arrays and metadata cached for the key,
+        returns None if the key isn't cached
+        """
+        cache_path = self._get_cache_path(key)
+        if not os.path.isfile(cache_path):
+            return None
+        try:
+            with np.load(cache_path, allow_pickle=False) as cached:
+                arrays = {
+                    name: cached[name] for name in cached.files if name != METADATA_KEY
+                }
+                metadata = json.loads(str(cached[METADATA_KEY]))
+        except (OSError, ValueError, KeyError) as e:
+            log.warning(f"ignoring unreadable cache file {cache_path}: {e}")
+            return None
+        # mark it as recently used
+        os.utime(cache_path)
+        log.info(f"loaded parsed data from cache {cache_path}")
+        return arrays, metadata
+
+    def save(self, key: str, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]):
+        """
+        Cache the arrays and JSON serializable metadata for the key,
+        then delete the least recently used entries
+        if the cache is too large
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = self._get_cache_path(key)
+        # write to a temporary file so readers never see a partial file
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as cache_file:
+            np.savez(
+                cache_file,
+                **{METADATA_KEY: np.array(json.dumps(metadata))},
+                **arrays,
+            )
+        os.replace(temp_path, cache_path)
+        self._evict(keep_path=cache_path)
+
+    def load_or_parse(
+        self,
+        input_paths: List[str],
+        options: Dict[str, Any],
+        parse: Callable[[], Tuple[Dict[str, np.ndarray], Dict[str, Any]]],
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Load the arrays and metadata parsed from the input paths
+        with the given parse options if they're cached,
+        otherwise call parse to get them and cache the result
+        """
+        key = self.get_key(input_paths, options)
+        cached = self.load(key)
+        if cached is not None:
+            return cached
+        arrays, metadata = parse()
+        self.save(key, arrays, metadata)
+        return arrays, metadata
+
+    def _evict(self, keep_path: str = None):
+        """
+        Delete the least recently used cache files
+        until the cache is no larger than max_size
+        """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(CACHE_FILE_EXTENSION):
+                continue
+            path = os.path.join(self.cache_dir, file_name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total_size = sum(entry[1] for entry in entries)
+        for mtime, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if path == keep_path:
+                continue
+            os.remove(path)
+            total_size -= size
+
+    def clear(self):
+        """
+        Delete every cached file
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith(CACHE_FILE_EXTENSION):
+                os.remove(os.path.join(self.cache_dir, file_name))
@@ -2,7 +2,7 @@ import xml.etree.ElementTree as ET
 import numpy as np
 import pandas as pd
 import scipy.io as sio
-import sys
+import logging
 import warnings
 from pathlib import Path
 
@@ -11,6 +11,12 @@ Source: https://github.com/PhysiCell-Tools/python-loader/blob/
 c6b40c0d1042a757c638b9da1ff1b602caad721a/pyMCDS.py
 """
 
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
 
 class pyMCDS:
     """
@@ -123,7 +129,7 @@ class pyMCDS:
             or np.abs(dy - dz) > 1e-10
             or np.abs(dx - dz) > 1e-10
         ):
-            print("Warning: grid spacing may be axis dependent.")
+            log.warning("grid spacing may be axis dependent.")
 
         return round(dx)
 
@@ -356,7 +362,7 @@ class pyMCDS:
         xml_file = output_path / xml_file
         tree = ET.parse(xml_file)
 
-        print("Reading {}".format(xml_file))
+        log.debug("Reading {}".format(xml_file))
 
         root = tree.getroot()
         MCDS = {}
@@ -385,15 +391,15 @@ class pyMCDS:
         # while we're at it, find the mesh
         coord_str = mesh_node.find("x_coordinates").text
         delimiter = mesh_node.find("x_coordinates").get("delimiter")
-        x_coords = np.array(coord_str.split(delimiter), dtype=np.float)
+        x_coords = np.array(coord_str.split(delimiter), dtype=float)
 
         coord_str = mesh_node.find("y_coordinates").text
         delimiter = mesh_node.find("y_coordinates").get("delimiter")
-        y_coords = np.array(coord_str.split(delimiter), dtype=np.float)
+        y_coords = np.array(coord_str.split(delimiter), dtype=float)
 
         coord_str = mesh_node.find("z_coordinates").text
         delimiter = mesh_node.find("z_coordinates").get("delimiter")
-        z_coords = np.array(coord_str.split(delimiter), dtype=np.float)
+        z_coords = np.array(coord_str.split(delimiter), dtype=float)
 
         # reshape into a mesh grid
         xx, yy, zz = np.meshgrid(x_coords, y_coords, z_coords)
@@ -441,13 +447,13 @@ class pyMCDS:
             try:
                 me_data = sio.loadmat(me_path)["multiscale_microenvironment"]
             except FileNotFoundError:
-                print("'{}' referenced in '{}'".format(me_path, xml_file))
-                sys.exit(1)
+                log.error("'{}' referenced in '{}'".format(me_path, xml_file))
+                raise
             except PermissionError:
-                print("'{}' referenced in '{}'".format(me_path, xml_file))
-                sys.exit(1)
+                log.error("'{}' referenced in '{}'".format(me_path, xml_file))
+                raise
 
-            print("Reading {}".format(me_path))
+            log.debug("Reading {}".format(me_path))
 
             var_children = variables_node.findall("variable")
 
@@ -462,7 +468,7 @@ class pyMCDS:
                     "units"
                 )
 
-                print("Parsing {:s} data".format(species_name))
+                log.debug("Parsing {:s} data".format(species_name))
 
                 # initialize array for concentration data
                 MCDS["continuum_variables"][species_name]["data"] = np.zeros(xx.shape)
@@ -535,13 +541,13 @@ class pyMCDS:
         try:
             cell_data = sio.loadmat(cell_path)["cells"]
         except FileNotFoundError:
-            print("'{}' referenced in '{}'".format(cell_path, xml_file))
-            sys.exit(1)
+            log.error("'{}' referenced in '{}'".format(cell_path, xml_file))
+            raise
         except PermissionError:
-            print("'{}' referenced in '{}'".format(cell_path, xml_file))
-            sys.exit(1)
+            log.error("'{}' referenced in '{}'".format(cell_path, xml_file))
+            raise
 
-        print("Reading {}".format(cell_path))
+        log.debug("Reading {}".format(cell_path))
 
         for col in range(len(data_labels)):
             MCDS["discrete_cells"][data_labels[col]] = cell_data[col, :]
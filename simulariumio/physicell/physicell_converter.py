@@ -2,13 +2,14 @@
 # -*- coding: utf-8 -*-
 
 import logging
-from typing import Dict, Tuple
+from typing import Any, Dict, Tuple
 from pathlib import Path
 
 import numpy as np
 from .dep.pyMCDS import pyMCDS
 
 from ..trajectory_converter import TrajectoryConverter
+from ..instrumentation import ConversionStats
 from ..data_objects import TrajectoryData, AgentData, UnitData
 from ..exceptions import MissingDataError
 from ..constants import VIZ_TYPE
@@ -22,7 +23,7 @@ log = logging.getLogger(__name__)
 
 
 class PhysicellConverter(TrajectoryConverter):
-    def __init__(self, input_data: PhysicellData):
+    def __init__(self, input_data: PhysicellData, stats: ConversionStats = None):
         """
         This object reads simulation trajectory outputs
         from PhysiCell (http://physicell.org/)
@@ -34,25 +35,43 @@ class PhysicellConverter(TrajectoryConverter):
         input_data : PhysicellData
             An object containing info for reading
             PhysiCell simulation trajectory outputs and plot data
+        stats : ConversionStats (optional)
+            Measures each stage of the conversion, reports progress,
+            and can cancel the conversion
+            Default: None (a new ConversionStats)
         """
         self._ids = {}
         self._last_id = 0
         self._type_mapping = {}
-        self._data = self._read(input_data)
+        self.stats = stats if stats is not None else ConversionStats()
+        with self.stats.stage("parse") as stage:
+            self._data = self._read(input_data)
+            stage.count(self._data.agent_data)
+        self.stats.report("parse", stage.n_frames, stage.n_frames)
 
-    def _load_data(self, path_to_output_dir) -> np.ndarray:
+    def _load_data(self, input_data: PhysicellData) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Load simulation data from PhysiCell MultiCellDS XML files
+        Load simulation data from PhysiCell MultiCellDS XML files,
+        only the files for frames from start_time to end_time are parsed,
+        returns the data and the index of each loaded frame
         """
-        files = Path(path_to_output_dir).glob("*output*.xml")
+        files = Path(input_data.path_to_output_dir).glob("*output*.xml")
         file_mapping = {}
         for f in files:
             index = int(f.name[f.name.index("output") + 6 :].split(".")[0])
             file_mapping[index] = f
+        xml_files = [xml_file for t, xml_file in sorted(file_mapping.items())]
+        frame_indices = TrajectoryConverter._get_frame_indices(
+            input_data.timestep * np.arange(len(xml_files)),
+            input_data.start_time,
+            input_data.end_time,
+            input_data.stride,
+        )
         data = []
-        for t, xml_file in sorted(file_mapping.items()):
-            data.append(pyMCDS(xml_file.name, False, path_to_output_dir))
-        return np.array(data)
+        for t in frame_indices:
+            data.append(pyMCDS(xml_files[t].name, False, input_data.path_to_output_dir))
+            self.stats.report("parse", len(data), len(frame_indices))
+        return np.array(data), frame_indices
 
     def _get_agent_type(
         self, cell_type: int, cell_phase: int, type_names: Dict[int, Dict[int, str]]
@@ -85,19 +104,31 @@ class PhysicellConverter(TrajectoryConverter):
             self._last_id += 1
         return self._ids[cell_type][cell_phase]
 
-    def _get_trajectory_data(
+    def _parse_data(
         self, input_data: PhysicellData
-    ) -> Tuple[AgentData, UnitData]:
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
         """
-        Get data from one time step in Simularium format
+        Parse the PhysiCell output files into arrays of cell data
+        that don't depend on display names or scale,
+        only for the cells inside the region of interest
         """
-        physicell_data = self._load_data(input_data.path_to_output_dir)
+        physicell_data, frame_indices = self._load_data(input_data)
+        crop_filter = TrajectoryConverter._get_crop_filter(
+            input_data.roi_min, input_data.roi_max
+        )
         # get data dimensions
         totalSteps = len(physicell_data)
         max_agents = 0
         discrete_cells = []
         for t in range(totalSteps):
-            discrete_cells.append(physicell_data[t].get_cell_df())
+            cells = physicell_data[t].get_cell_df()
+            if crop_filter is not None:
+                cells = cells[
+                    crop_filter.in_box(
+                        cells[["position_x", "position_y", "position_z"]].to_numpy()
+                    )
+                ]
+            discrete_cells.append(cells)
             n = len(discrete_cells[t]["position_x"])
             if n > max_agents:
                 max_agents = n
@@ -107,8 +138,77 @@ class PhysicellConverter(TrajectoryConverter):
                 "in PhysiCell data, is the path_to_output_dir "
                 "pointing to an output directory?"
             )
+        n_agents = np.zeros(totalSteps)
+        cell_types = np.zeros((totalSteps, max_agents))
+        cell_phases = np.zeros((totalSteps, max_agents))
+        positions = np.zeros((totalSteps, max_agents, 3))
+        volumes = np.zeros((totalSteps, max_agents))
+        for t in range(totalSteps):
+            n = int(len(discrete_cells[t]["position_x"]))
+            n_agents[t] = n
+            cell_types[t][:n] = discrete_cells[t]["cell_type"]
+            cell_phases[t][:n] = discrete_cells[t]["current_phase"]
+            positions[t][:n] = np.array(
+                [
+                    discrete_cells[t]["position_x"],
+                    discrete_cells[t]["position_y"],
+                    discrete_cells[t]["position_z"],
+                ]
+            ).T
+            volumes[t][:n] = discrete_cells[t]["total_volume"]
+        return (
+            {
+                "frame_indices": frame_indices,
+                "n_agents": n_agents,
+                "cell_types": cell_types,
+                "cell_phases": cell_phases,
+                "positions": positions,
+                "volumes": volumes,
+            },
+            {"spatial_units": physicell_data[0].data["metadata"]["spatial_units"]},
+        )
+
+    def _get_trajectory_data(
+        self, input_data: PhysicellData
+    ) -> Tuple[AgentData, UnitData]:
+        """
+        Get data from one time step in Simularium format
+        """
+        crop_filter = TrajectoryConverter._get_crop_filter(
+            input_data.roi_min, input_data.roi_max
+        )
+        if input_data.parse_cache is None:
+            parsed_data, metadata = self._parse_data(input_data)
+        else:
+            parsed_data, metadata = input_data.parse_cache.load_or_parse(
+                [input_data.path_to_output_dir],
+                {
+                    "converter": "physicell",
+                    "start_time": input_data.start_time,
+                    "end_time": input_data.end_time,
+                    "stride": input_data.stride,
+                    # frame times depend on the timestep
+                    "timestep": (
+                        input_data.timestep
+                        if input_data.start_time is not None
+                        or input_data.end_time is not None
+                        else None
+                    ),
+                    "roi": (
+                        None
+                        if crop_filter is None
+                        else [
+                            crop_filter.min_corner.tolist(),
+                            crop_filter.max_corner.tolist(),
+                        ]
+                    ),
+                },
+                lambda: self._parse_data(input_data),
+            )
+        totalSteps = parsed_data["n_agents"].size
+        max_agents = parsed_data["positions"].shape[1]
         result = AgentData(
-            times=input_data.timestep * np.arange(totalSteps),
+            times=input_data.timestep * parsed_data["frame_indices"],
             n_agents=np.zeros(totalSteps),
             viz_types=VIZ_TYPE.DEFAULT * np.ones(shape=(totalSteps, max_agents)),
             unique_ids=np.zeros((totalSteps, max_agents)),
@@ -119,33 +219,29 @@ class PhysicellConverter(TrajectoryConverter):
         result.type_ids = np.zeros((totalSteps, max_agents))
         # get data
         for t in range(totalSteps):
-            n_agents = int(len(discrete_cells[t]["position_x"]))
+            n_agents = int(parsed_data["n_agents"][t])
             result.n_agents[t] = n_agents
             i = 0
             for n in range(n_agents):
                 result.unique_ids[t][i] = i
                 tid = self._get_agent_type(
-                    cell_type=int(discrete_cells[t]["cell_type"][n]),
-                    cell_phase=int(discrete_cells[t]["current_phase"][n]),
+                    cell_type=int(parsed_data["cell_types"][t][n]),
+                    cell_phase=int(parsed_data["cell_phases"][t][n]),
                     type_names=input_data.types,
                 )
                 result.type_ids[t][i] = tid
                 while i >= len(result.types[t]):
                     result.types[t].append("")
                 result.types[t][i] = self._type_mapping[tid]
-                result.positions[t][i] = input_data.scale_factor * np.array(
-                    [
-                        discrete_cells[t]["position_x"][n],
-                        discrete_cells[t]["position_y"][n],
-                        discrete_cells[t]["position_z"][n],
-                    ]
+                result.positions[t][i] = (
+                    input_data.scale_factor * parsed_data["positions"][t][n]
                 )
                 result.radii[t][i] = input_data.scale_factor * np.cbrt(
-                    3.0 / 4.0 * discrete_cells[t]["total_volume"][n] / np.pi
+                    3.0 / 4.0 * parsed_data["volumes"][t][n] / np.pi
                 )
                 i += 1
         spatial_units = UnitData(
-            physicell_data[0].data["metadata"]["spatial_units"],
+            metadata["spatial_units"],
             1.0 / input_data.scale_factor,
         )
         return result, spatial_units
@@ -154,10 +250,16 @@ class PhysicellConverter(TrajectoryConverter):
         """
         Return a TrajectoryData object containing the PhysiCell data
         """
-        print("Reading PhysiCell Data -------------")
+        log.info("Reading PhysiCell Data")
         agent_data, spatial_units = self._get_trajectory_data(input_data)
+        box_size = input_data.box_size
+        crop_filter = TrajectoryConverter._get_crop_filter(
+            input_data.roi_min, input_data.roi_max
+        )
+        if crop_filter is not None:
+            box_size = crop_filter.get_box_size(box_size)
         return TrajectoryData(
-            box_size=input_data.scale_factor * input_data.box_size,
+            box_size=input_data.scale_factor * box_size,
             agent_data=agent_data,
             time_units=input_data.time_units,
             spatial_units=spatial_units,
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from .compression import get_compression_extension, open_output_file
+from .data_objects import AgentData, TrajectoryData
+from .exceptions import ConversionCancelled, DataError
+from .filters import Filter, WindowedFilter
+from .instrumentation import ConversionStats, _CountingWriter
+from .serializers import FrameSerializer, JsonFrameSerializer
+from .trajectory_converter import TrajectoryConverter
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+def _apply_filter(
+    f: Filter, frames: Iterable[TrajectoryData]
+) -> Iterator[TrajectoryData]:
+    """
+    Apply the filter to each chunk of frames
+    """
+    for chunk in frames:
+        yield f.apply(chunk)
+
+
+def _get_frame_range(
+    data: TrajectoryData, start: int, end: int, plots: List[Dict[str, Any]]
+) -> TrajectoryData:
+    """
+    Return a copy of the frames from start up to (not including) end
+    """
+    return TrajectoryData(
+        box_size=data.box_size,
+        agent_data=data.agent_data.get_frames(start, end),
+        time_units=data.time_units,
+        spatial_units=data.spatial_units,
+        plots=plots,
+    )
+
+
+def _apply_windowed_filter(
+    f: WindowedFilter, frames: Iterable[TrajectoryData]
+) -> Iterator[TrajectoryData]:
+    """
+    Apply the filter to the frames in each chunk once the frames
+    after them are read, keeping only the frames the filter still needs
+    """
+    window = None
+    # the frames at the start of the window that were already filtered
+    n_filtered = 0
+    for chunk in frames:
+        if window is None:
+            window = chunk
+        else:
+            window = TrajectoryData(
+                box_size=chunk.box_size,
+                agent_data=AgentData.concatenate_frames(
+                    [window.agent_data, chunk.agent_data]
+                ),
+                time_units=chunk.time_units,
+                spatial_units=chunk.spatial_units,
+                plots=window.plots + chunk.plots,
+            )
+        total_steps = window.agent_data.times.size
+        end = total_steps - f.n_after
+        if end <= n_filtered:
+            continue
+        yield f.apply_window(window, n_filtered, end)
+        start = max(0, end - f.n_before)
+        window = _get_frame_range(window, start, total_steps, [])
+        n_filtered = end - start
+    if window is not None and window.agent_data.times.size > n_filtered:
+        yield f.apply_window(window, n_filtered, window.agent_data.times.size)
+
+
+def filter_frames(
+    frames: Iterable[TrajectoryData],
+    filters: List[Filter],
+    stats: ConversionStats = None,
+) -> Iterator[TrajectoryData]:
+    """
+    Apply the filters in order to each chunk of frames as it is read,
+    e.g. from TrajectoryConverter.iter_frames or ReaddyConverter.read_frames,
+    so only a chunk (and the neighbouring frames a WindowedFilter needs)
+    is held in memory. Filters that need the whole trajectory,
+    e.g. EveryNthTimestepFilter, aren't supported, use the reader's
+    start and end times and stride to select frames instead
+
+    Parameters
+    ----------
+    frames: Iterable[TrajectoryData]
+        the chunks of frames to filter
+    filters: List[Filter]
+        the filters to apply
+    stats: ConversionStats (optional)
+        measure the filters as the "filter" stage
+        Default: None (not measured)
+    """
+    for f in filters:
+        if not f.frame_wise and not isinstance(f, WindowedFilter):
+            raise ValueError(
+                f"{type(f).__name__} needs the whole trajectory "
+                "so it can't filter chunks of frames"
+            )
+    if stats is None:
+        stats = ConversionStats()
+    result = iter(frames)
+    for f in filters:
+        if isinstance(f, WindowedFilter):
+            result = _apply_windowed_filter(f, result)
+        else:
+            result = _apply_filter(f, result)
+    return stats.timed_iter("filter", result, chunks=True)
+
+
+def _update_type_ids(
+    agent_data: AgentData,
+    type_ids_by_name: Dict[str, int],
+    type_mapping: Dict[str, Any],
+):
+    """
+    Set type IDs for a chunk of frames that are consistent
+    with the previous chunks, and add new types to the mapping
+    """
+    if agent_data.type_ids is not None:
+        for type_id, display_data in agent_data.get_type_mapping().items():
+            type_mapping.setdefault(type_id, display_data)
+        return
+    type_ids = np.zeros(agent_data.unique_ids.shape)
+    for t, frame_types in enumerate(agent_data.types):
+        for n, type_name in enumerate(frame_types[: int(agent_data.n_agents[t])]):
+            if type_name not in type_ids_by_name:
+                type_id = len(type_ids_by_name)
+                while str(type_id) in type_mapping:
+                    type_id += 1
+                type_ids_by_name[type_name] = type_id
+                type_mapping[str(type_id)] = {"name": type_name}
+            type_ids[t][n] = type_ids_by_name[type_name]
+    agent_data.type_ids = type_ids
+
+
+def _write_frames(
+    frames: Iterable[TrajectoryData],
+    path: str,
+    serializer: FrameSerializer,
+    compression: str,
+    stats: ConversionStats,
+) -> int:
+    """
+    Pack, serialize, and write each chunk of frames to the file,
+    then the trajectoryInfo and plotData, return the number of frames
+    """
+    first_chunk = None
+    first_times = []
+    total_steps = 0
+    type_ids_by_name = {}
+    type_mapping = {}
+    spatial_data = TrajectoryConverter._get_spatial_data_header(0, 0)
+    del spatial_data["bundleStart"]
+    del spatial_data["bundleSize"]
+    with open_output_file(path, compression) as output_file:
+        outfile = _CountingWriter(output_file)
+        # the trajectoryInfo is written last, once the frames are counted
+        outfile.write('{"spatialData": ')
+        outfile.write(json.dumps(spatial_data)[:-1] + ', "bundleData": [')
+        for chunk in frames:
+            if first_chunk is None:
+                first_chunk = chunk
+            agent_data = chunk.agent_data
+            n_frames = agent_data.times.size
+            if n_frames < 1:
+                continue
+            _update_type_ids(agent_data, type_ids_by_name, type_mapping)
+            first_times += agent_data.times[: 2 - len(first_times)].tolist()
+            frame_buffers = stats.timed_iter(
+                "pack",
+                TrajectoryConverter._get_frame_buffers(agent_data),
+                agent_data,
+                n_frames,
+            )
+            with stats.stage("serialize") as stage:
+                bundle = serializer.serialize_frames(
+                    (total_steps + t, float(agent_data.times[t]), local_buf)
+                    for t, local_buf in frame_buffers
+                )
+                stage.count(agent_data)
+            if total_steps > 0:
+                outfile.write(", ")
+            outfile.write(bundle)
+            outfile.flush()
+            total_steps += n_frames
+            stats.report("write", total_steps, None, outfile.take_count())
+        if first_chunk is None:
+            raise DataError("there are no frames to write")
+        outfile.write(
+            f'], "bundleStart": 0, "bundleSize": {total_steps}}}, "trajectoryInfo": '
+        )
+        json.dump(
+            TrajectoryConverter._format_trajectory_info(
+                first_chunk,
+                total_steps,
+                first_times[1] - first_times[0] if len(first_times) > 1 else 0.0,
+                type_mapping,
+            ),
+            outfile,
+        )
+        outfile.write(', "plotData": ')
+        json.dump(TrajectoryConverter._get_plot_data(first_chunk), outfile)
+        outfile.write("}")
+    stats.report("write", total_steps, total_steps, outfile.take_count())
+    return total_steps
+
+
+def write_frames_JSON(
+    frames: Iterable[TrajectoryData],
+    output_path: str,
+    serializer: FrameSerializer = None,
+    compression: str = None,
+    stats: ConversionStats = None,
+) -> int:
+    """
+    Save chunks of frames in .simularium JSON format at the output path
+    as they are read and filtered, so the whole trajectory is never
+    held in memory. Since the number of frames and the agent types
+    aren't known until every chunk is written, the spatialData
+    is written before the trajectoryInfo. The box size, units, and plots
+    are taken from the first chunk. Returns the number of frames written
+
+    Parameters
+    ----------
+    frames: Iterable[TrajectoryData]
+        the chunks of frames to save
+    output_path: str
+        where to save the file
+    serializer: FrameSerializer (optional)
+        the backend used to write the frame buffers as JSON
+        Default: None (JsonFrameSerializer with full precision)
+    compression: str (optional)
+        compress the output, see TrajectoryConverter.write_JSON
+        Default: None (uncompressed)
+    stats: ConversionStats (optional)
+        measure each stage of writing, report progress,
+        and cancel the conversion
+        Default: None (not measured)
+    """
+    if serializer is None:
+        serializer = JsonFrameSerializer()
+    if stats is None:
+        stats = ConversionStats()
+    extension = get_compression_extension(compression)
+    path = f"{output_path}.simularium{extension}"
+    try:
+        with stats.stage("write") as stage:
+            total_steps = _write_frames(frames, path, serializer, compression, stats)
+            stage.n_frames += total_steps
+    except (ConversionCancelled, DataError):
+        TrajectoryConverter._remove_output_files(output_path, extension)
+        raise
+    log.info(f"saved to {path}")
+    return total_steps
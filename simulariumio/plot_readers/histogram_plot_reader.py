@@ -4,6 +4,7 @@
 import logging
 from typing import Dict, Any
 
+from ..data_objects import HistogramBins
 from .plot_reader import PlotReader
 
 ###############################################################################
@@ -14,11 +15,31 @@ log = logging.getLogger(__name__)
 
 
 class HistogramPlotReader(PlotReader):
+    @staticmethod
+    def _read_bins(trace_name: str, bins: HistogramBins) -> Dict[str, Any]:
+        """
+        Return a trace with the counts in each bin,
+        for the viewer to draw as bars without binning
+        """
+        edges = bins.get_edges()
+        return {
+            "name": trace_name,
+            "type": "histogram",
+            "x": bins.get_centers().tolist(),
+            "y": bins.counts.tolist(),
+            "histfunc": "sum",
+            "xbins": {
+                "start": float(edges[0]),
+                "end": float(edges[-1]),
+                "size": bins.bin_width,
+            },
+        }
+
     def read(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Return an object containing the data shaped for Simularium format
         """
-        print("Reading Histogram Data -------------")
+        log.info("Reading Histogram Data")
         simularium_data = {}
         # layout info
         simularium_data["layout"] = {
@@ -29,6 +50,11 @@ class HistogramPlotReader(PlotReader):
         # plot data
         simularium_data["data"] = []
         for trace_name in data.traces:
+            if isinstance(data.traces[trace_name], HistogramBins):
+                simularium_data["data"].append(
+                    HistogramPlotReader._read_bins(trace_name, data.traces[trace_name])
+                )
+                continue
             simularium_data["data"].append(
                 {
                     "name": trace_name,
@@ -4,6 +4,8 @@
 import logging
 from typing import Dict, Any
 
+import numpy as np
+
 from ..exceptions import DataError
 from .plot_reader import PlotReader
 
@@ -15,11 +17,38 @@ log = logging.getLogger(__name__)
 
 
 class ScatterPlotReader(PlotReader):
+    @staticmethod
+    def _get_downsampled_indices(ytrace: np.ndarray, max_points: int) -> np.ndarray:
+        """
+        Get the sorted indices of the first and last points
+        and the min and max points in evenly sized buckets
+        of the points in between
+        """
+        n_points = ytrace.size
+        if max_points is None or n_points <= max_points:
+            return np.arange(n_points)
+        n_buckets = (max_points - 2) // 2
+        inner = np.arange(1, n_points - 1)
+        buckets = (inner - 1) * n_buckets // (n_points - 2)
+        # sort by bucket then y, the min and max are at each bucket's ends
+        order = inner[np.lexsort((ytrace[inner], buckets))]
+        bucket_ends = np.cumsum(np.bincount(buckets, minlength=n_buckets))
+        bucket_starts = bucket_ends - np.bincount(buckets, minlength=n_buckets)
+        return np.unique(
+            np.concatenate(
+                [
+                    [0, n_points - 1],
+                    order[bucket_starts],
+                    order[bucket_ends - 1],
+                ]
+            )
+        )
+
     def read(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Return an object containing the data shaped for Simularium format
         """
-        print("Reading Scatter Plot Data -------------")
+        log.info("Reading Scatter Plot Data")
         simularium_data = {}
         # layout info
         simularium_data["layout"] = {
@@ -34,12 +63,16 @@ class ScatterPlotReader(PlotReader):
                 raise DataError(
                     f"y-trace {ytrace_name} has a different length than x-trace"
                 )
+            ytrace = np.asarray(data.ytraces[ytrace_name])
+            indices = ScatterPlotReader._get_downsampled_indices(
+                ytrace, data.max_points
+            )
             simularium_data["data"].append(
                 {
                     "name": ytrace_name,
                     "type": "scatter",
-                    "x": data.xtrace.tolist(),
-                    "y": data.ytraces[ytrace_name].tolist(),
+                    "x": np.asarray(data.xtrace)[indices].tolist(),
+                    "y": ytrace[indices].tolist(),
                     "mode": data.render_mode,
                 }
             )
@@ -1,13 +1,17 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import copy
 import logging
-from typing import Any, Dict, List, Tuple
+import math
+from typing import Any, Dict, Iterator, List, Tuple
 
 import numpy as np
 import readdy
 
 from ..trajectory_converter import TrajectoryConverter
+from ..analysis import DEFAULT_CHUNK_SIZE
+from ..instrumentation import ConversionStats
 from ..data_objects import TrajectoryData, AgentData
 from ..constants import VIZ_TYPE
 from .readdy_data import ReaddyData
@@ -20,7 +24,7 @@ log = logging.getLogger(__name__)
 
 
 class ReaddyConverter(TrajectoryConverter):
-    def __init__(self, input_data: ReaddyData):
+    def __init__(self, input_data: ReaddyData, stats: ConversionStats = None):
         """
         This object reads simulation trajectory outputs
         from ReaDDy (https://readdy.github.io/)
@@ -32,33 +36,160 @@ class ReaddyConverter(TrajectoryConverter):
         input_data : ReaddyData
             An object containing info for reading
             ReaDDy simulation trajectory outputs and plot data
+        stats : ConversionStats (optional)
+            Measures each stage of the conversion, reports progress,
+            and can cancel the conversion
+            Default: None (a new ConversionStats)
         """
-        self._data = self._read(input_data)
+        self.stats = stats if stats is not None else ConversionStats()
+        with self.stats.stage("parse") as stage:
+            self._data = self._read(input_data)
+            stage.count(self._data.agent_data)
+        self.stats.report("parse", stage.n_frames, stage.n_frames)
 
-    def _get_raw_trajectory_data(self, input_data: ReaddyData) -> Tuple[AgentData, Any]:
+    @staticmethod
+    def _get_frame_range(input_data: ReaddyData) -> Tuple[int, int]:
         """
-        Return agent data populated from a ReaDDy .h5 trajectory file
+        Get the start and stop (not included) frame to load
+        for the start_time and end_time, stop is None to load to the end
+        """
+        if input_data.start_time is None and input_data.end_time is None:
+            return 0, None
+        if input_data.timestep <= 0:
+            raise ValueError(
+                "a positive timestep is needed to select frames "
+                f"by start_time and end_time, got {input_data.timestep}"
+            )
+        start = (
+            0
+            if input_data.start_time is None
+            else max(
+                0, int(math.ceil(input_data.start_time / input_data.timestep - 1e-9))
+            )
+        )
+        stop = (
+            None
+            if input_data.end_time is None
+            else max(
+                start,
+                int(math.floor(input_data.end_time / input_data.timestep + 1e-9)) + 1,
+            )
+        )
+        return start, stop
+
+    @staticmethod
+    def _parse_data(
+        input_data: ReaddyData, frame_range: Tuple[int, int] = None
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Load the particle arrays and type names from a ReaDDy .h5 trajectory file,
+        only loading the frames from start_time to end_time
+        (or in the given frame range),
+        and keeping the particles inside the region of interest
         """
-        # load the trajectory
         traj = readdy.Trajectory(input_data.path_to_readdy_h5)
-        n_particles_per_frame, positions, types, ids = traj.to_numpy(start=0, stop=None)
+        start, stop = (
+            ReaddyConverter._get_frame_range(input_data)
+            if frame_range is None
+            else frame_range
+        )
+        n_particles_per_frame, positions, types, ids = traj.to_numpy(
+            start=start, stop=stop
+        )
+        stride = input_data.stride
+        if stride < 1:
+            raise ValueError(f"stride must be at least 1, got {stride}")
+        n_particles_per_frame = n_particles_per_frame[::stride]
+        positions = positions[::stride]
+        types = types[::stride]
+        ids = ids[::stride]
+        crop_filter = TrajectoryConverter._get_crop_filter(
+            input_data.roi_min, input_data.roi_max
+        )
+        if crop_filter is not None:
+            order, keep = AgentData._get_packed_order(
+                crop_filter.in_box(positions), n_particles_per_frame
+            )
+            n_particles_per_frame = np.count_nonzero(keep, axis=1)
+            positions = AgentData._pack_agents(positions, order, keep)
+            types = AgentData._pack_agents(types, order, keep)
+            ids = AgentData._pack_agents(ids, order, keep)
+        return (
+            {
+                "n_particles_per_frame": n_particles_per_frame,
+                "positions": positions,
+                "types": types,
+                "ids": ids,
+                "frame_indices": start
+                + stride * np.arange(n_particles_per_frame.shape[0]),
+            },
+            {"particle_types": {k: int(v) for k, v in traj.particle_types.items()}},
+        )
+
+    @staticmethod
+    def _get_raw_trajectory_data(
+        input_data: ReaddyData,
+    ) -> Tuple[AgentData, Dict[str, int]]:
+        """
+        Return agent data populated from a ReaDDy .h5 trajectory file,
+        or from the parse cache if the file was already parsed,
+        and the mapping of ReaDDy particle type names to IDs
+        """
+        crop_filter = TrajectoryConverter._get_crop_filter(
+            input_data.roi_min, input_data.roi_max
+        )
+        if input_data.parse_cache is None:
+            parsed_data, metadata = ReaddyConverter._parse_data(input_data)
+        else:
+            parsed_data, metadata = input_data.parse_cache.load_or_parse(
+                [input_data.path_to_readdy_h5],
+                {
+                    "converter": "readdy",
+                    "frame_range": ReaddyConverter._get_frame_range(input_data),
+                    "stride": input_data.stride,
+                    "roi": (
+                        None
+                        if crop_filter is None
+                        else [
+                            crop_filter.min_corner.tolist(),
+                            crop_filter.max_corner.tolist(),
+                        ]
+                    ),
+                },
+                lambda: ReaddyConverter._parse_data(input_data),
+            )
+        return ReaddyConverter._get_agent_data(input_data, parsed_data, metadata)
+
+    @staticmethod
+    def _get_agent_data(
+        input_data: ReaddyData,
+        parsed_data: Dict[str, np.ndarray],
+        metadata: Dict[str, Any],
+    ) -> Tuple[AgentData, Dict[str, int]]:
+        """
+        Return agent data populated from the parsed ReaDDy arrays,
+        and the mapping of ReaDDy particle type names to IDs
+        """
+        n_particles_per_frame = parsed_data["n_particles_per_frame"]
+        types = parsed_data["types"]
+        particle_types = metadata["particle_types"]
+        type_names = {type_id: name for name, type_id in particle_types.items()}
         totalSteps = n_particles_per_frame.shape[0]
         max_agents = int(np.amax(n_particles_per_frame))
         result = AgentData(
-            times=input_data.timestep * np.arange(totalSteps),
+            times=input_data.timestep * parsed_data["frame_indices"],
             n_agents=n_particles_per_frame,
             viz_types=VIZ_TYPE.DEFAULT * np.ones(shape=(totalSteps, max_agents)),
-            unique_ids=ids,
+            unique_ids=parsed_data["ids"],
             types=[[] for t in range(totalSteps)],
-            positions=input_data.scale_factor * positions,
+            positions=input_data.scale_factor * parsed_data["positions"],
             radii=np.ones(shape=(totalSteps, max_agents)),
         )
         result.type_ids = types
         # optionally set radius by particle type
         if input_data.radii is not None:
-            type_map = traj.particle_types
             for type_name in input_data.radii:
-                if type_name not in type_map:
+                if type_name not in particle_types:
                     log.warning(
                         f"type {type_name}, for which a radius was provided, "
                         "doesn't exist in the ReaDDy model so this "
@@ -67,19 +198,23 @@ class ReaddyConverter(TrajectoryConverter):
                     )
             for t in range(totalSteps):
                 for n in range(n_particles_per_frame[t]):
-                    type_name = traj.species_name(types[t][n])
+                    type_name = type_names[int(types[t][n])]
                     if type_name in input_data.radii:
                         result.radii[t][n] = input_data.radii[type_name]
-        return (result, traj)
+        return (result, particle_types)
 
+    @staticmethod
     def _filter_trajectory_data(
-        self, agent_data: AgentData, traj: Any, ignore_types: List[str]
+        agent_data: AgentData,
+        particle_types: Dict[str, int],
+        ignore_types: List[str],
     ) -> AgentData:
         """
         Remove particles with types to be ignored
         """
         # check that the ignored types actually exist
-        type_map = traj.particle_types
+        type_map = particle_types
+        type_names = {type_id: name for name, type_id in particle_types.items()}
         atleast_one_type_to_ignore = False
         for type_name in ignore_types:
             if type_name not in type_map:
@@ -97,7 +232,7 @@ class ReaddyConverter(TrajectoryConverter):
         for t in range(totalSteps):
             n = 0
             for i in range(int(agent_data.n_agents[t])):
-                if traj.species_name(agent_data.type_ids[t][i]) not in ignore_types:
+                if type_names[int(agent_data.type_ids[t][i])] not in ignore_types:
                     n += 1
             n_filtered_particles_per_frame[t] = n
         # filter particle data to remove ignored types
@@ -115,7 +250,7 @@ class ReaddyConverter(TrajectoryConverter):
         for t in range(agent_data.n_agents.shape[0]):
             n = 0
             for i in range(agent_data.n_agents[t]):
-                type_name = traj.species_name(agent_data.type_ids[t][i])
+                type_name = type_names[int(agent_data.type_ids[t][i])]
                 if type_name in ignore_types or n >= n_filtered_particles_per_frame[t]:
                     continue
                 result.unique_ids[t][n] = agent_data.unique_ids[t][i]
@@ -125,16 +260,25 @@ class ReaddyConverter(TrajectoryConverter):
                 n += 1
         return result
 
+    @staticmethod
     def _set_particle_types(
-        self, agent_data: AgentData, traj: Any, type_grouping: Dict[str, List[str]]
+        agent_data: AgentData,
+        particle_types: Dict[str, int],
+        type_grouping: Dict[str, List[str]],
+        first_group_id: int = None,
     ) -> AgentData:
         """
         Set particle type names and optionally group ReaDDy particle types
-        by assigning them to new group type IDs
+        by assigning them to new group type IDs, starting from first_group_id
+        or after the highest type ID in the data
         """
         # warn user if a given type doesn't exist in ReaDDy
-        readdy_type_map = traj.particle_types
-        i = int(np.amax(agent_data.type_ids)) + 1
+        readdy_type_map = particle_types
+        i = (
+            int(np.amax(agent_data.type_ids)) + 1
+            if first_group_id is None
+            else first_group_id
+        )
         if type_grouping is not None:
             for group_type_name in type_grouping:
                 for readdy_type_name in type_grouping[group_type_name]:
@@ -184,24 +328,119 @@ class ReaddyConverter(TrajectoryConverter):
                     agent_data.types[t][n] = type_mapping[readdy_id]
         return agent_data
 
-    def _read(self, input_data: ReaddyData) -> Dict[str, Any]:
+    @staticmethod
+    def _get_trajectory_data(
+        input_data: ReaddyData,
+        agent_data: AgentData,
+        particle_types: Dict[str, int],
+        first_group_id: int = None,
+    ) -> TrajectoryData:
         """
-        Return an object containing the data shaped for Simularium format
+        Filter and group the particle types in the agent data
+        and return it as TrajectoryData
         """
-        print("Reading ReaDDy Data -------------")
-        agent_data, traj = self._get_raw_trajectory_data(input_data)
         # optionally filter and group
         if input_data.ignore_types is not None:
-            agent_data = self._filter_trajectory_data(
-                agent_data, traj, input_data.ignore_types
+            agent_data = ReaddyConverter._filter_trajectory_data(
+                agent_data, particle_types, input_data.ignore_types
             )
-        agent_data = self._set_particle_types(
-            agent_data, traj, input_data.type_grouping
+        agent_data = ReaddyConverter._set_particle_types(
+            agent_data, particle_types, input_data.type_grouping, first_group_id
+        )
+        box_size = input_data.box_size
+        crop_filter = TrajectoryConverter._get_crop_filter(
+            input_data.roi_min, input_data.roi_max
         )
+        if crop_filter is not None:
+            box_size = crop_filter.get_box_size(box_size)
         return TrajectoryData(
-            box_size=input_data.scale_factor * input_data.box_size,
+            box_size=input_data.scale_factor * box_size,
             agent_data=agent_data,
             time_units=input_data.time_units,
             spatial_units=input_data.spatial_units,
             plots=input_data.plots,
         )
+
+    def _read(self, input_data: ReaddyData) -> Dict[str, Any]:
+        """
+        Return an object containing the data shaped for Simularium format
+        """
+        log.info("Reading ReaDDy Data")
+        agent_data, particle_types = self._get_raw_trajectory_data(input_data)
+        self.stats.check_cancelled("parse")
+        return self._get_trajectory_data(input_data, agent_data, particle_types)
+
+    @staticmethod
+    def _read_chunks(
+        input_data: ReaddyData, chunk_size: int
+    ) -> Iterator[TrajectoryData]:
+        """
+        Yield TrajectoryData for each chunk of frames,
+        loading one chunk from the .h5 file at a time
+        """
+        if chunk_size < 1:
+            raise ValueError(f"chunk size must be at least 1, got {chunk_size}")
+        start, stop = ReaddyConverter._get_frame_range(input_data)
+        # the frames in the file to load for each chunk
+        file_frames = chunk_size * max(1, input_data.stride)
+        first_chunk = True
+        while stop is None or start < stop:
+            chunk_stop = start + file_frames
+            if stop is not None:
+                chunk_stop = min(chunk_stop, stop)
+            parsed_data, metadata = ReaddyConverter._parse_data(
+                input_data, (start, chunk_stop)
+            )
+            n_frames = parsed_data["n_particles_per_frame"].shape[0]
+            if n_frames < 1:
+                return
+            agent_data, particle_types = ReaddyConverter._get_agent_data(
+                input_data, parsed_data, metadata
+            )
+            # group IDs follow the ReaDDy type IDs so they match in every chunk
+            data = ReaddyConverter._get_trajectory_data(
+                input_data,
+                agent_data,
+                particle_types,
+                max(particle_types.values(), default=-1) + 1,
+            )
+            # filters can change these in place, so each chunk gets copies
+            data.time_units = copy.copy(data.time_units)
+            data.spatial_units = copy.copy(data.spatial_units)
+            data.plots = copy.deepcopy(data.plots) if first_chunk else []
+            yield data
+            if n_frames < chunk_size:
+                return
+            first_chunk = False
+            start = chunk_stop
+
+    @staticmethod
+    def read_frames(
+        input_data: ReaddyData,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        stats: ConversionStats = None,
+    ) -> Iterator[TrajectoryData]:
+        """
+        Yield the ReaDDy trajectory in chunks of frames, loading only
+        one chunk from the .h5 file at a time, to filter and write them
+        with pipeline.filter_frames and pipeline.write_frames_JSON.
+        The parse cache isn't used, grouped types get IDs after
+        the highest ReaDDy type ID, and only the first chunk has the plots
+
+        Parameters
+        ----------
+        input_data : ReaddyData
+            An object containing info for reading
+            ReaDDy simulation trajectory outputs and plot data
+        chunk_size : int (optional)
+            The number of frames (after the stride) in each chunk
+            Default: 100
+        stats : ConversionStats (optional)
+            Measure reading the chunks as the "parse" stage
+            Default: None (not measured)
+        """
+        if stats is None:
+            stats = ConversionStats()
+        return stats.timed_iter(
+            "parse", ReaddyConverter._read_chunks(input_data, chunk_size), chunks=True
+        )
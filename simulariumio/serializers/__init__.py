@@ -0,0 +1,7 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from .frame_serializer import FrameSerializer  # noqa: F401
+from .json_frame_serializer import JsonFrameSerializer  # noqa: F401
+from .numpy_frame_serializer import NumpyFrameSerializer  # noqa: F401
+from .orjson_frame_serializer import OrjsonFrameSerializer  # noqa: F401
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Tuple
+
+import numpy as np
+
+from ..constants import V1_SPATIAL_BUFFER_STRUCT
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class FrameSerializer(ABC):
+    @abstractmethod
+    def serialize_frame(
+        self, frame_number: int, time: float, buffer: np.ndarray
+    ) -> str:
+        """
+        Return one frame of spatial data as a JSON object
+        with frameNumber, time, and data fields
+        """
+        pass
+
+    def serialize_delta_frame(
+        self, frame_number: int, time: float, delta: Dict[str, Any]
+    ) -> str:
+        """
+        Return one delta encoded frame of spatial data as a JSON object
+        with frameNumber, time, and delta fields
+        """
+        return json.dumps(
+            {
+                "frameNumber": int(frame_number),
+                "time": float(time),
+                "delta": {
+                    key: value.tolist() if isinstance(value, np.ndarray) else value
+                    for key, value in delta.items()
+                },
+            }
+        )
+
+    def serialize_frames(self, frames: Iterable[Tuple[int, float, np.ndarray]]) -> str:
+        """
+        Return the frames as comma-separated JSON objects
+        """
+        return ", ".join(
+            self.serialize_frame(frame_number, time, buffer)
+            for frame_number, time, buffer in frames
+        )
+
+    @staticmethod
+    def _follow_agent_starts(buffer: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """
+        Follow the chain of agent starts from the start of the buffer
+        through the candidate indices by pointer doubling, so it takes
+        log(number of agents) array passes instead of a Python step
+        per agent. Return the starts, and whether the chain reached
+        the end of the buffer without leaving the candidates
+        """
+        n_fixed = V1_SPATIAL_BUFFER_STRUCT.SP_INDEX
+        size = buffer.size
+        n_subpoints = buffer[candidates + V1_SPATIAL_BUFFER_STRUCT.NSP_INDEX]
+        next_starts = np.minimum(
+            candidates + n_fixed + np.maximum(n_subpoints, 0).astype(int), size
+        )
+        # the position of each candidate's next start in the candidates,
+        # with the end of the buffer last, pointing to itself
+        nodes = np.append(candidates, size)
+        end = nodes.size - 1
+        jump = np.append(np.searchsorted(nodes, next_starts), end)
+        left_candidates = nodes[jump] != np.append(next_starts, size)
+        jump[left_candidates] = end
+        # after each pass, starts holds twice as many agents
+        # and jump skips twice as many
+        starts = np.zeros(1, dtype=int)
+        while True:
+            new_starts = jump[starts]
+            new_starts = new_starts[new_starts != end]
+            if new_starts.size == 0:
+                break
+            starts = np.concatenate([starts, new_starts])
+            jump = jump[jump]
+        starts = np.sort(starts)
+        return nodes[starts], not left_candidates[starts[-1]]
+
+    @staticmethod
+    def _get_agent_starts(buffer: np.ndarray) -> np.ndarray:
+        """
+        Get the index in a frame buffer where each agent starts,
+        each agent's values end with its subpoints so the next agent
+        starts after them
+        """
+        n_fixed = V1_SPATIAL_BUFFER_STRUCT.SP_INDEX
+        size = buffer.size
+        n_subpoints = buffer[V1_SPATIAL_BUFFER_STRUCT.NSP_INDEX :: n_fixed]
+        if size % n_fixed == 0 and not np.any(n_subpoints):
+            # no agent has subpoints
+            return np.arange(0, size, n_fixed)
+        if size < n_fixed:
+            return np.zeros(0, dtype=int)
+        # only follow the indices whose subpoint count would be
+        # a whole number, which are few since most values are not
+        complete = np.arange(size - n_fixed + 1)
+        n_subpoints = buffer[complete + V1_SPATIAL_BUFFER_STRUCT.NSP_INDEX]
+        candidates = complete[n_subpoints == np.floor(n_subpoints)]
+        if candidates.size > 0 and candidates[0] == 0:
+            starts, reached_end = FrameSerializer._follow_agent_starts(
+                buffer, candidates
+            )
+            if reached_end:
+                return starts
+        return FrameSerializer._follow_agent_starts(buffer, complete)[0]
+
+    @staticmethod
+    def _get_spatial_mask(buffer: np.ndarray) -> np.ndarray:
+        """
+        Get which values in a frame buffer are positions, radii,
+        or subpoints, like the fields PrecisionData rounds,
+        so the viz types, IDs, rotations, and subpoint counts
+        are written exactly
+        """
+        n_fixed = V1_SPATIAL_BUFFER_STRUCT.SP_INDEX
+        size = buffer.size
+        starts = FrameSerializer._get_agent_starts(buffer)
+        result = np.zeros(size, dtype=bool)
+        spatial_indices = np.array(
+            [
+                V1_SPATIAL_BUFFER_STRUCT.POSX_INDEX,
+                V1_SPATIAL_BUFFER_STRUCT.POSY_INDEX,
+                V1_SPATIAL_BUFFER_STRUCT.POSZ_INDEX,
+                V1_SPATIAL_BUFFER_STRUCT.R_INDEX,
+            ]
+        )
+        result[(starts[:, np.newaxis] + spatial_indices).ravel()] = True
+        # mark where each agent's subpoints start and end,
+        # the running sum is 1 inside the subpoints
+        n_subpoints = np.maximum(
+            buffer[starts + V1_SPATIAL_BUFFER_STRUCT.NSP_INDEX], 0
+        ).astype(int)
+        subpoints_start = starts + n_fixed
+        subpoints_end = np.minimum(subpoints_start + n_subpoints, size)
+        has_subpoints = subpoints_end > subpoints_start
+        edges = np.zeros(size + 1, dtype=int)
+        edges[subpoints_start[has_subpoints]] += 1
+        edges[subpoints_end[has_subpoints]] -= 1
+        result |= np.cumsum(edges[:-1]) > 0
+        return result
+
+    @staticmethod
+    def _round_to_significant_digits(
+        values: np.ndarray, digits: int, mask: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Round each value, or only the values where the mask is True,
+        to the given number of significant digits
+        """
+        finite_nonzero = np.isfinite(values) & (values != 0)
+        if mask is not None:
+            finite_nonzero &= mask
+        magnitudes = np.zeros_like(values)
+        magnitudes[finite_nonzero] = np.floor(np.log10(np.abs(values[finite_nonzero])))
+        exponents = digits - 1 - magnitudes
+        # dividing by an exact power of ten instead of multiplying
+        # by an inexact one, e.g. 0.001, keeps large values exact
+        scale = np.power(10.0, np.abs(exponents))
+        rounded = np.where(
+            exponents >= 0,
+            np.round(values * scale) / scale,
+            np.round(values / scale) * scale,
+        )
+        return np.where(finite_nonzero, rounded, values)
@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+
+import numpy as np
+
+from .frame_serializer import FrameSerializer
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class JsonFrameSerializer(FrameSerializer):
+    def serialize_frame(
+        self, frame_number: int, time: float, buffer: np.ndarray
+    ) -> str:
+        """
+        Return one frame of spatial data as a JSON object,
+        using the json module with full float precision
+        """
+        return json.dumps(
+            {"frameNumber": frame_number, "time": time, "data": buffer.tolist()}
+        )
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+
+import numpy as np
+
+from .frame_serializer import FrameSerializer
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class NumpyFrameSerializer(FrameSerializer):
+    significant_digits: int
+
+    def __init__(self, significant_digits: int = None):
+        """
+        This object formats the frame buffers into JSON number arrays
+        directly, with one printf-style format pass over each buffer
+        when the values are written with fewer significant digits
+
+        Parameters
+        ----------
+        significant_digits : int (optional)
+            write each position, radius, and subpoint value
+            with at most this many significant digits, the viz types,
+            IDs, rotations, and subpoint counts are written exactly
+            Default: None (full float precision)
+        """
+        self.significant_digits = significant_digits
+
+    def _format_values(self, buffer: np.ndarray) -> str:
+        """
+        Return the values in the buffer as comma-separated JSON numbers
+        """
+        if self.significant_digits is None:
+            # shortest round-trip repr, which json's C encoder
+            # already writes faster than a format pass
+            return json.dumps(buffer.tolist())[1:-1]
+        # build the format string as one byte array, NumPy pads
+        # the shorter format with null bytes, which are removed
+        rounded_format = f"%.{self.significant_digits}g, ".encode("ascii")
+        value_formats = (
+            np.where(self._get_spatial_mask(buffer), rounded_format, b"%r, ")
+            .tobytes()
+            .replace(b"\x00", b"")
+            .decode("ascii")
+        )
+        return value_formats[:-2] % tuple(buffer.tolist())
+
+    def serialize_frame(
+        self, frame_number: int, time: float, buffer: np.ndarray
+    ) -> str:
+        """
+        Return one frame of spatial data as a JSON object
+        """
+        if not np.all(np.isfinite(buffer)):
+            # printf formatting doesn't match JSON for NaN and infinity
+            data = json.dumps(buffer.tolist())
+        else:
+            data = f"[{self._format_values(buffer)}]"
+        return (
+            f'{{"frameNumber": {int(frame_number)}, '
+            f'"time": {json.dumps(float(time))}, "data": {data}}}'
+        )
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+
+import numpy as np
+
+from .frame_serializer import FrameSerializer
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class OrjsonFrameSerializer(FrameSerializer):
+    significant_digits: int
+
+    def __init__(self, significant_digits: int = None):
+        """
+        This object serializes the frame buffers with orjson
+        (https://github.com/ijl/orjson), which writes NumPy arrays
+        natively. Requires the optional orjson package
+
+        Parameters
+        ----------
+        significant_digits : int (optional)
+            round each position, radius, and subpoint value
+            to this many significant digits before serializing,
+            the viz types, IDs, rotations, and subpoint counts
+            are written exactly
+            Default: None (full float precision)
+        """
+        try:
+            import orjson  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "OrjsonFrameSerializer requires orjson, "
+                "install it with `pip install simulariumio[fast-json]`"
+            )
+        self.significant_digits = significant_digits
+
+    def serialize_frame(
+        self, frame_number: int, time: float, buffer: np.ndarray
+    ) -> str:
+        """
+        Return one frame of spatial data as a JSON object
+        """
+        import orjson
+
+        if self.significant_digits is not None:
+            buffer = self._round_to_significant_digits(
+                buffer, self.significant_digits, self._get_spatial_mask(buffer)
+            )
+        return orjson.dumps(
+            {
+                "frameNumber": int(frame_number),
+                "time": float(time),
+                "data": np.ascontiguousarray(buffer, dtype=np.float64),
+            },
+            option=orjson.OPT_SERIALIZE_NUMPY,
+        ).decode("utf-8")
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Union
+
+from .conversion_job import ConversionJob
+from .instrumentation import ConversionStats
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+STREAM_CHUNK_SIZE = 2**16
+# each request and response header is one line of JSON,
+# allow long lines for jobs with many Cytosim files
+STREAM_LIMIT = 2**24
+
+
+def _warm_up():
+    """
+    Import the converters in a new worker process
+    so the first job it runs doesn't pay for the imports
+    """
+    from . import cytosim, physicell, file_converter  # noqa: F401
+
+    try:
+        from . import readdy  # noqa: F401
+    except ImportError:
+        pass
+
+
+def run_job(job_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the conversion job described by the dict and return
+    the paths of the files written and the stats for each stage,
+    this runs in a worker process so the arguments and result
+    are plain dicts that can be pickled
+    """
+    job = ConversionJob.from_dict(job_info)
+    stats = ConversionStats()
+    start = time.perf_counter()
+    # a job that fails doesn't leave partly written files
+    output_paths = job.run(stats)
+    return {
+        "outputFiles": output_paths,
+        "wallTime": time.perf_counter() - start,
+        "stats": stats.to_dict(),
+    }
+
+
+async def convert(
+    job: Union[ConversionJob, Dict[str, Any]], executor: Executor = None
+) -> Dict[str, Any]:
+    """
+    Run a conversion job without blocking the event loop,
+    return a dict with the paths of the files written ("outputFiles"),
+    the total wall time ("wallTime"), and the stats for each stage ("stats")
+
+    Parameters
+    ----------
+    job : Union[ConversionJob, Dict[str, Any]]
+        The job to run, or a dict describing it,
+        see ConversionJob.from_dict
+    executor : Executor (optional)
+        Where to run the job, e.g. a ProcessPoolExecutor
+        that is reused between jobs so CPU-heavy stages
+        run in parallel without reloading the converters
+        Default: None (the event loop's default thread pool)
+    """
+    if isinstance(job, ConversionJob):
+        job = job.to_dict()
+    else:
+        # check the job before sending it to a worker
+        ConversionJob.from_dict(job)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, run_job, job)
+
+
+async def _write_line(writer: asyncio.StreamWriter, message: Dict[str, Any]):
+    writer.write(json.dumps(message).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+async def _stream_file(writer: asyncio.StreamWriter, path: str):
+    """
+    Send the file's bytes in chunks, waiting for the client
+    to read each one so large outputs aren't held in memory
+    """
+    with open(path, "rb") as input_file:
+        while True:
+            chunk = input_file.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+
+
+class ConversionService:
+    n_workers: int
+    host: str
+    port: int
+
+    def __init__(
+        self,
+        n_workers: int = None,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+    ):
+        """
+        This object is a long running local service that converts
+        the jobs it receives in a pool of worker processes,
+        which are started once and kept between jobs.
+
+        Each request is one line of JSON,
+        {"job": {...}, "stream": bool}, with the job described
+        as in ConversionJob.from_dict. The service replies with one line
+        of JSON, {"status": "done", "outputFiles": [{"name", "size"}],
+        "wallTime", "stats"}, and if stream is true, the bytes
+        of each output file, in order, follow. If the job fails, the reply
+        is {"status": "error", "error": str}. A connection can send
+        several requests, one after the other. If a worker process dies,
+        e.g. when the system runs out of memory, the jobs running
+        in the pool fail and the workers are restarted
+
+        Parameters
+        ----------
+        n_workers : int (optional)
+            The number of worker processes, i.e. jobs converted at once
+            Default: None (the number of CPUs)
+        host : str (optional)
+            The address to listen on
+            Default: "127.0.0.1"
+        port : int (optional)
+            The port to listen on, 0 picks a free port
+            Default: 8765
+        """
+        self.n_workers = n_workers
+        self.host = host
+        self.port = port
+        self._executor = None
+        self._server = None
+
+    def _start_workers(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.n_workers, initializer=_warm_up)
+
+    async def start(self):
+        """
+        Start the worker processes and listen for jobs
+        """
+        self._executor = self._start_workers()
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port, limit=STREAM_LIMIT
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        log.info(f"Conversion service listening on {self.host}:{self.port}")
+
+    async def stop(self):
+        """
+        Stop listening, wait for the running jobs,
+        and shut down the worker processes
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            executor = self._executor
+            self._executor = None
+            # waiting for the running jobs would block the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, executor.shutdown, True
+            )
+
+    async def serve_forever(self):
+        """
+        Start the service and run until it is cancelled
+        """
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    async def _handle_request(
+        self, request: Dict[str, Any], writer: asyncio.StreamWriter
+    ):
+        executor = self._executor
+        try:
+            result = await convert(request["job"], executor)
+        except BrokenProcessPool as e:
+            # a worker died, so the pool can't run any more jobs,
+            # replace it unless another request already has
+            if executor is self._executor:
+                log.warning("A worker process died, restarting the workers")
+                self._executor = self._start_workers()
+                executor.shutdown(wait=False)
+            await _write_line(writer, {"status": "error", "error": repr(e)})
+            return
+        except Exception as e:
+            log.info(f"Conversion failed: {e!r}")
+            await _write_line(writer, {"status": "error", "error": repr(e)})
+            return
+        output_paths = result["outputFiles"]
+        await _write_line(
+            writer,
+            {
+                "status": "done",
+                "outputFiles": [
+                    {"name": os.path.basename(path), "size": os.path.getsize(path)}
+                    for path in output_paths
+                ],
+                "wallTime": result["wallTime"],
+                "stats": result["stats"],
+            },
+        )
+        if request.get("stream", False):
+            for path in output_paths:
+                await _stream_file(writer, path)
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    await _write_line(writer, {"status": "error", "error": repr(e)})
+                    continue
+                await self._handle_request(request, writer)
+        except ConnectionError:
+            log.info("Client disconnected")
+        finally:
+            writer.close()
+
+
+async def send_job(
+    job: Union[ConversionJob, Dict[str, Any]],
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    output_dir: str = None,
+) -> Dict[str, Any]:
+    """
+    Send a job to a running ConversionService and return its reply,
+    if output_dir is given, the output files are streamed back
+    and saved there, and their paths replace the file names
+    in the reply's "outputFiles"
+
+    Parameters
+    ----------
+    job : Union[ConversionJob, Dict[str, Any]]
+        The job to run, or a dict describing it,
+        see ConversionJob.from_dict
+    host : str (optional)
+        The address of the service
+        Default: "127.0.0.1"
+    port : int (optional)
+        The port of the service
+        Default: 8765
+    output_dir : str (optional)
+        Where to save the streamed output files
+        Default: None (the files stay where the job wrote them)
+    """
+    if isinstance(job, ConversionJob):
+        job = job.to_dict()
+    reader, writer = await asyncio.open_connection(host, port, limit=STREAM_LIMIT)
+    try:
+        await _write_line(writer, {"job": job, "stream": output_dir is not None})
+        reply = json.loads(await reader.readline())
+        if reply["status"] != "done" or output_dir is None:
+            return reply
+        os.makedirs(output_dir, exist_ok=True)
+        output_paths = []
+        for file_info in reply["outputFiles"]:
+            path = os.path.join(output_dir, file_info["name"])
+            remaining = file_info["size"]
+            with open(path, "wb") as output_file:
+                while remaining > 0:
+                    chunk = await reader.read(min(remaining, STREAM_CHUNK_SIZE))
+                    if not chunk:
+                        raise ConnectionError(
+                            f"connection closed while reading {file_info['name']}"
+                        )
+                    output_file.write(chunk)
+                    remaining -= len(chunk)
+            output_paths.append(path)
+        reply["outputFiles"] = output_paths
+        return reply
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+def _get_arguments(args: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run a local service that converts simulation outputs "
+        "to .simularium files"
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help="port to listen on"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    return parser.parse_args(args)
+
+
+def main(args: List[str] = None):
+    arguments = _get_arguments(args)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(name)s %(levelname)s: %(message)s",
+    )
+    service = ConversionService(arguments.workers, arguments.host, arguments.port)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        log.info("Conversion service stopped")
+
+
+if __name__ == "__main__":
+    main()
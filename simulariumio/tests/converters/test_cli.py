@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+from simulariumio import cli
+from simulariumio.cli import main, read_manifest, run_jobs
+
+_run_job = cli._run_job
+
+CYTOSIM_JSON_PATH = (
+    "simulariumio/tests/data/cytosim/aster_pull3D_couples_actin_solid_3_frames"
+    "/aster_pull3D_couples_actin_solid_3_frames_small.json"
+)
+
+
+def load_json(path: str):
+    with open(path) as json_file:
+        return json.load(json_file)
+
+
+def write_manifest(tmp_path) -> str:
+    manifest_path = str(tmp_path / "manifest.json")
+    with open(manifest_path, "w") as manifest_file:
+        json.dump(
+            {
+                "defaults": {
+                    "input_type": "simularium",
+                    "filters": [{"type": "MultiplySpaceFilter", "multiplier": 10.0}],
+                    "output_options": {"bundle_size": 2, "separate_files": True},
+                },
+                "jobs": [
+                    {
+                        "input_options": {"input_path": CYTOSIM_JSON_PATH},
+                        "output_path": str(tmp_path / "converted0"),
+                    },
+                    {
+                        "input_options": {"input_path": CYTOSIM_JSON_PATH},
+                        "output_path": str(tmp_path / "converted1"),
+                        "filters": [],
+                    },
+                    {
+                        "input_options": {
+                            "input_path": str(tmp_path / "missing.simularium")
+                        },
+                        "output_path": str(tmp_path / "failed"),
+                    },
+                ],
+            },
+            manifest_file,
+        )
+    return manifest_path
+
+
+def test_read_manifest(tmp_path):
+    jobs = read_manifest(write_manifest(tmp_path))
+    assert [job.input_type for job in jobs] == ["simularium"] * 3
+    assert len(jobs[0].filters) == 1
+    assert jobs[1].filters == []
+    assert jobs[2].output_options == {"bundle_size": 2, "separate_files": True}
+
+
+def test_batch_conversion(tmp_path, capsys):
+    manifest_path = write_manifest(tmp_path)
+    summary_path = str(tmp_path / "summary.json")
+    assert main([manifest_path, "-j", "2", "--summary", summary_path]) == 1
+    with open(summary_path) as summary_file:
+        summary = json.load(summary_file)
+    assert (summary["done"], summary["skipped"], summary["failed"]) == (2, 0, 1)
+    assert [job["status"] for job in summary["jobs"]] == ["done", "done", "failed"]
+    assert summary["failures"][0]["outputPath"] == str(tmp_path / "failed")
+    assert "write" in summary["jobs"][0]["stats"]
+    assert os.path.isfile(str(tmp_path / "converted0.simularium"))
+    assert not os.path.exists(str(tmp_path / "failed.simularium"))
+    assert "2 done, 0 skipped, 1 failed" in capsys.readouterr().out
+
+    # only the finished files and the records are left
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "converted0.conversion.json",
+        "converted0.simularium",
+        "converted0_bundle0.simularium",
+        "converted0_bundle1.simularium",
+        "converted1.conversion.json",
+        "converted1.simularium",
+        "converted1_bundle0.simularium",
+        "converted1_bundle1.simularium",
+        "manifest.json",
+        "summary.json",
+    ]
+
+    # the outputs are newer than the inputs and were written
+    # with the same settings
+    manifest = load_json(manifest_path)
+    manifest["jobs"].append(
+        {
+            "input_options": {"input_path": CYTOSIM_JSON_PATH},
+            "output_path": str(tmp_path / "converted2"),
+        }
+    )
+    manifest["jobs"][1]["filters"] = [
+        {"type": "MultiplySpaceFilter", "multiplier": 2.0}
+    ]
+    with open(manifest_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    main([manifest_path, "--max-jobs-per-worker", "0", "--summary", summary_path])
+    summary = load_json(summary_path)
+    assert [job["status"] for job in summary["jobs"]] == [
+        "skipped",
+        "done",
+        "failed",
+        "done",
+    ]
+
+    assert (
+        main(
+            [
+                manifest_path,
+                "--force",
+                "--max-jobs-per-worker",
+                "0",
+                "--summary",
+                summary_path,
+            ]
+        )
+        == 1
+    )
+    summary = load_json(summary_path)
+    assert summary["done"] == 3
+
+
+def run_or_crash(job_info):
+    """
+    Run the job, or kill the worker like the OOM killer would
+    """
+    if job_info["output_path"].endswith("crash"):
+        os._exit(1)
+    return _run_job(job_info)
+
+
+def test_batch_conversion_worker_dies(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "_run_job", run_or_crash)
+    jobs = read_manifest(write_manifest(tmp_path))[:2]
+    jobs.insert(1, jobs[0].from_dict({**jobs[0].to_dict(), "output_path": "crash"}))
+    results = run_jobs(jobs, n_processes=2, max_jobs_per_worker=0)
+    assert [result["status"] for result in results] == ["done", "failed", "done"]
+    assert results[1]["error"] == "the worker process died"
+    assert jobs[0].is_up_to_date()
+    assert jobs[2].is_up_to_date()
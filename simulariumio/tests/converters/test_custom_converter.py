@@ -1,10 +1,21 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import json
+import os
+
 import pytest
 import numpy as np
 
-from simulariumio import TrajectoryConverter, TrajectoryData, AgentData, UnitData
+from simulariumio import (
+    TrajectoryConverter,
+    TrajectoryData,
+    AgentData,
+    UnitData,
+    ConversionStats,
+    CancellationToken,
+)
+from simulariumio.exceptions import ConversionCancelled
 from simulariumio.tests.conftest import three_default_agents
 
 
@@ -1098,3 +1109,262 @@ def test_custom_trajectory_reader(trajectory, expected_data):
     buffer_data = converter._read_trajectory_data(converter._data)
     assert expected_data == buffer_data
     assert converter._check_agent_ids_are_unique_per_frame(buffer_data)
+
+
+def test_memory_mapped_agent_data(tmp_path):
+    trajectory = three_default_agents()
+    expected_data = TrajectoryConverter(trajectory)._read_trajectory_data(trajectory)
+    trajectory.agent_data.save(str(tmp_path / "agent_data"))
+    mapped_agent_data = AgentData.load(str(tmp_path / "agent_data"))
+    assert isinstance(mapped_agent_data.positions, np.memmap)
+    mapped_trajectory = TrajectoryData(
+        box_size=trajectory.box_size,
+        agent_data=mapped_agent_data,
+        time_units=UnitData("ns"),
+        spatial_units=UnitData("nm"),
+    )
+    converter = TrajectoryConverter(mapped_trajectory)
+    assert converter._read_trajectory_data(converter._data) == expected_data
+    # copies share the read-only arrays instead of loading them
+    filtered_data = converter.filter_data([])
+    assert filtered_data.agent_data.positions is mapped_agent_data.positions
+    # worker processes map the .npy files too
+    output_path = str(tmp_path / "test")
+    converter.write_JSON(output_path, bundle_size=1, n_processes=2)
+    with open(f"{output_path}.simularium") as simularium_file:
+        assert json.load(simularium_file) == expected_data
+
+
+def test_spatial_index():
+    rng = np.random.default_rng(2)
+    positions = rng.uniform(-50.0, 50.0, size=(2, 500, 3))
+    trajectory = TrajectoryData(
+        box_size=np.array([100.0, 100.0, 100.0]),
+        agent_data=AgentData(
+            times=np.array([0.0, 1.0]),
+            n_agents=np.array([500, 300]),
+            viz_types=np.full((2, 500), 1000.0),
+            unique_ids=np.tile(np.arange(500.0), (2, 1)),
+            types=[500 * ["A"], 300 * ["A"]],
+            positions=positions,
+            radii=np.ones((2, 500)),
+        ),
+    )
+    for t in range(2):
+        index = trajectory.get_spatial_index(t)
+        assert trajectory.get_spatial_index(t) is index
+        frame_positions = positions[t][: trajectory.agent_data.n_agents[t]]
+        for _ in range(20):
+            center = rng.uniform(-60.0, 60.0, size=3)
+            radius = rng.uniform(0.0, 30.0)
+            distances = np.linalg.norm(frame_positions - center, axis=1)
+            assert np.array_equal(
+                index.query_radius(center, radius), np.nonzero(distances <= radius)[0]
+            )
+            min_corner = center - rng.uniform(0.0, 20.0, size=3)
+            max_corner = center + rng.uniform(0.0, 20.0, size=3)
+            inside = np.all(
+                (frame_positions >= min_corner) & (frame_positions <= max_corner),
+                axis=1,
+            )
+            assert np.array_equal(
+                index.query_box(min_corner, max_corner), np.nonzero(inside)[0]
+            )
+    # replacing the positions clears the cached indices
+    index = trajectory.get_spatial_index(0)
+    trajectory.agent_data.positions = positions + 100.0
+    assert trajectory.get_spatial_index(0) is not index
+    assert np.array_equal(
+        trajectory.get_spatial_index(0).query_radius([100.0, 100.0, 100.0], 10.0),
+        index.query_radius([0.0, 0.0, 0.0], 10.0),
+    )
+
+
+def test_number_of_agents_plot():
+    # padding after n_agents is not counted, states are counted with their type
+    converter = TrajectoryConverter(
+        TrajectoryData(
+            box_size=np.array([10.0, 10.0, 10.0]),
+            agent_data=AgentData(
+                times=np.array([0.0, 1.0, 2.0]),
+                n_agents=np.array([3, 1, 2]),
+                viz_types=np.full((3, 3), 1000.0),
+                unique_ids=np.tile(np.arange(3.0), (3, 1)),
+                types=[
+                    ["B#bound", "A", "B"],
+                    ["A#phosphorylated", "", ""],
+                    ["A", "A#phosphorylated", ""],
+                ],
+                positions=np.zeros((3, 3, 3)),
+                radii=np.ones((3, 3)),
+            ),
+            plots=[],
+        )
+    )
+    converter.add_number_of_agents_plot()
+    plot = converter._data.plots[-1]
+    assert plot["layout"]["title"] == "Number of agents over time"
+    assert [(trace["name"], trace["y"]) for trace in plot["data"]] == [
+        ("B", [2.0, 0.0, 0.0]),
+        ("A", [1.0, 1.0, 2.0]),
+    ]
+
+
+def test_analysis_plots():
+    # 2 spheres that move and swap order and a fiber that shortens,
+    # read in chunks smaller than the trajectory
+    converter = TrajectoryConverter(
+        TrajectoryData(
+            box_size=np.array([10.0, 10.0, 10.0]),
+            agent_data=AgentData(
+                times=np.array([0.0, 1.0, 2.0]),
+                n_agents=np.array([3, 3, 1]),
+                viz_types=np.array(3 * [[1000.0, 1000.0, 1001.0]]),
+                unique_ids=np.array(
+                    [[0.0, 1.0, 2.0], [1.0, 0.0, 2.0], [0.0, 1.0, 2.0]]
+                ),
+                types=[["A", "A#bound", "F"], ["A", "A", "F"], ["A"]],
+                positions=np.array(
+                    [
+                        [[0.0, 0.0, 0.0], [2.0, 0.0, 0.0], 3 * [0.0]],
+                        [[2.0, 1.0, 0.0], [0.0, 0.0, 0.0], 3 * [0.0]],
+                        [[0.0, 0.0, 2.0], [5.0, 5.0, 5.0], 3 * [0.0]],
+                    ]
+                ),
+                radii=np.ones((3, 3)),
+                n_subpoints=np.array([[0, 0, 3], [0, 0, 2], [0, 0, 0]]),
+                subpoints=np.array(
+                    [
+                        [
+                            3 * [3 * [0.0]],
+                            3 * [3 * [0.0]],
+                            [[0.0, 0.0, 0.0], [3.0, 0.0, 0.0], [3.0, 4.0, 0.0]],
+                        ],
+                        [
+                            3 * [3 * [0.0]],
+                            3 * [3 * [0.0]],
+                            # last point is padding
+                            [[0.0, 0.0, 0.0], [3.0, 0.0, 0.0], [9.0, 9.0, 9.0]],
+                        ],
+                        3 * [3 * [3 * [0.0]]],
+                    ]
+                ),
+            ),
+            plots=[],
+        )
+    )
+    converter.add_fiber_length_plot(chunk_size=2)
+    converter.add_radius_of_gyration_plot(chunk_size=2)
+    converter.add_mean_squared_displacement_plot(chunk_size=2)
+    converter.add_pairwise_distance_plot(time_index=0)
+    converter.add_pairwise_distance_plot(time_index=0, max_distance=1.0)
+    converter.add_pairwise_distance_plot(time_index=None, bin_width=1.0)
+    (
+        fiber_lengths,
+        radii,
+        displacements,
+        distances,
+        near_distances,
+        binned_distances,
+    ) = converter._data.plots
+    assert [(trace["name"], trace["y"]) for trace in fiber_lengths["data"]] == [
+        ("F", [7.0, 3.0, 0.0])
+    ]
+    assert [trace["name"] for trace in radii["data"]] == ["A"]
+    assert np.allclose(radii["data"][0]["y"], [1.0, np.sqrt(1.25), 0.0])
+    assert [(trace["name"], trace["y"]) for trace in displacements["data"]] == [
+        ("A", [0.0, 0.5, 4.0]),
+        ("F", [0.0, 0.0, 0.0]),
+    ]
+    assert distances["layout"]["title"] == "Pairwise distances at time 0.0"
+    assert [(trace["name"], trace["x"]) for trace in distances["data"]] == [
+        ("A", [2.0])
+    ]
+    assert near_distances["data"][0]["x"] == []
+    # distances of 2.0 at time 0 and sqrt(5) at time 1
+    assert binned_distances["data"][0]["x"] == [2.5]
+    assert binned_distances["data"][0]["y"] == [2]
+
+
+def test_conversion_stats(tmp_path):
+    converter = TrajectoryConverter(
+        TrajectoryData(
+            box_size=np.array([10.0, 10.0, 10.0]),
+            agent_data=AgentData(
+                times=np.array([0.0, 1.0, 2.0]),
+                n_agents=np.array([3, 1, 2]),
+                viz_types=np.full((3, 3), 1000.0),
+                unique_ids=np.tile(np.arange(3.0), (3, 1)),
+                types=[["A", "B", "B"], ["A", "", ""], ["A", "B", ""]],
+                positions=np.zeros((3, 3, 3)),
+                radii=np.ones((3, 3)),
+            ),
+            plots=[],
+        )
+    )
+    finished = []
+    converter.stats.add_callback(lambda stage: finished.append(stage.name))
+    converter.write_JSON(str(tmp_path / "test"))
+    stats = converter.stats.to_dict()
+    assert set(stats) == {"parse", "pack", "serialize", "write"}
+    assert stats["parse"]["calls"] == 1
+    assert stats["pack"]["frames"] == 3
+    assert stats["pack"]["agents"] == 3
+    assert all(stage["wallTime"] >= 0.0 for stage in stats.values())
+    assert finished[-1] == "write"
+    # stats from another conversion can be collected in the same object
+    collected = ConversionStats()
+    TrajectoryConverter.write_external_JSON(
+        converter._data, str(tmp_path / "external"), stats=collected
+    )
+    assert collected.stages["pack"].n_frames == 3
+
+
+def test_progress_and_cancellation(tmp_path):
+    converter = TrajectoryConverter(
+        TrajectoryData(
+            box_size=np.array([10.0, 10.0, 10.0]),
+            agent_data=AgentData(
+                times=np.arange(4.0),
+                n_agents=np.full(4, 2),
+                viz_types=np.full((4, 2), 1000.0),
+                unique_ids=np.tile(np.arange(2.0), (4, 1)),
+                types=[["A", "B"] for _ in range(4)],
+                positions=np.zeros((4, 2, 3)),
+                radii=np.ones((4, 2)),
+            ),
+            plots=[],
+        )
+    )
+    progress = []
+    converter.stats.add_progress_callback(progress.append)
+    output_path = str(tmp_path / "test")
+    converter.write_JSON(output_path, bundle_size=2)
+    writes = [
+        (update.n_frames, update.total_frames)
+        for update in progress
+        if update.stage == "write"
+    ]
+    assert writes == [(2, 4), (4, 4), (4, 4)]
+    assert progress[-1].bytes_written == os.path.getsize(f"{output_path}.simularium")
+    assert converter.stats.stages["write"].bytes_written == progress[-1].bytes_written
+    # cancel after the first packed frame, the partial output is removed
+    token = CancellationToken()
+    stats = ConversionStats(
+        progress_callbacks=[
+            lambda update: token.cancel() if update.stage == "pack" else None
+        ],
+        cancellation_token=token,
+    )
+    cancelled_path = str(tmp_path / "cancelled")
+    # files with similar names are left alone
+    other_path = f"{cancelled_path}_bundle_old.simularium"
+    with open(other_path, "w") as other_file:
+        other_file.write("{}")
+    with pytest.raises(ConversionCancelled) as error:
+        TrajectoryConverter.write_external_JSON(
+            converter._data, cancelled_path, bundle_size=2, stats=stats
+        )
+    assert error.value.stage_name == "pack"
+    assert not os.path.exists(f"{cancelled_path}.simularium")
+    assert os.path.exists(other_path)
@@ -10,6 +10,7 @@ from simulariumio.cytosim import (
     CytosimObjectInfo,
     CytosimAgentInfo,
 )
+from simulariumio.filters import CropFilter
 
 
 @pytest.mark.parametrize(
@@ -1128,3 +1129,78 @@ def test_cytosim_trajectory_reader(trajectory, expected_data):
     buffer_data = converter._read_trajectory_data(converter._data)
     assert expected_data == buffer_data
     assert converter._check_agent_ids_are_unique_per_frame(buffer_data)
+
+
+@pytest.mark.parametrize(
+    "start_time, end_time, stride, expected_frames",
+    [
+        (None, None, 2, [0, 2]),
+        (None, None, 5, [0]),
+        (0.2, None, 1, [1, 2]),
+        (0.15, 0.25, 1, [1]),
+        (0.1, 0.3, 2, [0, 2]),
+    ],
+)
+def test_cytosim_frame_selection(start_time, end_time, stride, expected_frames):
+    def fibers_data(**kwargs) -> CytosimData:
+        return CytosimData(
+            box_size=np.array([0.5, 0.5, 0.5]),
+            object_info={
+                "fibers": CytosimObjectInfo(
+                    filepath="simulariumio/tests/data/cytosim"
+                    "/3_fibers_3_frames/fiber_points.txt",
+                )
+            },
+            **kwargs,
+        )
+
+    expected = CytosimConverter(fibers_data())._data.agent_data
+    agent_data = CytosimConverter(
+        fibers_data(start_time=start_time, end_time=end_time, stride=stride)
+    )._data.agent_data
+    assert np.allclose(agent_data.times, expected.times[expected_frames])
+    assert np.allclose(
+        agent_data.subpoints[:, : expected.subpoints.shape[1]],
+        expected.subpoints[expected_frames],
+    )
+
+
+def test_cytosim_roi():
+    def aster_data(**kwargs) -> CytosimData:
+        data_dir = (
+            "simulariumio/tests/data/cytosim/aster_pull3D_couples_actin_solid_3_frames"
+        )
+        return CytosimData(
+            box_size=np.array([2.0, 2.0, 2.0]),
+            object_info={
+                "fibers": CytosimObjectInfo(
+                    filepath=f"{data_dir}/fiber_points.txt",
+                    agents={1: CytosimAgentInfo(name="microtubule", radius=0.01)},
+                ),
+                "couples": CytosimObjectInfo(
+                    filepath=f"{data_dir}/couples.txt",
+                    position_indices=[3, 4, 5],
+                ),
+            },
+            scale_factor=10.0,
+            **kwargs,
+        )
+
+    roi_min = np.array([-0.5, -0.5, -1.0])
+    roi_max = np.array([0.6, 0.5, 1.0])
+    data = CytosimConverter(aster_data(roi_min=roi_min, roi_max=roi_max))._data
+    # cropping the full data gives the same agents
+    expected = CropFilter(10.0 * roi_min, 10.0 * roi_max).apply(
+        CytosimConverter(aster_data())._data
+    )
+    assert np.array_equal(data.box_size, [12.0, 10.0, 20.0])
+    agent_data = data.agent_data
+    expected_agent_data = expected.agent_data
+    assert np.array_equal(agent_data.n_agents, expected_agent_data.n_agents)
+    assert agent_data.types == expected_agent_data.types
+    n = expected_agent_data.positions.shape[1]
+    assert np.allclose(agent_data.positions[:, :n], expected_agent_data.positions)
+    assert np.allclose(
+        agent_data.subpoints[:, :n],
+        expected_agent_data.subpoints[:, :, : agent_data.subpoints.shape[2]],
+    )
@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import importlib.util
+import json
+import sys
+
+import pytest
+import numpy as np
+
+from simulariumio import (
+    TrajectoryConverter,
+    FileConverter,
+    PrecisionData,
+    UnitData,
+    AgentData,
+    TrajectoryData,
+    DeltaEncoding,
+)
+from simulariumio.compression import open_input_file
+from simulariumio.delta_encoding import FrameRecords
+from simulariumio.exceptions import UnsupportedCompressionError
+from simulariumio.tests.conftest import three_default_agents
+
+
+@pytest.mark.parametrize(
+    "bundle_size, separate_files, n_processes",
+    [
+        (None, False, None),
+        (1, False, None),
+        (2, False, None),
+        (2, True, None),
+        (5, True, None),
+        (None, False, 2),
+        (2, True, 2),
+    ],
+)
+def test_bundled_output_round_trip(tmp_path, bundle_size, separate_files, n_processes):
+    converter = TrajectoryConverter(three_default_agents())
+    expected_data = converter._read_trajectory_data(converter._data)
+    output_path = str(tmp_path / "test")
+    converter.write_JSON(output_path, bundle_size, separate_files, n_processes)
+    if not separate_files:
+        with open(f"{output_path}.simularium") as simularium_file:
+            assert json.load(simularium_file) == expected_data
+    file_converter = FileConverter(f"{output_path}.simularium")
+    buffer_data = file_converter._read_trajectory_data(file_converter._data)
+    assert buffer_data["spatialData"] == expected_data["spatialData"]
+
+
+def test_parallel_packing_bounds_queued_bundles(monkeypatch):
+    from concurrent.futures import ProcessPoolExecutor
+
+    from simulariumio import parallel_packing
+    from simulariumio.serializers import JsonFrameSerializer
+
+    submitted = []
+
+    class CountingExecutor(ProcessPoolExecutor):
+        def submit(self, *args, **kwargs):
+            submitted.append(args[1])
+            return super().submit(*args, **kwargs)
+
+    monkeypatch.setattr(parallel_packing, "ProcessPoolExecutor", CountingExecutor)
+    agent_data = three_default_agents().agent_data
+    agent_data.type_ids = np.zeros(agent_data.unique_ids.shape)
+    frame_ranges = [(t % 3, t % 3 + 1) for t in range(10)]
+    bundles = parallel_packing.pack_frames_in_parallel(
+        agent_data, frame_ranges, 2, JsonFrameSerializer()
+    )
+    next(bundles)
+    # the first bundle, and the next 2 per process
+    assert len(submitted) <= 5
+    assert len(list(bundles)) == 9
+    assert submitted == frame_ranges
+
+
+def test_parallel_packing_stats(tmp_path):
+    converter = TrajectoryConverter(three_default_agents())
+    n_frames = converter._data.agent_data.times.size
+    converter.write_JSON(str(tmp_path / "test"), bundle_size=1, n_processes=2)
+    # the workers' stats are added for each bundle
+    for stage in ["pack", "serialize"]:
+        assert converter.stats.stages[stage].n_frames == n_frames
+        assert converter.stats.stages[stage].calls == n_frames
+        assert converter.stats.stages[stage].n_agents > 0
+
+
+def test_separate_bundle_files(tmp_path):
+    converter = TrajectoryConverter(three_default_agents())
+    output_path = str(tmp_path / "test")
+    converter.write_JSON(output_path, bundle_size=2, separate_files=True)
+    with open(f"{output_path}.simularium") as manifest_file:
+        manifest = json.load(manifest_file)
+    assert manifest["spatialData"]["bundleFiles"] == [
+        {"bundleStart": 0, "bundleSize": 2, "file": "test_bundle0.simularium"},
+        {"bundleStart": 2, "bundleSize": 1, "file": "test_bundle1.simularium"},
+    ]
+    with open(tmp_path / "test_bundle1.simularium") as bundle_file:
+        bundle = json.load(bundle_file)
+    assert bundle["bundleStart"] == 2
+    assert [frame["frameNumber"] for frame in bundle["bundleData"]] == [2]
+
+
+@pytest.mark.parametrize("bundle_size", [None, 2])
+def test_write_with_precision(tmp_path, bundle_size):
+    converter = TrajectoryConverter(three_default_agents())
+    output_path = str(tmp_path / "test")
+    precision = PrecisionData(position_decimals=2, radius_decimals=1)
+    converter.write_JSON(output_path, bundle_size, precision=precision)
+    with open(f"{output_path}.simularium") as simularium_file:
+        buffer_data = json.load(simularium_file)
+    assert buffer_data["trajectoryInfo"]["precision"] == {
+        "positions": 2,
+        "radii": 1,
+        "subpoints": None,
+    }
+    assert buffer_data["spatialData"]["bundleData"][0]["data"][3:6] == [
+        4.9,
+        -29.82,
+        40.77,
+    ]
+    assert buffer_data["spatialData"]["bundleData"][0]["data"][9] == 8.4
+    # the converter's data is unchanged
+    assert converter._data.agent_data.positions[0][0][0] == 4.89610492
+
+
+def test_precision_from_units():
+    precision = PrecisionData.from_resolution(0.1, UnitData("nm"), UnitData("µm"))
+    assert precision.position_decimals == 4
+    precision = PrecisionData.from_box_size(np.array([100.0, 50.0, 50.0]), 1e-3)
+    assert precision.subpoint_decimals == 1
+
+
+@pytest.mark.parametrize(
+    "compression, extension, bundle_size, separate_files",
+    [
+        ("gzip", ".gz", None, False),
+        ("gzip", ".gz", 2, True),
+        pytest.param(
+            "zstd",
+            ".zst",
+            2,
+            False,
+            marks=pytest.mark.skipif(
+                importlib.util.find_spec("zstandard") is None,
+                reason="zstandard is not installed",
+            ),
+        ),
+        pytest.param(
+            "lz4",
+            ".lz4",
+            None,
+            False,
+            marks=pytest.mark.skipif(
+                importlib.util.find_spec("lz4") is None,
+                reason="lz4 is not installed",
+            ),
+        ),
+        pytest.param(
+            "bz2",
+            "",
+            None,
+            False,
+            marks=pytest.mark.raises(exception=UnsupportedCompressionError),
+        ),
+    ],
+)
+def test_compressed_output_round_trip(
+    tmp_path, compression, extension, bundle_size, separate_files
+):
+    converter = TrajectoryConverter(three_default_agents())
+    expected_data = converter._read_trajectory_data(converter._data)
+    output_path = str(tmp_path / "test")
+    converter.write_JSON(
+        output_path, bundle_size, separate_files, compression=compression
+    )
+    file_converter = FileConverter(f"{output_path}.simularium{extension}")
+    buffer_data = file_converter._read_trajectory_data(file_converter._data)
+    assert buffer_data["spatialData"] == expected_data["spatialData"]
+
+
+@pytest.mark.parametrize(
+    "module, magic_bytes",
+    [("zstandard", b"\x28\xb5\x2f\xfd"), ("lz4.frame", b"\x04\x22\x4d\x18")],
+)
+def test_compressed_input_needs_codec(tmp_path, monkeypatch, module, magic_bytes):
+    # the codec isn't installed
+    monkeypatch.setitem(sys.modules, module, None)
+    input_path = str(tmp_path / "test.simularium")
+    with open(input_path, "wb") as input_file:
+        input_file.write(magic_bytes)
+    with pytest.raises(ImportError, match="pip install simulariumio"):
+        open_input_file(input_path)
+
+
+def random_walk_agents(fibers: bool) -> TrajectoryData:
+    # 3 agents for 3 frames, then a 4th agent joins, then the 1st one leaves
+    rng = np.random.default_rng(4)
+    total_steps = 8
+    n_agents = np.array(3 * [3] + 3 * [4] + 2 * [3])
+    unique_ids = np.zeros((total_steps, 4))
+    unique_ids[:6] = [0.0, 1.0, 2.0, 3.0]
+    unique_ids[6:] = [1.0, 2.0, 3.0, 0.0]
+    types = [n_agents[t] * ["A"] for t in range(total_steps)]
+    walk = np.cumsum(rng.normal(scale=0.5, size=(total_steps, 4, 3, 3)), axis=0)
+    return TrajectoryData(
+        box_size=np.array([100.0, 100.0, 100.0]),
+        agent_data=AgentData(
+            times=0.1 * np.arange(total_steps),
+            n_agents=n_agents,
+            viz_types=np.full((total_steps, 4), 1001.0 if fibers else 1000.0),
+            unique_ids=unique_ids,
+            types=types,
+            positions=np.zeros((total_steps, 4, 3)) if fibers else walk[:, :, 0],
+            radii=np.ones((total_steps, 4)),
+            n_subpoints=np.full((total_steps, 4), 3) if fibers else None,
+            subpoints=walk if fibers else None,
+        ),
+    )
+
+
+@pytest.mark.parametrize(
+    "fibers, bundle_size, n_processes, keyframes",
+    [
+        (False, None, None, [0, 4]),
+        (False, 3, None, [0, 3, 6]),
+        (False, 3, 2, [0, 3, 6]),
+        (True, None, None, [0, 4]),
+        (True, 5, None, [0, 4, 5]),
+    ],
+)
+def test_delta_encoded_round_trip(
+    tmp_path, fibers, bundle_size, n_processes, keyframes
+):
+    trajectory_data = random_walk_agents(fibers)
+    converter = TrajectoryConverter(trajectory_data)
+    output_path = str(tmp_path / "test")
+    delta_encoding = DeltaEncoding(keyframe_interval=4, delta_step=0.01)
+    converter.write_JSON(
+        output_path,
+        bundle_size,
+        n_processes=n_processes,
+        delta_encoding=delta_encoding,
+    )
+    with open(f"{output_path}.simularium") as simularium_file:
+        buffer_data = json.load(simularium_file)
+    assert buffer_data["trajectoryInfo"]["spatialEncoding"]["deltaStep"] == 0.01
+    # keyframes at the interval and at the start of each bundle,
+    # agents joining and leaving are stored in the delta frames
+    assert [
+        frame["frameNumber"]
+        for frame in buffer_data["spatialData"]["bundleData"]
+        if "data" in frame
+    ] == keyframes
+    agent_data = FileConverter(f"{output_path}.simularium")._data.agent_data
+    expected = trajectory_data.agent_data
+    assert np.array_equal(agent_data.n_agents, expected.n_agents)
+    # deltas are quantized to delta_step, so values are within half a step
+    tolerance = 0.005 + 1e-9
+    for t in range(expected.times.size):
+        n = int(expected.n_agents[t])
+        assert np.array_equal(agent_data.unique_ids[t][:n], expected.unique_ids[t][:n])
+        assert np.allclose(
+            agent_data.positions[t][:n], expected.positions[t][:n], atol=tolerance
+        )
+        if fibers:
+            assert np.allclose(
+                agent_data.subpoints[t][:n], expected.subpoints[t][:n], atol=tolerance
+            )
+
+
+def test_delta_encoding_removed_agent():
+    # 50 agents, then the second one leaves and the rest don't move
+    n_agents = 50
+    headers = np.zeros((n_agents, 11))
+    headers[:, 0] = 1000.0
+    headers[:, 1] = np.arange(n_agents)
+    headers[:, 3:6] = np.arange(3 * n_agents).reshape((n_agents, 3))
+    headers[:, 9] = 1.0
+    delta_encoding = DeltaEncoding()
+    frames = list(
+        delta_encoding.encode_frames(
+            [(0, headers.flatten()), (1, np.delete(headers, 1, axis=0).flatten())]
+        )
+    )
+    _, buffer, delta = frames[1]
+    assert buffer is None
+    assert delta["removedAgents"].tolist() == [1]
+    assert delta["positionDeltas"].size == 0
+    assert delta["appendedData"].size == 0
+    decoded = delta_encoding.decode_frame(FrameRecords.from_buffer(frames[0][1]), delta)
+    assert np.array_equal(decoded.headers, np.delete(headers, 1, axis=0))
+
+
+def static_and_moving_agents() -> TrajectoryData:
+    # agents 5 and 7 never change, though their index in the frame does
+    return TrajectoryData(
+        box_size=np.array([10.0, 10.0, 10.0]),
+        agent_data=AgentData(
+            times=np.arange(3.0),
+            n_agents=np.array([3, 4, 3]),
+            viz_types=np.full((3, 4), 1000.0),
+            unique_ids=np.array(
+                [[5.0, 6.0, 7.0, 0.0], [6.0, 7.0, 5.0, 8.0], [7.0, 5.0, 6.0, 0.0]]
+            ),
+            types=[["A", "B", "C"], ["B", "C", "A", "B"], ["C", "A", "B"]],
+            positions=np.array(
+                [
+                    [[1.0, 1.0, 1.0], [2.0, 2.0, 2.0], [3.0, 3.0, 3.0], 3 * [0.0]],
+                    [[2.5, 2.0, 2.0], [3.0, 3.0, 3.0], [1.0, 1.0, 1.0], 3 * [4.0]],
+                    [[3.0, 3.0, 3.0], [1.0, 1.0, 1.0], [2.0, 2.0, 2.0], 3 * [0.0]],
+                ]
+            ),
+            radii=np.ones((3, 4)),
+        ),
+    )
+
+
+def test_static_agent_mask():
+    agent_data = static_and_moving_agents().agent_data
+    agent_data.type_ids, tm = AgentData.get_type_ids_and_mapping(agent_data.types)
+    assert np.array_equal(
+        agent_data.get_static_agent_mask(),
+        [
+            [True, False, True, False],
+            [False, True, True, False],
+            [True, True, False, False],
+        ],
+    )
+
+
+@pytest.mark.parametrize("bundle_size", [None, 2])
+def test_deduplicate_static_agents_round_trip(tmp_path, bundle_size):
+    trajectory_data = static_and_moving_agents()
+    converter = TrajectoryConverter(trajectory_data)
+    output_path = str(tmp_path / "test")
+    converter.write_JSON(output_path, bundle_size, deduplicate_static_agents=True)
+    with open(f"{output_path}.simularium") as simularium_file:
+        buffer_data = json.load(simularium_file)
+    static_data = buffer_data["spatialData"]["staticData"]
+    assert static_data[1::11] == [5.0, 7.0]
+    assert [
+        frame["data"][1::11] for frame in buffer_data["spatialData"]["bundleData"]
+    ] == [[6.0], [6.0, 8.0], [6.0]]
+    agent_data = FileConverter(f"{output_path}.simularium")._data.agent_data
+    expected = trajectory_data.agent_data
+    assert np.array_equal(agent_data.n_agents, expected.n_agents)
+    for t in range(3):
+        n = int(expected.n_agents[t])
+        # static agents are added back at the end of each frame
+        order = np.argsort(expected.unique_ids[t][:n])
+        result_order = np.argsort(agent_data.unique_ids[t][:n])
+        assert np.array_equal(
+            agent_data.positions[t][result_order], expected.positions[t][order]
+        )
+        assert [agent_data.types[t][i] for i in result_order] == [
+            expected.types[t][i] for i in order
+        ]
+
+
+@pytest.mark.parametrize("delta_encoding", [None, DeltaEncoding(keyframe_interval=4)])
+def test_read_time_range(tmp_path, delta_encoding):
+    converter = TrajectoryConverter(random_walk_agents(fibers=True))
+    output_path = str(tmp_path / "test")
+    converter.write_JSON(output_path, delta_encoding=delta_encoding)
+    expected = FileConverter(f"{output_path}.simularium")._data.agent_data
+    agent_data = FileConverter(
+        f"{output_path}.simularium", start_time=0.2, end_time=0.6, stride=2
+    )._data.agent_data
+    assert np.allclose(agent_data.times, [0.2, 0.4, 0.6])
+    assert np.array_equal(agent_data.n_agents, expected.n_agents[2:7:2])
+    assert np.allclose(agent_data.subpoints, expected.subpoints[2:7:2])
+
+
+def test_write_levels_of_detail(tmp_path):
+    converter = TrajectoryConverter(random_walk_agents(fibers=False))
+    output_path = str(tmp_path / "test")
+    converter.write_LOD_JSON(output_path, cell_sizes=[100.0, 0.5])
+    expected_levels = [
+        {"level": 0, "cellSize": 0.0, "file": "test.simularium"},
+        {"level": 1, "cellSize": 0.5, "file": "test_lod1.simularium"},
+        {"level": 2, "cellSize": 100.0, "file": "test_lod2.simularium"},
+    ]
+    n_agents = []
+    for level in expected_levels:
+        file_path = str(tmp_path / level["file"])
+        with open(file_path) as simularium_file:
+            traj_info = json.load(simularium_file)["trajectoryInfo"]
+        assert traj_info["levelOfDetail"] == level["level"]
+        assert traj_info["levelsOfDetail"] == expected_levels
+        n_agents.append(FileConverter(file_path)._data.agent_data.n_agents)
+    assert np.array_equal(n_agents[0], converter._data.agent_data.n_agents)
+    # the grids are nested, so coarser levels never have more agents
+    assert np.all(n_agents[1] <= n_agents[0])
+    assert np.all(n_agents[2] <= n_agents[1])
+    assert np.sum(n_agents[2]) < np.sum(n_agents[0])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import shutil
+
+import numpy as np
+
+from simulariumio import ParseCache
+from simulariumio.cytosim import (
+    CytosimConverter,
+    CytosimData,
+    CytosimObjectInfo,
+    CytosimAgentInfo,
+)
+
+CYTOSIM_DATA_DIR = (
+    "simulariumio/tests/data/cytosim/aster_pull3D_couples_actin_solid_3_frames"
+)
+
+
+def cytosim_data(
+    data_dir: str, radius: float, scale_factor: float, parse_cache: ParseCache = None
+) -> CytosimData:
+    return CytosimData(
+        box_size=np.array([2.0, 2.0, 2.0]),
+        object_info={
+            "fibers": CytosimObjectInfo(
+                filepath=os.path.join(data_dir, "fiber_points.txt"),
+                agents={1: CytosimAgentInfo(name="microtubule", radius=radius)},
+            ),
+            "couples": CytosimObjectInfo(
+                filepath=os.path.join(data_dir, "couples.txt"),
+                position_indices=[3, 4, 5],
+            ),
+        },
+        scale_factor=scale_factor,
+        parse_cache=parse_cache,
+    )
+
+
+def test_cytosim_parse_cache(tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    data_dir = str(tmp_path / "cytosim")
+    shutil.copytree(CYTOSIM_DATA_DIR, data_dir)
+    parse_cache = ParseCache(str(tmp_path / "cache"))
+    converter = CytosimConverter(cytosim_data(data_dir, 0.01, 100.0, parse_cache))
+    assert len(os.listdir(parse_cache.cache_dir)) == 1
+    assert "from cache" not in caplog.text
+    caplog.clear()
+    # only display settings changed, so the cached data is used
+    converter = CytosimConverter(cytosim_data(data_dir, 0.5, 10.0, parse_cache))
+    assert "from cache" in caplog.text
+    caplog.clear()
+    expected_converter = CytosimConverter(cytosim_data(data_dir, 0.5, 10.0))
+    assert converter._read_trajectory_data(
+        converter._data
+    ) == expected_converter._read_trajectory_data(expected_converter._data)
+    # changing an input file invalidates the cached data
+    with open(os.path.join(data_dir, "couples.txt"), "a") as couples_file:
+        couples_file.write("\n")
+    CytosimConverter(cytosim_data(data_dir, 0.5, 10.0, parse_cache))
+    assert "from cache" not in caplog.text
+    assert len(os.listdir(parse_cache.cache_dir)) == 2
+
+
+def test_parse_cache_evicts_least_recently_used(tmp_path):
+    parse_cache = ParseCache(str(tmp_path))
+    arrays = {"positions": np.zeros((10, 3))}
+    for index, key in enumerate(["a", "b", "c"]):
+        parse_cache.save(key, arrays, {})
+        os.utime(tmp_path / f"{key}.npz", ns=(index * 10**9, index * 10**9))
+    # loading "a" marks it as the most recently used
+    assert parse_cache.load("a") is not None
+    parse_cache.max_size = 3 * os.path.getsize(tmp_path / "a.npz")
+    parse_cache.save("d", arrays, {})
+    assert sorted(os.listdir(tmp_path)) == ["a.npz", "c.npz", "d.npz"]
+    assert parse_cache.load("b") is None
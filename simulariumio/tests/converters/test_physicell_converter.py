@@ -183,3 +183,16 @@ def test_physicell_trajectory_reader(trajectory, expected_data):
     buffer_data = converter._read_trajectory_data(converter._data)
     assert expected_data == buffer_data
     assert converter._check_agent_ids_are_unique_per_frame(buffer_data)
+
+
+def test_physicell_converter_does_not_print(capsys):
+    PhysicellConverter(
+        PhysicellData(
+            box_size=np.array([1000.0, 1000.0, 100.0]),
+            timestep=360.0,
+            path_to_output_dir="simulariumio/tests/data/physicell/output/",
+            scale_factor=0.01,
+            plots=[],
+        )
+    )
+    assert capsys.readouterr().out == ""
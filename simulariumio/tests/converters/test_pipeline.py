@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+
+import numpy as np
+import pytest
+
+from simulariumio import FileConverter, TrajectoryConverter, ConversionStats
+from simulariumio.filters import (
+    MultiplySpaceFilter,
+    TransformSpatialAxesFilter,
+    SmoothPositionsFilter,
+    EveryNthTimestepFilter,
+)
+from simulariumio.pipeline import filter_frames, write_frames_JSON
+
+CYTOSIM_JSON_PATH = (
+    "simulariumio/tests/data/cytosim/aster_pull3D_couples_actin_solid_3_frames"
+    "/aster_pull3D_couples_actin_solid_3_frames_small.json"
+)
+
+
+def load_json(path: str):
+    with open(path) as simularium_file:
+        return json.load(simularium_file)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5])
+def test_pipeline_matches_whole_trajectory(tmp_path, caplog, chunk_size):
+    caplog.set_level(logging.INFO)
+    converter = FileConverter(CYTOSIM_JSON_PATH)
+    spatial_units = converter._data.spatial_units.to_string()
+    filters = [
+        MultiplySpaceFilter(multiplier=10.0),
+        TransformSpatialAxesFilter(["+X", "-Z", "+Y"]),
+        SmoothPositionsFilter(half_width=1),
+    ]
+    stats = ConversionStats()
+    n_frames = write_frames_JSON(
+        filter_frames(converter.iter_frames(chunk_size), filters, stats),
+        str(tmp_path / "streamed"),
+        stats=stats,
+    )
+    assert n_frames == 3
+    assert stats.stages["filter"].n_frames == 3
+    # filtering each chunk isn't logged at INFO level
+    assert not any("smooth positions" in message for message in caplog.messages)
+    TrajectoryConverter.write_external_JSON(
+        converter.filter_data(filters), str(tmp_path / "whole")
+    )
+    streamed = load_json(str(tmp_path / "streamed.simularium"))
+    whole = load_json(str(tmp_path / "whole.simularium"))
+    assert streamed["trajectoryInfo"] == whole["trajectoryInfo"]
+    assert streamed["plotData"] == whole["plotData"]
+    streamed_frames = streamed["spatialData"].pop("bundleData")
+    whole_frames = whole["spatialData"].pop("bundleData")
+    assert streamed["spatialData"] == whole["spatialData"]
+    for streamed_frame, whole_frame in zip(streamed_frames, whole_frames):
+        assert streamed_frame["frameNumber"] == whole_frame["frameNumber"]
+        assert streamed_frame["time"] == whole_frame["time"]
+        assert np.allclose(streamed_frame["data"], whole_frame["data"])
+    # the streamed output can be read back
+    assert (
+        FileConverter(str(tmp_path / "streamed.simularium"))._data.agent_data.times.size
+        == 3
+    )
+    # the converter's data is not changed by filtering the chunks
+    assert converter._data.spatial_units.to_string() == spatial_units
+
+
+def test_pipeline_needs_frame_wise_filters():
+    converter = FileConverter(CYTOSIM_JSON_PATH)
+    with pytest.raises(ValueError):
+        filter_frames(converter.iter_frames(), [EveryNthTimestepFilter(2)])
@@ -5,7 +5,9 @@ import numpy as np
 import pytest
 
 from simulariumio.readdy import ReaddyConverter, ReaddyData
-from simulariumio import UnitData
+from simulariumio import FileConverter, TrajectoryConverter, UnitData
+from simulariumio.filters import MultiplySpaceFilter
+from simulariumio.pipeline import filter_frames, write_frames_JSON
 
 
 @pytest.mark.parametrize(
@@ -207,3 +209,76 @@ def test_readdy_trajectory_reader(trajectory, expected_data):
     buffer_data = converter._read_trajectory_data(converter._data)
     assert expected_data == buffer_data
     assert converter._check_agent_ids_are_unique_per_frame(buffer_data)
+
+
+def test_time_range_needs_timestep():
+    with pytest.raises(ValueError):
+        ReaddyConverter(
+            ReaddyData(
+                box_size=np.array([20.0, 20.0, 20.0]),
+                timestep=0.0,
+                path_to_readdy_h5="simulariumio/tests/data/readdy/test.h5",
+                start_time=0.1,
+            )
+        )
+
+
+def get_readdy_data(start_time: float = None, stride: int = 1) -> ReaddyData:
+    return ReaddyData(
+        box_size=np.array([20.0, 20.0, 20.0]),
+        timestep=0.1,
+        path_to_readdy_h5="simulariumio/tests/data/readdy/test.h5",
+        radii={"C": 3.0, "A": 2.0, "B": 2.0},
+        ignore_types=["E"],
+        type_grouping={"C": ["A", "D"]},
+        time_units=UnitData("ms", 1e-6),
+        spatial_units=UnitData("nm"),
+        plots=[],
+        start_time=start_time,
+        stride=stride,
+    )
+
+
+@pytest.mark.parametrize(
+    "chunk_size, start_time, stride",
+    [
+        # the 3 frames are an exact multiple of the chunk size
+        (1, None, 1),
+        (3, None, 1),
+        (2, None, 1),
+        (1, None, 2),
+        (2, 0.1, 1),
+        (1, 0.1, 2),
+    ],
+)
+def test_read_frames_matches_whole_trajectory(tmp_path, chunk_size, start_time, stride):
+    filters = [MultiplySpaceFilter(multiplier=10.0)]
+    n_frames = write_frames_JSON(
+        filter_frames(
+            ReaddyConverter.read_frames(
+                get_readdy_data(start_time, stride), chunk_size
+            ),
+            filters,
+        ),
+        str(tmp_path / "streamed"),
+    )
+    converter = ReaddyConverter(get_readdy_data(start_time, stride))
+    TrajectoryConverter.write_external_JSON(
+        converter.filter_data(filters), str(tmp_path / "whole")
+    )
+    streamed = FileConverter(str(tmp_path / "streamed.simularium"))._data
+    whole = FileConverter(str(tmp_path / "whole.simularium"))._data
+    assert n_frames == whole.agent_data.times.size
+    assert np.allclose(streamed.box_size, whole.box_size)
+    assert np.allclose(streamed.agent_data.times, whole.agent_data.times)
+    assert np.array_equal(streamed.agent_data.n_agents, whole.agent_data.n_agents)
+    for t in range(n_frames):
+        n = int(whole.agent_data.n_agents[t])
+        # grouped types can get different IDs, so compare the names
+        assert streamed.agent_data.types[t][:n] == whole.agent_data.types[t][:n]
+        assert np.array_equal(
+            streamed.agent_data.unique_ids[t][:n], whole.agent_data.unique_ids[t][:n]
+        )
+        assert np.allclose(
+            streamed.agent_data.positions[t][:n], whole.agent_data.positions[t][:n]
+        )
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+from simulariumio import (
+    ConversionJob,
+    ConversionService,
+    convert,
+    send_job,
+)
+
+CYTOSIM_JSON_PATH = (
+    "simulariumio/tests/data/cytosim/aster_pull3D_couples_actin_solid_3_frames"
+    "/aster_pull3D_couples_actin_solid_3_frames_small.json"
+)
+
+
+def load_json(path: str):
+    with open(path) as simularium_file:
+        return json.load(simularium_file)
+
+
+def get_job(output_path: str) -> dict:
+    return {
+        "input_type": "simularium",
+        "input_options": {"input_path": CYTOSIM_JSON_PATH},
+        "output_path": output_path,
+        "filters": [{"type": "MultiplySpaceFilter", "multiplier": 10.0}],
+    }
+
+
+def check_output(path: str):
+    expected = load_json(CYTOSIM_JSON_PATH)
+    result = load_json(path)
+    assert result["trajectoryInfo"]["totalSteps"] == (
+        expected["trajectoryInfo"]["totalSteps"]
+    )
+    for frame, expected_frame in zip(
+        result["spatialData"]["bundleData"], expected["spatialData"]["bundleData"]
+    ):
+        assert frame["frameNumber"] == expected_frame["frameNumber"]
+        # positions of the first agent are scaled
+        assert np.allclose(
+            frame["data"][4:7], 10.0 * np.array(expected_frame["data"][4:7])
+        )
+
+
+def test_convert(tmp_path):
+    output_path = str(tmp_path / "converted")
+    result = asyncio.run(convert(get_job(output_path)))
+    assert result["outputFiles"] == [f"{output_path}.simularium"]
+    assert result["stats"]["filter"]["frames"] > 0
+    check_output(f"{output_path}.simularium")
+
+
+def test_conversion_job_options():
+    job = ConversionJob.from_dict(
+        {
+            "input_type": "cytosim",
+            "input_options": {
+                "box_size": [0.5, 0.5, 0.5],
+                "object_info": {
+                    "fibers": {
+                        "filepath": "simulariumio/tests/data/cytosim"
+                        "/3_fibers_3_frames/fiber_points.txt",
+                        "agents": {"0": {"name": "fiber", "radius": 0.001}},
+                    }
+                },
+                "scale_factor": 1e3,
+            },
+            "output_path": "output",
+            "filters": [{"type": "EveryNthAgentFilter", "n_per_type_id": {"0": 2}}],
+        }
+    )
+    converter = job.get_converter()
+    assert converter._data.agent_data.types[0][0] == "fiber"
+    assert np.allclose(converter._data.box_size, [500.0, 500.0, 500.0])
+    assert job.get_filters()[0].n_per_type_id == {0: 2}
+
+
+def test_conversion_job_checks_options():
+    with pytest.raises(ValueError):
+        ConversionJob("unknown", {}, "output")
+    with pytest.raises(ValueError):
+        ConversionJob("simularium", {}, "output", filters=[{"type": "AddAgentsFilter"}])
+    with pytest.raises(ValueError):
+        ConversionJob("simularium", {}, "output", output_options={"stride": 2})
+
+
+def test_conversion_service(tmp_path):
+    async def run_jobs():
+        async with ConversionService(n_workers=1, port=0) as service:
+            streamed = await send_job(
+                get_job(str(tmp_path / "job0")),
+                port=service.port,
+                output_dir=str(tmp_path / "streamed"),
+            )
+            # the worker is reused for the next job
+            second = await send_job(
+                ConversionJob.from_dict(get_job(str(tmp_path / "job1"))),
+                port=service.port,
+            )
+            failed = await send_job(
+                {
+                    "input_type": "simularium",
+                    "input_options": {"input_path": str(tmp_path / "missing.json")},
+                    "output_path": str(tmp_path / "job2"),
+                },
+                port=service.port,
+            )
+        return streamed, second, failed
+
+    streamed, second, failed = asyncio.run(run_jobs())
+    assert streamed["status"] == "done"
+    assert streamed["outputFiles"] == [str(tmp_path / "streamed" / "job0.simularium")]
+    check_output(streamed["outputFiles"][0])
+    with open(streamed["outputFiles"][0], "rb") as streamed_file, open(
+        str(tmp_path / "job0.simularium"), "rb"
+    ) as output_file:
+        assert streamed_file.read() == output_file.read()
+    assert second["status"] == "done"
+    assert [file_info["name"] for file_info in second["outputFiles"]] == [
+        "job1.simularium"
+    ]
+    assert "write" in second["stats"]
+    assert failed["status"] == "error"
+
+
+def test_conversion_service_restarts_workers(tmp_path):
+    async def run_jobs():
+        async with ConversionService(n_workers=1, port=0) as service:
+            # a worker dies, e.g. killed for using too much memory
+            with pytest.raises(BrokenProcessPool):
+                await asyncio.get_running_loop().run_in_executor(
+                    service._executor, os._exit, 1
+                )
+            failed = await send_job(get_job(str(tmp_path / "job0")), port=service.port)
+            restarted = await send_job(
+                get_job(str(tmp_path / "job1")), port=service.port
+            )
+        return failed, restarted
+
+    failed, restarted = asyncio.run(run_jobs())
+    assert failed["status"] == "error"
+    assert restarted["status"] == "done"
+    check_output(str(tmp_path / "job1.simularium"))
+
+
+def test_conversion_job_output_paths(tmp_path):
+    output_path = str(tmp_path / "converted")
+    for name in ["", "_bundle10", "_bundle2", "_bundle_old", "_bundle2b"]:
+        with open(f"{output_path}{name}.simularium", "w") as output_file:
+            output_file.write("{}")
+    job = ConversionJob.from_dict(get_job(output_path))
+    assert job.get_output_paths() == [
+        f"{output_path}.simularium",
+        f"{output_path}_bundle2.simularium",
+        f"{output_path}_bundle10.simularium",
+    ]
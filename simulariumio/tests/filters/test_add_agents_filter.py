@@ -2,8 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import pytest
+import numpy as np
 
-from simulariumio import TrajectoryConverter
+from simulariumio import TrajectoryConverter, AgentData
 from simulariumio.filters import AddAgentsFilter
 from simulariumio.tests.conftest import three_default_agents
 
@@ -272,3 +273,28 @@ def test_add_agents_filter(trajectory, _filter, expected_data):
     filtered_data = converter.filter_data([_filter])
     buffer_data = converter._read_trajectory_data(filtered_data)
     assert expected_data == buffer_data
+
+
+def test_add_agents_filter_packs_frames_and_remaps_ids():
+    trajectory = three_default_agents()
+    trajectory.agent_data.n_agents = np.array([3, 2, 1])
+    new_agent_data = AgentData(
+        times=0.5 * np.array(list(range(3))),
+        n_agents=np.array([1, 2, 2]),
+        viz_types=np.array(3 * [2 * [1000.0]]),
+        unique_ids=np.array([[2.0, 0.0], [2.0, 7.0], [7.0, 2.0]]),
+        types=[["A"], ["A", "B"], ["B", "A"]],
+        positions=np.ones((3, 2, 3)),
+        radii=2.0 * np.ones((3, 2)),
+    )
+    converter = TrajectoryConverter(trajectory)
+    filtered_data = converter.filter_data([AddAgentsFilter(new_agent_data)])
+    agent_data = filtered_data.agent_data
+    assert agent_data.n_agents.tolist() == [4, 4, 3]
+    # raw ID 2 collides with existing IDs, ID 7 doesn't
+    assert agent_data.unique_ids[0, :4].tolist() == [0.0, 1.0, 2.0, 8.0]
+    assert agent_data.unique_ids[1, :4].tolist() == [0.0, 1.0, 8.0, 7.0]
+    assert agent_data.unique_ids[2, :3].tolist() == [0.0, 7.0, 8.0]
+    assert agent_data.types[2] == ["O", "B", "A"]
+    assert agent_data.radii[1, 2:4].tolist() == [2.0, 2.0]
+    assert agent_data.positions[2, 1].tolist() == [1.0, 1.0, 1.0]
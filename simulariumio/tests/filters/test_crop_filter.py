@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+
+from simulariumio import AgentData, TrajectoryData
+from simulariumio.filters import CropFilter
+
+
+def spheres_and_fibers() -> TrajectoryData:
+    # 2 spheres and 2 fibers for 2 frames, one sphere leaves in the 2nd frame
+    return TrajectoryData(
+        box_size=np.array([20.0, 20.0, 20.0]),
+        agent_data=AgentData(
+            times=np.array([0.0, 1.0]),
+            n_agents=np.array([4, 3]),
+            viz_types=np.array(2 * [[1000.0, 1000.0, 1001.0, 1001.0]]),
+            unique_ids=np.array([[0.0, 1.0, 2.0, 3.0], [0.0, 2.0, 3.0, 0.0]]),
+            types=[["A", "B", "F", "F"], ["A", "F", "F"]],
+            positions=np.array(
+                [
+                    [[1.0, 1.0, 1.0], [8.0, 0.0, 0.0], 3 * [0.0], 3 * [0.0]],
+                    [[-1.0, 1.0, 1.0], 3 * [0.0], 3 * [0.0], 3 * [0.0]],
+                ]
+            ),
+            radii=np.ones((2, 4)),
+            n_subpoints=np.array([[0, 0, 2, 3], [0, 2, 3, 0]]),
+            subpoints=np.array(
+                [
+                    [
+                        3 * [3 * [0.0]],
+                        3 * [3 * [0.0]],
+                        # last point is padding, outside the crop box
+                        [[0.0, 0.0, 0.0], [2.0, 2.0, 2.0], [9.0, 9.0, 9.0]],
+                        [[0.0, 0.0, 0.0], [2.0, 2.0, 2.0], [1.0, 1.0, 1.0]],
+                    ],
+                    [
+                        3 * [3 * [0.0]],
+                        [[0.0, 0.0, 0.0], [2.0, 2.0, 2.0], [9.0, 9.0, 9.0]],
+                        # last point is outside the crop box
+                        [[0.0, 0.0, 0.0], [2.0, 2.0, 2.0], [3.0, 3.0, 4.0]],
+                        3 * [3 * [0.0]],
+                    ],
+                ]
+            ),
+        ),
+    )
+
+
+def test_crop_filter():
+    data = CropFilter(
+        min_corner=np.array([-2.0, -3.0, -3.0]), max_corner=np.array([2.5, 3.0, 3.0])
+    ).apply(spheres_and_fibers())
+    assert np.array_equal(data.box_size, [5.0, 6.0, 6.0])
+    agent_data = data.agent_data
+    assert np.array_equal(agent_data.n_agents, [3, 2])
+    assert np.array_equal(agent_data.unique_ids, [[0.0, 2.0, 3.0], [0.0, 2.0, 0.0]])
+    assert agent_data.types == [["A", "F", "F"], ["A", "F"]]
+    assert np.array_equal(agent_data.n_subpoints, [[0, 2, 3], [0, 2, 0]])
+    assert np.array_equal(agent_data.positions[1][0], [-1.0, 1.0, 1.0])
+
+
+def test_crop_filter_one_sided():
+    data = CropFilter(min_corner=np.array([0.0, 0.0, 0.0])).apply(spheres_and_fibers())
+    assert np.array_equal(data.box_size, [20.0, 20.0, 20.0])
+    assert np.array_equal(data.agent_data.n_agents, [4, 2])
+
+
+def test_crop_filter_invalid_box():
+    with pytest.raises(ValueError):
+        CropFilter(np.array([1.0, 0.0, 0.0]), np.array([0.0, 1.0, 1.0]))
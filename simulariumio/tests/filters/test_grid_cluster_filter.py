@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+
+from simulariumio.filters import GridClusterFilter
+from simulariumio.tests.filters.test_crop_filter import spheres_and_fibers
+
+
+def test_grid_cluster_filter():
+    data = spheres_and_fibers()
+    data.agent_data.types[0][1] = "A"
+    data.agent_data.radii[0][0] = 2.0
+    fiber_subpoints = [
+        data.agent_data.subpoints[0][2:],
+        data.agent_data.subpoints[1][1:3],
+    ]
+    agent_data = GridClusterFilter(cell_size=10.0).apply(data).agent_data
+    # both spheres in the 1st frame are in the same cell,
+    # the sphere in the 2nd frame is in a different cell
+    assert np.array_equal(agent_data.n_agents, [3, 3])
+    assert agent_data.types == [["A", "F", "F"], ["A", "F", "F"]]
+    assert np.array_equal(agent_data.viz_types[:, 0], [1000.0, 1000.0])
+    assert np.allclose(agent_data.radii[0][0], np.cbrt(9.0))
+    assert np.allclose(agent_data.positions[0][0], [16.0 / 9.0, 8.0 / 9.0, 8.0 / 9.0])
+    assert np.allclose(agent_data.positions[1][0], [-1.0, 1.0, 1.0])
+    assert agent_data.unique_ids[0][0] != agent_data.unique_ids[1][0]
+    # fibers are not clustered
+    assert np.array_equal(agent_data.unique_ids[:, 1:], [[2.0, 3.0], [2.0, 3.0]])
+    assert np.array_equal(agent_data.n_subpoints[:, 1:], [[2, 3], [2, 3]])
+    assert np.array_equal(agent_data.subpoints[:, 1:], fiber_subpoints)
+
+
+def test_grid_cluster_filter_invalid_cell_size():
+    with pytest.raises(ValueError):
+        GridClusterFilter(cell_size=0.0)
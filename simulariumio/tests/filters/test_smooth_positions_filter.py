@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from simulariumio import AgentData, TrajectoryData
+from simulariumio.filters import SmoothPositionsFilter
+
+
+def test_smooth_positions_filter():
+    # agent 0 moves along x, agent 1 only exists in the middle frames
+    data = TrajectoryData(
+        box_size=np.array([10.0, 10.0, 10.0]),
+        agent_data=AgentData(
+            times=np.arange(4.0),
+            n_agents=np.array([1, 2, 2, 1]),
+            viz_types=np.full((4, 2), 1000.0),
+            unique_ids=np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0], [0.0, 0.0]]),
+            types=[["A"], ["B", "A"], ["A", "B"], ["A"]],
+            positions=np.array(
+                [
+                    [[0.0, 0.0, 0.0], [0.0, 0.0, 0.0]],
+                    [[2.0, 2.0, 2.0], [3.0, 0.0, 0.0]],
+                    [[6.0, 0.0, 0.0], [4.0, 4.0, 4.0]],
+                    [[0.0, 0.0, 0.0], [0.0, 0.0, 0.0]],
+                ]
+            ),
+            radii=np.ones((4, 2)),
+        ),
+        plots=[],
+    )
+    filtered = SmoothPositionsFilter(half_width=1).apply(data)
+    assert np.allclose(
+        filtered.agent_data.positions,
+        [
+            [[1.5, 0.0, 0.0], [0.0, 0.0, 0.0]],
+            [[3.0, 3.0, 3.0], [3.0, 0.0, 0.0]],
+            [[3.0, 0.0, 0.0], [3.0, 3.0, 3.0]],
+            [[3.0, 0.0, 0.0], [0.0, 0.0, 0.0]],
+        ],
+    )
+    # the input data is not changed
+    assert data.agent_data.positions[0, 0, 0] == 0.0
+    with pytest.raises(ValueError):
+        SmoothPositionsFilter(half_width=0)
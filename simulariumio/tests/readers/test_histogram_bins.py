@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+
+from simulariumio import HistogramBins, HistogramPlotData
+from simulariumio.plot_readers import HistogramPlotReader
+
+
+def test_fixed_histogram_bins():
+    # values outside the range and NaN aren't counted, max is in the last bin
+    bins = HistogramBins(bin_width=0.5, min_value=0.0, max_value=2.0)
+    bins.add_values(np.array([0.1, 0.6, 0.7]))
+    bins.add_values(np.array([2.0, -1.0, 3.0, np.nan]))
+    assert np.array_equal(bins.counts, [1, 2, 0, 1])
+    assert np.array_equal(bins.get_edges(), [0.0, 0.5, 1.0, 1.5, 2.0])
+    assert bins.n_outside == 3
+
+
+def test_adaptive_histogram_bins():
+    # bins are added before and after as values arrive
+    bins = HistogramBins(bin_width=1.0)
+    bins.add_values(np.array([2.5, 3.5]))
+    bins.add_values(np.array([-0.5, 5.0, 2.0]))
+    assert np.array_equal(bins.counts, [1, 0, 0, 2, 1, 0, 1])
+    assert np.array_equal(bins.get_edges(), np.arange(-1.0, 7.0))
+    assert bins.n_outside == 0
+
+
+def test_read_histogram_bins():
+    bins = HistogramBins(bin_width=0.5, min_value=1.0, max_value=2.0)
+    bins.add_values(np.array([1.2, 1.7, 1.8]))
+    plot = HistogramPlotReader().read(
+        HistogramPlotData(
+            title="Test Histogram",
+            xaxis_title="angle (degrees)",
+            traces={"binned": bins, "raw": np.array([1.2, 1.7])},
+        )
+    )
+    assert plot["data"] == [
+        {
+            "name": "binned",
+            "type": "histogram",
+            "x": [1.25, 1.75],
+            "y": [1, 2],
+            "histfunc": "sum",
+            "xbins": {"start": 1.0, "end": 2.0, "size": 0.5},
+        },
+        {"name": "raw", "type": "histogram", "x": [1.2, 1.7]},
+    ]
+
+
+def test_histogram_bins_invalid_width():
+    with pytest.raises(ValueError):
+        HistogramBins(bin_width=0.0)
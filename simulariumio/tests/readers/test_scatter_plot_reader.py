@@ -5,6 +5,7 @@ import pytest
 import numpy as np
 
 from simulariumio import TrajectoryConverter, ScatterPlotData, exceptions
+from simulariumio.plot_readers import ScatterPlotReader
 from simulariumio.tests.conftest import three_default_agents, test_scatter_plot
 
 
@@ -120,3 +121,30 @@ def test_add_one_scatter_plot(trajectory, plot_data, expected_data):
     converter.add_plot(plot_data, "scatter")
     buffer_data = converter._read_trajectory_data(converter._data)
     assert expected_data == buffer_data["plotData"]
+
+
+def test_downsample_scatter_plot():
+    # 10 points to 6: the first and last points
+    # and the min and max of 2 buckets of 4 points
+    plot = ScatterPlotReader().read(
+        ScatterPlotData(
+            title="Test Scatterplot 3",
+            xaxis_title="time (ns)",
+            yaxis_title="concentration (uM)",
+            xtrace=np.arange(10.0),
+            ytraces={
+                "agent1": np.array(
+                    [74.0, 40.4, 21.3, 93.7, 24.5, 58.4, 11.2, 27.3, 18.9, 34.5]
+                )
+            },
+            render_mode="lines",
+            max_points=6,
+        )
+    )
+    assert plot["data"][0]["x"] == [0.0, 2.0, 3.0, 5.0, 6.0, 9.0]
+    assert plot["data"][0]["y"] == [74.0, 21.3, 93.7, 58.4, 11.2, 34.5]
+
+
+def test_downsample_scatter_plot_too_few_points():
+    with pytest.raises(ValueError):
+        ScatterPlotData("", "", "", np.arange(10.0), {}, max_points=3)
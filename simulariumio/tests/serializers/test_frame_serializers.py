@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+import numpy as np
+
+from simulariumio import TrajectoryConverter, FileConverter
+from simulariumio.serializers import (
+    FrameSerializer,
+    JsonFrameSerializer,
+    NumpyFrameSerializer,
+    OrjsonFrameSerializer,
+)
+from simulariumio.tests.conftest import three_default_agents
+
+
+def _get_serializers():
+    serializers = [
+        JsonFrameSerializer(),
+        NumpyFrameSerializer(),
+        NumpyFrameSerializer(significant_digits=4),
+    ]
+    try:
+        serializers += [
+            OrjsonFrameSerializer(),
+            OrjsonFrameSerializer(significant_digits=4),
+        ]
+    except ImportError:
+        pass
+    return serializers
+
+
+@pytest.mark.parametrize("serializer", _get_serializers())
+def test_frame_serializer(serializer):
+    # a fiber with 2 subpoints, then a sphere
+    buffer = np.array(
+        [1001.0, 12351.0, 10000.0, 4.89610492, -29.81564851, 1.23456789e-7]
+        + [0.12345678, 0.0, 0.0, 1.23456789, 6.0]
+        + [1.23456789, 2.34567891, 3.45678912, 4.56789123, 5.67891234, 6.78912345]
+        + [1000.0, 12352.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 98765.4321, 0.0]
+    )
+    frame = json.loads(serializer.serialize_frame(3, 0.5, buffer))
+    assert frame["frameNumber"] == 3
+    assert frame["time"] == 0.5
+    digits = getattr(serializer, "significant_digits", None)
+    if digits is None:
+        assert frame["data"] == buffer.tolist()
+    else:
+        # only positions, radii, and subpoints are rounded
+        assert frame["data"] == (
+            [1001.0, 12351.0, 10000.0, 4.896, -29.82, 1.235e-7]
+            + [0.12345678, 0.0, 0.0, 1.235, 6.0]
+            + [1.235, 2.346, 3.457, 4.568, 5.679, 6.789]
+            + [1000.0, 12352.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 98770.0, 0.0]
+        )
+
+
+@pytest.mark.parametrize("serializer", _get_serializers())
+def test_write_with_serializer(tmp_path, serializer):
+    converter = TrajectoryConverter(three_default_agents())
+    expected_data = converter._read_trajectory_data(converter._data)
+    output_path = str(tmp_path / "test")
+    converter.write_JSON(output_path, serializer=serializer)
+    file_converter = FileConverter(f"{output_path}.simularium")
+    buffer_data = file_converter._read_trajectory_data(file_converter._data)
+    if getattr(serializer, "significant_digits", None) is None:
+        assert buffer_data["spatialData"] == expected_data["spatialData"]
+    else:
+        for frame, expected_frame in zip(
+            buffer_data["spatialData"]["bundleData"],
+            expected_data["spatialData"]["bundleData"],
+        ):
+            assert np.allclose(frame["data"], expected_frame["data"], rtol=1e-3)
+
+
+@pytest.mark.parametrize("serializer", _get_serializers())
+def test_large_ids_are_not_rounded(tmp_path, serializer):
+    data = three_default_agents()
+    data.agent_data.unique_ids = 12350.0 + data.agent_data.unique_ids
+    output_path = str(tmp_path / "test")
+    TrajectoryConverter(data).write_JSON(output_path, serializer=serializer)
+    file_converter = FileConverter(f"{output_path}.simularium")
+    assert np.array_equal(
+        file_converter._data.agent_data.unique_ids, data.agent_data.unique_ids
+    )
+
+
+def test_spatial_mask():
+    # spheres, a fiber with 1 subpoint, a sphere, and part of an agent
+    sphere = [1000.0, 0.0, 0.0, 1.0, 2.0, 3.0, 0.0, 0.0, 0.0, 0.5, 0.0]
+    fiber = [1001.0, 1.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5, 3.0, 4.0, 5.0, 6.0]
+    buffer = np.array(2 * sphere + fiber + sphere + sphere[:5])
+    sphere_mask = [False] * 3 + [True] * 3 + [False] * 3 + [True, False]
+    fiber_mask = sphere_mask + [True] * 3
+    assert FrameSerializer._get_spatial_mask(buffer).tolist() == (
+        2 * sphere_mask + fiber_mask + sphere_mask + [False] * 5
+    )
+    assert FrameSerializer._get_spatial_mask(np.zeros(0)).size == 0
+    # a buffer of only spheres
+    assert FrameSerializer._get_spatial_mask(np.array(3 * sphere)).tolist() == (
+        3 * sphere_mask
+    )
+
+
+def test_round_to_significant_digits():
+    assert FrameSerializer._round_to_significant_digits(
+        np.array([123456.0, -0.000123456, 0.0, 1.5]), 3
+    ).tolist() == [123000.0, -0.000123, 0.0, 1.5]
@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import glob
 import json
 import logging
-from typing import Any, Dict, List
+import os
+from typing import Any, Dict, Iterator, List, Tuple
 import math
 import copy
 
@@ -19,10 +21,25 @@ from .data_objects import (
     ScatterPlotData,
     AgentData,
     TrajectoryData,
+    PrecisionData,
 )
-from .filters import Filter
-from .exceptions import UnsupportedPlotTypeError
+from .filters import Filter, CropFilter, GridClusterFilter
+from .serializers import FrameSerializer, JsonFrameSerializer
+from .exceptions import UnsupportedPlotTypeError, ConversionCancelled
 from .constants import V1_SPATIAL_BUFFER_STRUCT, VIZ_TYPE
+from .compression import get_compression_extension, open_output_file
+from .delta_encoding import DeltaEncoding
+from .instrumentation import ConversionStats, _CountingWriter
+from .analysis import (
+    DEFAULT_CHUNK_SIZE,
+    get_chunks,
+    count_agents,
+    get_mean_fiber_lengths,
+    get_radii_of_gyration,
+    get_mean_squared_displacements,
+    get_pairwise_distances,
+    get_binned_pairwise_distances,
+)
 
 ###############################################################################
 
@@ -40,8 +57,9 @@ SUPPORTED_PLOT_READERS = {
 
 class TrajectoryConverter:
     _data: TrajectoryData
+    stats: ConversionStats
 
-    def __init__(self, input_data: TrajectoryData):
+    def __init__(self, input_data: TrajectoryData, stats: ConversionStats = None):
         """
         This object reads custom simulation trajectory outputs
         and plot data and writes them in the JSON format used
@@ -52,17 +70,24 @@ class TrajectoryConverter:
         input_data : TrajectoryData
             An object containing custom simulation trajectory outputs
             and plot data
+        stats : ConversionStats (optional)
+            Measures each stage of the conversion, reports progress,
+            and can cancel the conversion
+            Default: None (a new ConversionStats)
         """
-        self._data = input_data
+        self.stats = stats if stats is not None else ConversionStats()
+        with self.stats.stage("parse") as stage:
+            self._data = input_data
+            stage.count(self._data.agent_data)
+        self.stats.report("parse", stage.n_frames, stage.n_frames)
 
     @staticmethod
-    def _read_trajectory_data(input_data: TrajectoryData) -> Dict[str, Any]:
+    def _get_trajectory_info(
+        input_data: TrajectoryData, precision: PrecisionData = None
+    ) -> Dict[str, Any]:
         """
-        Return an object containing the data shaped for Simularium format
+        Return the trajectoryInfo block shaped for Simularium format
         """
-        print("Reading Custom Data -------------")
-        simularium_data = {}
-        # trajectory info
         totalSteps = input_data.agent_data.times.size
         type_ids, type_name_mapping = AgentData.get_type_ids_and_mapping(
             input_data.agent_data.types, input_data.agent_data.type_ids
@@ -71,18 +96,38 @@ class TrajectoryConverter:
             input_data.agent_data.type_ids = type_ids
         if input_data.agent_data.type_mapping is None:
             input_data.agent_data.type_mapping = type_name_mapping
+        return TrajectoryConverter._format_trajectory_info(
+            input_data,
+            totalSteps,
+            (
+                float(input_data.agent_data.times[1] - input_data.agent_data.times[0])
+                if totalSteps > 1
+                else 0.0
+            ),
+            input_data.agent_data.type_mapping,
+            precision,
+        )
+
+    @staticmethod
+    def _format_trajectory_info(
+        input_data: TrajectoryData,
+        total_steps: int,
+        time_step: float,
+        type_mapping: Dict[str, Any],
+        precision: PrecisionData = None,
+    ) -> Dict[str, Any]:
+        """
+        Return the trajectoryInfo block for the units and box size
+        of the data and the given frame count, timestep, and type mapping
+        """
         traj_info = {
             "version": 2,
             "timeUnits": {
                 "magnitude": input_data.time_units.magnitude,
                 "name": input_data.time_units.name,
             },
-            "timeStepSize": TrajectoryConverter._format_timestep(
-                float(input_data.agent_data.times[1] - input_data.agent_data.times[0])
-                if totalSteps > 1
-                else 0.0
-            ),
-            "totalSteps": totalSteps,
+            "timeStepSize": TrajectoryConverter._format_timestep(time_step),
+            "totalSteps": total_steps,
             "spatialUnits": {
                 "magnitude": input_data.spatial_units.magnitude,
                 "name": input_data.spatial_units.name,
@@ -92,177 +137,302 @@ class TrajectoryConverter:
                 "y": float(input_data.box_size[1]),
                 "z": float(input_data.box_size[2]),
             },
-            "typeMapping": input_data.agent_data.type_mapping,
+            "typeMapping": type_mapping,
         }
-        simularium_data["trajectoryInfo"] = traj_info
-        # spatial data
-        spatialData = {
+        if precision is not None:
+            traj_info["precision"] = precision.to_dict()
+        return traj_info
+
+    @staticmethod
+    def _get_spatial_data_header(bundle_start: int, bundle_size: int) -> Dict[str, Any]:
+        """
+        Return the fields of a spatialData block that precede the bundleData
+        """
+        return {
             "version": 1,
             "msgType": 1,
-            "bundleStart": 0,
-            "bundleSize": totalSteps,
+            "bundleStart": bundle_start,
+            "bundleSize": bundle_size,
         }
-        if input_data.agent_data.subpoints is not None:
-            spatialData[
-                "bundleData"
-            ] = TrajectoryConverter._get_spatial_bundle_data_subpoints(
-                input_data.agent_data
+
+    @staticmethod
+    def _get_frame_buffers(
+        agent_data: AgentData,
+        start_frame: int = 0,
+        end_frame: int = None,
+        fiber_point_uids: Tuple[np.ndarray, np.ndarray] = None,
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Yield the frame index and packed buffer for each frame
+        from start_frame up to (not including) end_frame
+        """
+        if end_frame is None:
+            end_frame = len(agent_data.times)
+        if agent_data.subpoints is None:
+            for t in range(start_frame, end_frame):
+                yield t, TrajectoryConverter._get_frame_buffer_no_subpoints(
+                    agent_data, t
+                )
+            return
+        if fiber_point_uids is None and agent_data.draw_fiber_points:
+            fiber_point_uids = TrajectoryConverter._get_fiber_point_unique_ids(
+                agent_data
             )
-        else:
-            spatialData[
-                "bundleData"
-            ] = TrajectoryConverter._get_spatial_bundle_data_no_subpoints(
-                input_data.agent_data
+        fiber_uids, point_uids = (
+            fiber_point_uids if fiber_point_uids is not None else (None, None)
+        )
+        for t in range(start_frame, end_frame):
+            yield t, TrajectoryConverter._get_frame_buffer_subpoints(
+                agent_data, t, fiber_uids, point_uids
             )
-        simularium_data["spatialData"] = spatialData
-        # plot data
-        simularium_data["plotData"] = {
-            "version": 1,
-            "data": input_data.plots,
-        }
-        return simularium_data
 
     @staticmethod
-    def _get_spatial_bundle_data_subpoints(
+    def _get_spatial_bundle_data(
         agent_data: AgentData,
+        start_frame: int = 0,
+        end_frame: int = None,
+        fiber_point_uids: Tuple[np.ndarray, np.ndarray] = None,
+        stats: ConversionStats = None,
     ) -> List[Dict[str, Any]]:
         """
-        Return the spatialData's bundleData for a simulation
-        of agents with subpoints, packing buffer with jagged data is slower
+        Return the spatialData's bundleData for the frames
+        from start_frame up to (not including) end_frame
         """
+        if stats is None:
+            stats = ConversionStats()
+        if end_frame is None:
+            end_frame = agent_data.times.size
         bundle_data: List[Dict[str, Any]] = []
-        uids = {}
-        used_unique_IDs = list(np.unique(agent_data.unique_ids))
-        for t in range(len(agent_data.times)):
-            # timestep
+        for t, local_buf in stats.timed_iter(
+            "pack",
+            TrajectoryConverter._get_frame_buffers(
+                agent_data, start_frame, end_frame, fiber_point_uids
+            ),
+            agent_data,
+            end_frame - start_frame,
+        ):
             frame_data = {}
             frame_data["frameNumber"] = t
             frame_data["time"] = float(agent_data.times[t])
-            n_agents = int(agent_data.n_agents[t])
-            i = 0
-            buffer_size = (V1_SPATIAL_BUFFER_STRUCT.VALUES_PER_AGENT - 1) * n_agents
-            for n in range(n_agents):
-                s = int(agent_data.n_subpoints[t][n])
-                if s > 0:
-                    buffer_size += 3 * s
-                    if agent_data.draw_fiber_points:
-                        buffer_size += (
-                            V1_SPATIAL_BUFFER_STRUCT.VALUES_PER_AGENT - 1
-                        ) * max(math.ceil(s / 2.0), 1)
-            local_buf = np.zeros(buffer_size)
-            for n in range(n_agents):
-                # add agent
-                local_buf[
-                    i + V1_SPATIAL_BUFFER_STRUCT.VIZ_TYPE_INDEX
-                ] = agent_data.viz_types[t, n]
-                local_buf[
-                    i + V1_SPATIAL_BUFFER_STRUCT.UID_INDEX
-                ] = agent_data.unique_ids[t, n]
-                local_buf[i + V1_SPATIAL_BUFFER_STRUCT.TID_INDEX] = agent_data.type_ids[
-                    t, n
-                ]
-                local_buf[
-                    i
-                    + V1_SPATIAL_BUFFER_STRUCT.POSX_INDEX : i
-                    + V1_SPATIAL_BUFFER_STRUCT.POSX_INDEX
-                    + 3
-                ] = agent_data.positions[t, n]
-                local_buf[i + V1_SPATIAL_BUFFER_STRUCT.R_INDEX] = agent_data.radii[t, n]
-                n_subpoints = int(agent_data.n_subpoints[t][n])
-                if n_subpoints > 0:
-                    # add subpoints to fiber agent
-                    subpoints = [3 * n_subpoints]
-                    for p in range(n_subpoints):
-                        for d in range(3):
-                            subpoints.append(agent_data.subpoints[t][n][p][d])
-                    local_buf[
-                        i
-                        + V1_SPATIAL_BUFFER_STRUCT.NSP_INDEX : i
-                        + V1_SPATIAL_BUFFER_STRUCT.NSP_INDEX
-                        + 1
-                        + 3 * n_subpoints
-                    ] = subpoints
-                    i += (
-                        V1_SPATIAL_BUFFER_STRUCT.VALUES_PER_AGENT - 1
-                    ) + 3 * n_subpoints
-                    # optionally draw spheres at points
-                    if agent_data.draw_fiber_points:
-                        for p in range(n_subpoints):
-                            # every other fiber point
-                            if p % 2 != 0:
-                                continue
-                            # unique instance ID
-                            raw_uid = 100 * (agent_data.unique_ids[t, n] + 1) + p
-                            if raw_uid not in uids:
-                                uid = raw_uid
-                                while uid in used_unique_IDs:
-                                    uid += 100
-                                uids[raw_uid] = uid
-                                used_unique_IDs.append(uid)
-                            # add sphere
-                            local_buf[
-                                i + V1_SPATIAL_BUFFER_STRUCT.VIZ_TYPE_INDEX
-                            ] = VIZ_TYPE.DEFAULT
-                            local_buf[i + V1_SPATIAL_BUFFER_STRUCT.UID_INDEX] = uids[
-                                raw_uid
-                            ]
-                            local_buf[
-                                i + V1_SPATIAL_BUFFER_STRUCT.TID_INDEX
-                            ] = agent_data.type_ids[t, n]
-                            local_buf[
-                                i
-                                + V1_SPATIAL_BUFFER_STRUCT.POSX_INDEX : i
-                                + V1_SPATIAL_BUFFER_STRUCT.POSX_INDEX
-                                + 3
-                            ] = agent_data.subpoints[t][n][p]
-                            local_buf[i + V1_SPATIAL_BUFFER_STRUCT.R_INDEX] = 0.5
-                            i += V1_SPATIAL_BUFFER_STRUCT.VALUES_PER_AGENT - 1
-                else:
-                    i += V1_SPATIAL_BUFFER_STRUCT.VALUES_PER_AGENT - 1
             frame_data["data"] = local_buf.tolist()
             bundle_data.append(frame_data)
         return bundle_data
 
     @staticmethod
-    def _get_spatial_bundle_data_no_subpoints(
+    def _split_static_agents(
         agent_data: AgentData,
-    ) -> List[Dict[str, Any]]:
+    ) -> Tuple[AgentData, AgentData, Tuple[np.ndarray, np.ndarray]]:
         """
-        Return the spatialData's bundleData for a simulation
-        of agents without subpoints, using list slicing for speed
+        Split the agents that are the same in every frame from the others,
+        returns the static agents, the remaining agents, and the unique IDs
+        for fiber point spheres allocated from all the agents
         """
-        bundle_data: List[Dict[str, Any]] = []
-        max_n_agents = int(np.amax(agent_data.n_agents, 0))
-        ix_positions = np.empty((3 * max_n_agents,), dtype=int)
-        buffer_struct = V1_SPATIAL_BUFFER_STRUCT
-        for i in range(max_n_agents):
-            ix_positions[3 * i : 3 * i + 3] = np.arange(
-                i * (buffer_struct.VALUES_PER_AGENT - 1) + buffer_struct.POSX_INDEX,
-                i * (buffer_struct.VALUES_PER_AGENT - 1) + buffer_struct.POSX_INDEX + 3,
+        static_mask = agent_data.get_static_agent_mask()
+        fiber_point_uids = (
+            TrajectoryConverter._get_fiber_point_unique_ids(agent_data)
+            if agent_data.subpoints is not None and agent_data.draw_fiber_points
+            else None
+        )
+        log.info(
+            f"found {len(np.unique(agent_data.unique_ids[static_mask]))} "
+            "static agents"
+        )
+        return (
+            agent_data.get_agent_subset(static_mask),
+            agent_data.get_agent_subset(~static_mask),
+            fiber_point_uids,
+        )
+
+    @staticmethod
+    def _get_static_data(
+        static_agent_data: AgentData,
+        fiber_point_uids: Tuple[np.ndarray, np.ndarray] = None,
+    ) -> List[float]:
+        """
+        Return the spatialData's staticData, a buffer of the agents
+        that are the same in every frame
+        """
+        for t, local_buf in TrajectoryConverter._get_frame_buffers(
+            static_agent_data, 0, 1, fiber_point_uids
+        ):
+            return local_buf.tolist()
+        return []
+
+    @staticmethod
+    def _get_plot_data(input_data: TrajectoryData) -> Dict[str, Any]:
+        """
+        Return the plotData block shaped for Simularium format
+        """
+        return {
+            "version": 1,
+            "data": input_data.plots,
+        }
+
+    @staticmethod
+    def _read_trajectory_data(
+        input_data: TrajectoryData,
+        precision: PrecisionData = None,
+        deduplicate_static_agents: bool = False,
+        stats: ConversionStats = None,
+    ) -> Dict[str, Any]:
+        """
+        Return an object containing the data shaped for Simularium format
+        """
+        log.info("Reading Custom Data")
+        simularium_data = {}
+        # trajectory info
+        simularium_data["trajectoryInfo"] = TrajectoryConverter._get_trajectory_info(
+            input_data, precision
+        )
+        # spatial data
+        agent_data = input_data.agent_data
+        if precision is not None:
+            agent_data = precision.apply(agent_data)
+        spatialData = TrajectoryConverter._get_spatial_data_header(
+            0, agent_data.times.size
+        )
+        fiber_point_uids = None
+        if deduplicate_static_agents:
+            (
+                static_agent_data,
+                agent_data,
+                fiber_point_uids,
+            ) = TrajectoryConverter._split_static_agents(agent_data)
+            spatialData["staticData"] = TrajectoryConverter._get_static_data(
+                static_agent_data, fiber_point_uids
             )
-        frame_buf = np.zeros((buffer_struct.VALUES_PER_AGENT - 1) * max_n_agents)
-        for t in range(len(agent_data.times)):
-            frame_data = {}
-            frame_data["frameNumber"] = t
-            frame_data["time"] = float(agent_data.times[t])
-            n = int(agent_data.n_agents[t])
-            local_buf = frame_buf[: (buffer_struct.VALUES_PER_AGENT - 1) * n]
-            local_buf[
-                buffer_struct.VIZ_TYPE_INDEX :: buffer_struct.VALUES_PER_AGENT - 1
-            ] = agent_data.viz_types[t, :n]
-            local_buf[
-                buffer_struct.UID_INDEX :: buffer_struct.VALUES_PER_AGENT - 1
-            ] = agent_data.unique_ids[t, :n]
-            local_buf[
-                buffer_struct.TID_INDEX :: buffer_struct.VALUES_PER_AGENT - 1
-            ] = agent_data.type_ids[t, :n]
-            local_buf[ix_positions[: 3 * n]] = agent_data.positions[t, :n].flatten()
-            local_buf[
-                buffer_struct.R_INDEX :: buffer_struct.VALUES_PER_AGENT - 1
-            ] = agent_data.radii[t, :n]
-            frame_data["data"] = local_buf.tolist()
-            bundle_data.append(frame_data)
-        return bundle_data
+        spatialData["bundleData"] = TrajectoryConverter._get_spatial_bundle_data(
+            agent_data, fiber_point_uids=fiber_point_uids, stats=stats
+        )
+        simularium_data["spatialData"] = spatialData
+        # plot data
+        simularium_data["plotData"] = TrajectoryConverter._get_plot_data(input_data)
+        return simularium_data
+
+    @staticmethod
+    def _get_fiber_point_unique_ids(
+        agent_data: AgentData,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Allocate a unique ID for each sphere drawn at every other fiber point,
+        returns the sorted unique IDs of the fiber agents and a table
+        of sphere unique IDs with shape [fiber agents, spheres per fiber]
+        """
+        n_agents = agent_data.n_agents.astype(int)
+        valid = (
+            np.arange(agent_data.unique_ids.shape[1])[np.newaxis, :]
+            < n_agents[:, np.newaxis]
+        )
+        used_uids = np.unique(agent_data.unique_ids[valid])
+        is_fiber = valid & (agent_data.n_subpoints[:, : valid.shape[1]] > 0)
+        fiber_uids = np.unique(agent_data.unique_ids[is_fiber])
+        max_subpoints = (
+            int(np.amax(agent_data.n_subpoints[is_fiber])) if fiber_uids.size else 0
+        )
+        n_spheres = int(math.ceil(max_subpoints / 2.0))
+        # sphere for point p of agent with ID uid gets ID 100 * (uid + 1) + p
+        sphere_uids = (
+            100 * (fiber_uids[:, np.newaxis] + 1)
+            + 2 * np.arange(n_spheres)[np.newaxis, :]
+        ).flatten()
+        first_occurrence = np.zeros(sphere_uids.size, dtype=bool)
+        first_occurrence[np.unique(sphere_uids, return_index=True)[1]] = True
+        collisions = np.isin(sphere_uids, used_uids) | ~first_occurrence
+        # only IDs that collide need to be reallocated
+        allocated = set(used_uids.tolist())
+        allocated.update(sphere_uids[~collisions].tolist())
+        for index in np.nonzero(collisions)[0]:
+            uid = sphere_uids[index]
+            while uid in allocated:
+                uid += 100
+            sphere_uids[index] = uid
+            allocated.add(uid)
+        return fiber_uids, sphere_uids.reshape((fiber_uids.size, n_spheres))
+
+    @staticmethod
+    def _get_frame_buffer_subpoints(
+        agent_data: AgentData,
+        t: int,
+        fiber_uids: np.ndarray,
+        fiber_point_uids: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Pack the buffer for one frame of agents with subpoints,
+        optionally followed by spheres at every other fiber point
+        """
+        buffer_struct = V1_SPATIAL_BUFFER_STRUCT
+        values_per_agent = buffer_struct.VALUES_PER_AGENT - 1
+        n = int(agent_data.n_agents[t])
+        n_subpoints = agent_data.n_subpoints[t, :n].astype(int)
+        n_spheres = (
+            (n_subpoints + 1) // 2
+            if agent_data.draw_fiber_points
+            else np.zeros_like(n_subpoints)
+        )
+        agent_sizes = values_per_agent + 3 * n_subpoints + values_per_agent * n_spheres
+        starts = np.zeros(n, dtype=int)
+        starts[1:] = np.cumsum(agent_sizes)[:-1]
+        local_buf = np.zeros(int(np.sum(agent_sizes)))
+        # add agents
+        local_buf[starts + buffer_struct.VIZ_TYPE_INDEX] = agent_data.viz_types[t, :n]
+        local_buf[starts + buffer_struct.UID_INDEX] = agent_data.unique_ids[t, :n]
+        local_buf[starts + buffer_struct.TID_INDEX] = agent_data.type_ids[t, :n]
+        local_buf[
+            starts[:, np.newaxis] + buffer_struct.POSX_INDEX + np.arange(3)
+        ] = agent_data.positions[t, :n]
+        local_buf[starts + buffer_struct.R_INDEX] = agent_data.radii[t, :n]
+        local_buf[starts + buffer_struct.NSP_INDEX] = 3 * n_subpoints
+        # add subpoints to fiber agents
+        max_subpoints = int(np.amax(n_subpoints)) if n > 0 else 0
+        point_indices = np.arange(max_subpoints)[np.newaxis, :]
+        agent_ix, point_ix = np.nonzero(point_indices < n_subpoints[:, np.newaxis])
+        local_buf[
+            (starts[agent_ix] + buffer_struct.SP_INDEX + 3 * point_ix)[:, np.newaxis]
+            + np.arange(3)
+        ] = agent_data.subpoints[t, agent_ix, point_ix]
+        if not agent_data.draw_fiber_points:
+            return local_buf
+        # optionally draw spheres at every other fiber point
+        agent_ix, point_ix = np.nonzero(
+            (point_indices < n_subpoints[:, np.newaxis]) & (point_indices % 2 == 0)
+        )
+        sphere_ix = point_ix // 2
+        sphere_starts = (
+            starts[agent_ix]
+            + values_per_agent
+            + 3 * n_subpoints[agent_ix]
+            + values_per_agent * sphere_ix
+        )
+        local_buf[sphere_starts + buffer_struct.VIZ_TYPE_INDEX] = VIZ_TYPE.DEFAULT
+        local_buf[sphere_starts + buffer_struct.UID_INDEX] = fiber_point_uids[
+            np.searchsorted(fiber_uids, agent_data.unique_ids[t, agent_ix]), sphere_ix
+        ]
+        local_buf[sphere_starts + buffer_struct.TID_INDEX] = agent_data.type_ids[
+            t, agent_ix
+        ]
+        local_buf[
+            sphere_starts[:, np.newaxis] + buffer_struct.POSX_INDEX + np.arange(3)
+        ] = agent_data.subpoints[t, agent_ix, point_ix]
+        local_buf[sphere_starts + buffer_struct.R_INDEX] = 0.5
+        return local_buf
+
+    @staticmethod
+    def _get_frame_buffer_no_subpoints(agent_data: AgentData, t: int) -> np.ndarray:
+        """
+        Pack the buffer for one frame of agents without subpoints,
+        every agent has the same number of values so slices can be used
+        """
+        buffer_struct = V1_SPATIAL_BUFFER_STRUCT
+        n = int(agent_data.n_agents[t])
+        local_buf = np.zeros((n, buffer_struct.VALUES_PER_AGENT - 1))
+        local_buf[:, buffer_struct.VIZ_TYPE_INDEX] = agent_data.viz_types[t, :n]
+        local_buf[:, buffer_struct.UID_INDEX] = agent_data.unique_ids[t, :n]
+        local_buf[:, buffer_struct.TID_INDEX] = agent_data.type_ids[t, :n]
+        local_buf[
+            :, buffer_struct.POSX_INDEX : buffer_struct.POSX_INDEX + 3
+        ] = agent_data.positions[t, :n]
+        local_buf[:, buffer_struct.R_INDEX] = agent_data.radii[t, :n]
+        return local_buf.flatten()
 
     @staticmethod
     def _check_agent_ids_are_unique_per_frame(buffer_data: Dict[str, Any]) -> bool:
@@ -299,6 +469,44 @@ class TrajectoryConverter:
                 get_n_subpoints = True
         return True
 
+    @staticmethod
+    def _get_frame_indices(
+        times: np.ndarray,
+        start_time: float = None,
+        end_time: float = None,
+        stride: int = 1,
+    ) -> np.ndarray:
+        """
+        Get the indices of the frames with times from start_time
+        to end_time (inclusive), keeping every stride-th frame in that range
+        """
+        if stride < 1:
+            raise ValueError(f"stride must be at least 1, got {stride}")
+        times = np.asarray(times, dtype=float)
+        in_range = np.ones(times.size, dtype=bool)
+        # allow for floating point error in times computed from a timestep
+        if start_time is not None:
+            in_range &= (times >= start_time) | np.isclose(
+                times, start_time, rtol=1e-9, atol=0.0
+            )
+        if end_time is not None:
+            in_range &= (times <= end_time) | np.isclose(
+                times, end_time, rtol=1e-9, atol=0.0
+            )
+        return np.nonzero(in_range)[0][::stride]
+
+    @staticmethod
+    def _get_crop_filter(
+        roi_min: np.ndarray = None, roi_max: np.ndarray = None
+    ) -> CropFilter:
+        """
+        Get a filter for the region of interest to read,
+        None if the whole space should be read
+        """
+        if roi_min is None and roi_max is None:
+            return None
+        return CropFilter(roi_min, roi_max)
+
     @staticmethod
     def _format_timestep(number: float) -> float:
         return float("%.4g" % number)
@@ -338,49 +546,566 @@ class TrajectoryConverter:
         plot_reader_class = self._determine_plot_reader(plot_type)
         self._data.plots.append(plot_reader_class().read(data))
 
-    def add_number_of_agents_plot(self):
+    def _add_type_traces_plot(
+        self,
+        title: str,
+        yaxis_title: str,
+        type_names: List[str],
+        values: np.ndarray,
+        counts: np.ndarray,
+        max_points: int = None,
+    ):
         """
-        Add a scatterplot of the number of each type of agent over time
-
-        Parameters
-        ----------
-        agent_data: AgentData
-            The data shaped as an AgentData object
-            Default: None (use the currently loaded data)
-        """
-        n_agents = {}
-        type_mapping = self._data.agent_data.get_type_mapping()
-        for t in range(self._data.agent_data.times.size):
-            for n in range(int(self._data.agent_data.n_agents[t])):
-                type_name = type_mapping[
-                    str(int(self._data.agent_data.type_ids[t][n]))
-                ]["name"]
-                if "#" in type_name:
-                    type_name = type_name.split("#")[0]
-                if type_name not in n_agents:
-                    n_agents[type_name] = np.zeros_like(self._data.agent_data.times)
-                n_agents[type_name][t] += 1
+        Add a scatterplot over time with a trace for each type
+        that has agents in at least one frame,
+        in the order the types first appear,
+        downsampled to max_points if it's given
+        """
+        first_appearance = np.argmax(counts > 0, axis=0)
         self.add_plot(
             ScatterPlotData(
-                title="Number of agents over time",
+                title=title,
                 xaxis_title=f"Time ({self._data.time_units.to_string()})",
-                yaxis_title="Number of agents",
+                yaxis_title=yaxis_title,
                 xtrace=self._data.agent_data.times,
-                ytraces=n_agents,
+                ytraces={
+                    type_names[i]: values[:, i]
+                    for i in np.argsort(first_appearance, kind="stable")
+                    if np.any(counts[:, i] > 0)
+                },
                 render_mode="lines",
+                max_points=max_points,
             )
         )
 
+    def add_number_of_agents_plot(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE, max_points: int = None
+    ):
+        """
+        Add a scatterplot of the number of each type of agent over time,
+        agents of the same type in different states are counted together
+        """
+        type_names, counts = count_agents(self._data.agent_data, chunk_size)
+        self._add_type_traces_plot(
+            "Number of agents over time",
+            "Number of agents",
+            type_names,
+            counts,
+            counts,
+            max_points,
+        )
+
+    def add_fiber_length_plot(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE, max_points: int = None
+    ):
+        """
+        Add a scatterplot of the mean length of each type
+        of agent with subpoints (fibers) over time
+        """
+        type_names, lengths, counts = get_mean_fiber_lengths(
+            self._data.agent_data, chunk_size
+        )
+        self._add_type_traces_plot(
+            "Mean fiber length over time",
+            f"Mean length ({self._data.spatial_units.to_string()})",
+            type_names,
+            lengths,
+            counts,
+            max_points,
+        )
+
+    def add_radius_of_gyration_plot(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE, max_points: int = None
+    ):
+        """
+        Add a scatterplot of the radius of gyration of each type
+        of agent without subpoints over time
+        """
+        type_names, radii, counts = get_radii_of_gyration(
+            self._data.agent_data, chunk_size
+        )
+        self._add_type_traces_plot(
+            "Radius of gyration over time",
+            f"Radius of gyration ({self._data.spatial_units.to_string()})",
+            type_names,
+            radii,
+            counts,
+            max_points,
+        )
+
+    def add_mean_squared_displacement_plot(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE, max_points: int = None
+    ):
+        """
+        Add a scatterplot of the mean squared displacement of each type
+        of agent from its position in the first frame over time,
+        agents are tracked by unique ID
+        """
+        type_names, displacements, counts = get_mean_squared_displacements(
+            self._data.agent_data, chunk_size
+        )
+        self._add_type_traces_plot(
+            "Mean squared displacement over time",
+            f"Mean squared displacement ({self._data.spatial_units.to_string()}^2)",
+            type_names,
+            displacements,
+            counts,
+            max_points,
+        )
+
+    def add_pairwise_distance_plot(
+        self,
+        time_index: int = -1,
+        max_distance: float = None,
+        bin_width: float = None,
+    ):
+        """
+        Add a histogram of the distances between each pair of agents
+        of the same type without subpoints at one frame,
+        optionally only up to a max distance.
+        If bin_width is given, the distances are counted in bins
+        as they're calculated and only the bins are written,
+        and time_index can be None to include every frame
+        """
+        agent_data = self._data.agent_data
+        if bin_width is None:
+            if time_index is None:
+                raise ValueError(
+                    "a bin width is required for pairwise distances "
+                    "over every frame"
+                )
+            traces = get_pairwise_distances(agent_data, time_index, max_distance)
+        else:
+            traces = get_binned_pairwise_distances(
+                agent_data,
+                bin_width,
+                [time_index] if time_index is not None else None,
+                max_distance,
+            )
+        title = (
+            f"Pairwise distances at time {agent_data.times[time_index]}"
+            if time_index is not None
+            else "Pairwise distances"
+        )
+        self.add_plot(
+            HistogramPlotData(
+                title=title,
+                xaxis_title=f"Distance ({self._data.spatial_units.to_string()})",
+                traces=traces,
+            ),
+            "histogram",
+        )
+
     def filter_data(self, filters: List[Filter]) -> TrajectoryData:
         """
         Return the simularium data with the given filter applied
         """
-        filtered_data = copy.deepcopy(self._data)
-        for f in filters:
-            filtered_data = f.apply(filtered_data)
+        with self.stats.stage("filter") as stage:
+            filtered_data = copy.deepcopy(self._data)
+            for f in filters:
+                filtered_data = f.apply(filtered_data)
+                n_frames = filtered_data.agent_data.times.size
+                self.stats.report("filter", n_frames, n_frames)
+            stage.count(filtered_data.agent_data)
         return filtered_data
 
-    def write_JSON(self, output_path: str):
+    @staticmethod
+    def _get_frame_chunks(
+        data: TrajectoryData, chunk_size: int
+    ) -> Iterator[TrajectoryData]:
+        """
+        Yield copies of the data for each chunk of frames,
+        only the first chunk has the plots
+        """
+        for index, (start, end) in enumerate(
+            get_chunks(data.agent_data.times.size, chunk_size)
+        ):
+            yield TrajectoryData(
+                box_size=np.copy(data.box_size),
+                agent_data=data.agent_data.get_frames(start, end),
+                time_units=copy.copy(data.time_units),
+                spatial_units=copy.copy(data.spatial_units),
+                plots=copy.deepcopy(data.plots) if index == 0 else [],
+            )
+
+    def iter_frames(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[TrajectoryData]:
+        """
+        Yield the simularium data in chunks of frames, e.g. to filter
+        and write them one chunk at a time with pipeline.filter_frames
+        and pipeline.write_frames_JSON. Each chunk is a copy that can be
+        changed, and only the first chunk has the plots
+        """
+        return self.stats.timed_iter(
+            "parse", self._get_frame_chunks(self._data, chunk_size), chunks=True
+        )
+
+    @staticmethod
+    def _serialize_frames(
+        agent_data: AgentData,
+        start_frame: int,
+        end_frame: int,
+        fiber_point_uids: Tuple[np.ndarray, np.ndarray],
+        serializer: FrameSerializer,
+        delta_encoding: DeltaEncoding = None,
+        stats: ConversionStats = None,
+    ) -> str:
+        """
+        Pack the frames in the range and serialize them
+        as comma-separated JSON objects, if delta_encoding is given
+        the first frame in the range is a keyframe
+        """
+        if stats is None:
+            stats = ConversionStats()
+        frame_buffers = stats.timed_iter(
+            "pack",
+            TrajectoryConverter._get_frame_buffers(
+                agent_data, start_frame, end_frame, fiber_point_uids
+            ),
+            agent_data,
+            end_frame - start_frame,
+        )
+        with stats.stage("serialize") as stage:
+            if delta_encoding is None:
+                result = serializer.serialize_frames(
+                    (t, float(agent_data.times[t]), local_buf)
+                    for t, local_buf in frame_buffers
+                )
+            else:
+                result = ", ".join(
+                    serializer.serialize_frame(t, float(agent_data.times[t]), local_buf)
+                    if delta is None
+                    else serializer.serialize_delta_frame(
+                        t, float(agent_data.times[t]), delta
+                    )
+                    for t, local_buf, delta in delta_encoding.encode_frames(
+                        frame_buffers
+                    )
+                )
+            stage.count(agent_data, end_frame - start_frame)
+        return result
+
+    @staticmethod
+    def _get_serialized_bundles(
+        agent_data: AgentData,
+        frame_ranges: List[Tuple[int, int]],
+        n_processes: int = None,
+        serializer: FrameSerializer = None,
+        delta_encoding: DeltaEncoding = None,
+        fiber_point_uids: Tuple[np.ndarray, np.ndarray] = None,
+        stats: ConversionStats = None,
+    ) -> Iterator[str]:
+        """
+        Pack and serialize the spatial data for each range of frames,
+        optionally in parallel, yield them in order.
+        Frames packed in parallel are measured in the worker processes
+        and added to the stats, the caller's stage includes waiting for them
+        """
+        if serializer is None:
+            serializer = JsonFrameSerializer()
+        if (
+            fiber_point_uids is None
+            and agent_data.subpoints is not None
+            and agent_data.draw_fiber_points
+        ):
+            fiber_point_uids = TrajectoryConverter._get_fiber_point_unique_ids(
+                agent_data
+            )
+        if n_processes is not None and n_processes > 1 and len(frame_ranges) > 1:
+            from .parallel_packing import pack_frames_in_parallel
+
+            yield from pack_frames_in_parallel(
+                agent_data,
+                frame_ranges,
+                n_processes,
+                serializer,
+                fiber_point_uids,
+                delta_encoding,
+                stats,
+            )
+            return
+        for start, end in frame_ranges:
+            yield TrajectoryConverter._serialize_frames(
+                agent_data,
+                start,
+                end,
+                fiber_point_uids,
+                serializer,
+                delta_encoding,
+                stats,
+            )
+
+    @staticmethod
+    def _write_bundled_JSON(
+        input_data: TrajectoryData,
+        output_path: str,
+        bundle_size: int,
+        separate_files: bool = False,
+        n_processes: int = None,
+        serializer: FrameSerializer = None,
+        precision: PrecisionData = None,
+        compression: str = None,
+        delta_encoding: DeltaEncoding = None,
+        deduplicate_static_agents: bool = False,
+        extra_trajectory_info: Dict[str, Any] = None,
+        stats: ConversionStats = None,
+    ):
+        """
+        Save the data in .simularium JSON format, packing and writing
+        the spatial data in bundles of frames so that each bundle
+        is flushed to disk before the next one is packed.
+        If separate_files is True, each bundle is saved as its own
+        spatialData file and the .simularium file is a manifest
+        listing the bundle files.
+        If delta_encoding is given, each bundle starts with a keyframe
+        so bundles can be packed and loaded independently
+        """
+        if bundle_size < 1:
+            raise ValueError(f"bundle size must be at least 1, got {bundle_size}")
+        if stats is None:
+            stats = ConversionStats()
+        traj_info = TrajectoryConverter._get_trajectory_info(input_data, precision)
+        if delta_encoding is not None:
+            traj_info["spatialEncoding"] = delta_encoding.to_dict()
+        if extra_trajectory_info is not None:
+            traj_info.update(extra_trajectory_info)
+        agent_data = input_data.agent_data
+        if precision is not None:
+            agent_data = precision.apply(agent_data)
+        total_steps = agent_data.times.size
+        plot_data = TrajectoryConverter._get_plot_data(input_data)
+        frame_ranges = [
+            (start, min(start + bundle_size, total_steps))
+            for start in range(0, total_steps, bundle_size)
+        ]
+        spatial_data = TrajectoryConverter._get_spatial_data_header(0, total_steps)
+        fiber_point_uids = None
+        if deduplicate_static_agents:
+            (
+                static_agent_data,
+                agent_data,
+                fiber_point_uids,
+            ) = TrajectoryConverter._split_static_agents(agent_data)
+            spatial_data["staticData"] = TrajectoryConverter._get_static_data(
+                static_agent_data, fiber_point_uids
+            )
+        bundles = TrajectoryConverter._get_serialized_bundles(
+            agent_data,
+            frame_ranges,
+            n_processes,
+            serializer,
+            delta_encoding,
+            fiber_point_uids,
+            stats,
+        )
+        extension = get_compression_extension(compression)
+        if separate_files:
+            # write the manifest first so clients can find the bundles
+            bundle_paths = [
+                f"{output_path}_bundle{index}.simularium{extension}"
+                for index in range(len(frame_ranges))
+            ]
+            spatial_data["bundleFiles"] = [
+                {
+                    "bundleStart": start,
+                    "bundleSize": end - start,
+                    "file": os.path.basename(bundle_path),
+                }
+                for (start, end), bundle_path in zip(frame_ranges, bundle_paths)
+            ]
+            with open_output_file(
+                f"{output_path}.simularium{extension}", compression
+            ) as output_file:
+                outfile = _CountingWriter(output_file)
+                json.dump(
+                    {
+                        "trajectoryInfo": traj_info,
+                        "spatialData": spatial_data,
+                        "plotData": plot_data,
+                    },
+                    outfile,
+                )
+            stats.report("write", 0, total_steps, outfile.take_count())
+            for (start, end), bundle_path, bundle in zip(
+                frame_ranges, bundle_paths, bundles
+            ):
+                header = TrajectoryConverter._get_spatial_data_header(
+                    start, end - start
+                )
+                with open_output_file(bundle_path, compression) as bundle_file:
+                    outfile = _CountingWriter(bundle_file)
+                    outfile.write(json.dumps(header)[:-1] + ', "bundleData": [')
+                    outfile.write(bundle)
+                    outfile.write("]}")
+                stats.report("write", end, total_steps, outfile.take_count())
+            return
+        with open_output_file(
+            f"{output_path}.simularium{extension}", compression
+        ) as output_file:
+            outfile = _CountingWriter(output_file)
+            outfile.write('{"trajectoryInfo": ')
+            json.dump(traj_info, outfile)
+            outfile.write(', "spatialData": ')
+            # leave the bundleData list open to append each bundle
+            outfile.write(json.dumps(spatial_data)[:-1] + ', "bundleData": [')
+            for index, bundle in enumerate(bundles):
+                if index > 0:
+                    outfile.write(", ")
+                outfile.write(bundle)
+                outfile.flush()
+                stats.report(
+                    "write", frame_ranges[index][1], total_steps, outfile.take_count()
+                )
+            outfile.write(']}, "plotData": ')
+            json.dump(plot_data, outfile)
+            outfile.write("}")
+        stats.report("write", total_steps, total_steps, outfile.take_count())
+
+    @staticmethod
+    def _write_JSON_files(
+        input_data: TrajectoryData,
+        output_path: str,
+        bundle_size: int,
+        separate_files: bool,
+        n_processes: int,
+        serializer: FrameSerializer,
+        precision: PrecisionData,
+        compression: str,
+        delta_encoding: DeltaEncoding,
+        deduplicate_static_agents: bool,
+        extra_trajectory_info: Dict[str, Any],
+        stats: ConversionStats,
+    ):
+        """
+        Save the data in .simularium JSON format at the output path,
+        bundling the frames if bundle_size is given or needed
+        to pack in parallel or use a serializer or delta encoding
+        """
+        if bundle_size is None and n_processes is not None and n_processes > 1:
+            # split the frames into a few ranges per process to balance load
+            total_steps = input_data.agent_data.times.size
+            bundle_size = max(1, int(math.ceil(total_steps / (4.0 * n_processes))))
+        if bundle_size is None and (
+            serializer is not None or delta_encoding is not None
+        ):
+            # serialize all the frames as one bundle
+            bundle_size = max(1, input_data.agent_data.times.size)
+        if bundle_size is not None:
+            TrajectoryConverter._write_bundled_JSON(
+                input_data,
+                output_path,
+                bundle_size,
+                separate_files,
+                n_processes,
+                serializer,
+                precision,
+                compression,
+                delta_encoding,
+                deduplicate_static_agents,
+                extra_trajectory_info,
+                stats,
+            )
+            return
+        buffer_data = TrajectoryConverter._read_trajectory_data(
+            input_data, precision, deduplicate_static_agents, stats
+        )
+        if extra_trajectory_info is not None:
+            buffer_data["trajectoryInfo"].update(extra_trajectory_info)
+        extension = get_compression_extension(compression)
+        with open_output_file(
+            f"{output_path}.simularium{extension}", compression
+        ) as output_file, stats.stage("serialize") as serialize_stage:
+            outfile = _CountingWriter(output_file)
+            json.dump(buffer_data, outfile)
+            serialize_stage.count(input_data.agent_data)
+        total_steps = input_data.agent_data.times.size
+        stats.report("write", total_steps, total_steps, outfile.take_count())
+
+    @staticmethod
+    def _get_bundle_paths(output_path: str, extension: str) -> List[str]:
+        """
+        Get the paths of the bundle files written at the output path,
+        in order, leaving out other files with similar names,
+        e.g. {output_path}_bundle_old.simularium
+        """
+        prefix = f"{output_path}_bundle"
+        suffix = f".simularium{extension}"
+        bundle_paths = {}
+        for path in glob.glob(f"{glob.escape(prefix)}[0-9]*{glob.escape(suffix)}"):
+            index = path[len(prefix) : len(path) - len(suffix)]
+            if index.isdigit():
+                bundle_paths[int(index)] = path
+        return [bundle_paths[index] for index in sorted(bundle_paths)]
+
+    @staticmethod
+    def _remove_output_files(output_path: str, extension: str):
+        """
+        Remove the partly written .simularium file and bundle files
+        of a cancelled conversion
+        """
+        main_path = f"{output_path}.simularium{extension}"
+        bundle_paths = TrajectoryConverter._get_bundle_paths(output_path, extension)
+        for path in [main_path] + bundle_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def _write_JSON(
+        input_data: TrajectoryData,
+        output_path: str,
+        bundle_size: int = None,
+        separate_files: bool = False,
+        n_processes: int = None,
+        serializer: FrameSerializer = None,
+        precision: PrecisionData = None,
+        compression: str = None,
+        delta_encoding: DeltaEncoding = None,
+        deduplicate_static_agents: bool = False,
+        extra_trajectory_info: Dict[str, Any] = None,
+        stats: ConversionStats = None,
+    ):
+        """
+        Save the data in .simularium JSON format at the output path,
+        adding any extra_trajectory_info to the trajectoryInfo
+        """
+        if stats is None:
+            stats = ConversionStats()
+        extension = get_compression_extension(compression)
+        try:
+            with stats.stage("write") as stage:
+                TrajectoryConverter._write_JSON_files(
+                    input_data,
+                    output_path,
+                    bundle_size,
+                    separate_files,
+                    n_processes,
+                    serializer,
+                    precision,
+                    compression,
+                    delta_encoding,
+                    deduplicate_static_agents,
+                    extra_trajectory_info,
+                    stats,
+                )
+                stage.count(input_data.agent_data)
+        except ConversionCancelled:
+            TrajectoryConverter._remove_output_files(output_path, extension)
+            raise
+        log.info(f"saved to {output_path}.simularium{extension}")
+
+    def write_JSON(
+        self,
+        output_path: str,
+        bundle_size: int = None,
+        separate_files: bool = False,
+        n_processes: int = None,
+        serializer: FrameSerializer = None,
+        precision: PrecisionData = None,
+        compression: str = None,
+        delta_encoding: DeltaEncoding = None,
+        deduplicate_static_agents: bool = False,
+    ):
         """
         Save the current simularium data in .simularium JSON format
         at the output path
@@ -389,15 +1114,80 @@ class TrajectoryConverter:
         ----------
         output_path: str
             where to save the file
+        bundle_size: int (optional)
+            pack and write the spatial data in bundles of this many frames,
+            so each bundle is flushed before the next is packed
+            Default: None (pack all frames before writing)
+        separate_files: bool (optional)
+            if bundle_size is given, write each bundle to its own file
+            "[output_path]_bundle[index].simularium" and write a manifest
+            listing the bundle files to "[output_path].simularium"
+            Default: False
+        n_processes: int (optional)
+            pack the frames in parallel with this many processes,
+            which read the agent data from shared memory
+            (frames are split into bundles if bundle_size isn't given)
+            Default: None (pack in this process)
+        serializer: FrameSerializer (optional)
+            the backend used to write the frame buffers as JSON,
+            e.g. NumpyFrameSerializer or OrjsonFrameSerializer
+            with a number of significant digits to shrink the output
+            Default: None (JsonFrameSerializer with full precision)
+        precision: PrecisionData (optional)
+            round positions, radii, and subpoints to a number
+            of decimal places before serializing, the precision
+            is recorded in the trajectoryInfo
+            Default: None (full precision)
+        compression: str (optional)
+            compress the output in a background thread while frames
+            are packed, and add the codec's extension to the file name.
+            Options: "gzip" (.gz), "zstd" (.zst), "lz4" (.lz4)
+            (zstd and lz4 require the compression extra)
+            Default: None (uncompressed)
+        delta_encoding: DeltaEncoding (optional)
+            write periodic keyframes and, in between, only the quantized
+            changes in agent positions and subpoints since the previous
+            frame, the encoding is recorded in the trajectoryInfo
+            and decoded by FileConverter
+            (the Simularium Viewer can't read delta encoded files)
+            Default: None (write every agent in every frame)
+        deduplicate_static_agents: bool (optional)
+            write agents whose position, radius, and type are the same
+            in every frame once, in the spatialData's staticData,
+            instead of in every frame's data. FileConverter adds them
+            back to the end of each frame
+            (the Simularium Viewer can't read static data)
+            Default: False
         """
-        print("Writing JSON -------------")
-        buffer_data = TrajectoryConverter._read_trajectory_data(self._data)
-        with open(f"{output_path}.simularium", "w+") as outfile:
-            json.dump(buffer_data, outfile)
-        print(f"saved to {output_path}.simularium")
+        log.info("Writing JSON")
+        TrajectoryConverter._write_JSON(
+            self._data,
+            output_path,
+            bundle_size,
+            separate_files,
+            n_processes,
+            serializer,
+            precision,
+            compression,
+            delta_encoding,
+            deduplicate_static_agents,
+            stats=self.stats,
+        )
 
     @staticmethod
-    def write_external_JSON(external_data: TrajectoryData, output_path: str):
+    def write_external_JSON(
+        external_data: TrajectoryData,
+        output_path: str,
+        bundle_size: int = None,
+        separate_files: bool = False,
+        n_processes: int = None,
+        serializer: FrameSerializer = None,
+        precision: PrecisionData = None,
+        compression: str = None,
+        delta_encoding: DeltaEncoding = None,
+        deduplicate_static_agents: bool = False,
+        stats: ConversionStats = None,
+    ):
         """
         Save the given data in .simularium JSON format
         at the output path
@@ -408,9 +1198,151 @@ class TrajectoryConverter:
             the data to save
         output_path: str
             where to save the file
+        bundle_size: int (optional)
+            pack and write the spatial data in bundles of this many frames,
+            so each bundle is flushed before the next is packed
+            Default: None (pack all frames before writing)
+        separate_files: bool (optional)
+            if bundle_size is given, write each bundle to its own file
+            "[output_path]_bundle[index].simularium" and write a manifest
+            listing the bundle files to "[output_path].simularium"
+            Default: False
+        n_processes: int (optional)
+            pack the frames in parallel with this many processes,
+            which read the agent data from shared memory
+            (frames are split into bundles if bundle_size isn't given)
+            Default: None (pack in this process)
+        serializer: FrameSerializer (optional)
+            the backend used to write the frame buffers as JSON,
+            e.g. NumpyFrameSerializer or OrjsonFrameSerializer
+            with a number of significant digits to shrink the output
+            Default: None (JsonFrameSerializer with full precision)
+        precision: PrecisionData (optional)
+            round positions, radii, and subpoints to a number
+            of decimal places before serializing, the precision
+            is recorded in the trajectoryInfo
+            Default: None (full precision)
+        compression: str (optional)
+            compress the output in a background thread while frames
+            are packed, and add the codec's extension to the file name.
+            Options: "gzip" (.gz), "zstd" (.zst), "lz4" (.lz4)
+            (zstd and lz4 require the compression extra)
+            Default: None (uncompressed)
+        delta_encoding: DeltaEncoding (optional)
+            write periodic keyframes and, in between, only the quantized
+            changes in agent positions and subpoints since the previous
+            frame, the encoding is recorded in the trajectoryInfo
+            and decoded by FileConverter
+            (the Simularium Viewer can't read delta encoded files)
+            Default: None (write every agent in every frame)
+        deduplicate_static_agents: bool (optional)
+            write agents whose position, radius, and type are the same
+            in every frame once, in the spatialData's staticData,
+            instead of in every frame's data. FileConverter adds them
+            back to the end of each frame
+            (the Simularium Viewer can't read static data)
+            Default: False
+        stats: ConversionStats (optional)
+            measure the time and memory of each stage of writing
+            Default: None (not measured)
         """
-        print("Writing JSON (external)-------------")
-        buffer_data = TrajectoryConverter._read_trajectory_data(external_data)
-        with open(f"{output_path}.simularium", "w+") as outfile:
-            json.dump(buffer_data, outfile)
-        print(f"saved to {output_path}.simularium")
+        log.info("Writing JSON (external)")
+        TrajectoryConverter._write_JSON(
+            external_data,
+            output_path,
+            bundle_size,
+            separate_files,
+            n_processes,
+            serializer,
+            precision,
+            compression,
+            delta_encoding,
+            deduplicate_static_agents,
+            stats=stats,
+        )
+
+    def write_LOD_JSON(
+        self,
+        output_path: str,
+        cell_sizes: List[float],
+        bundle_size: int = None,
+        n_processes: int = None,
+        serializer: FrameSerializer = None,
+        precision: PrecisionData = None,
+        compression: str = None,
+    ):
+        """
+        Save the current simularium data in .simularium JSON format
+        at the output path, and coarser levels of detail where agents
+        of the same type are clustered on a grid (see GridClusterFilter)
+        to "[output_path]_lod[level].simularium", so a client can load
+        a coarse level first. Every file lists all the levels
+        in its trajectoryInfo
+
+        Parameters
+        ----------
+        output_path: str
+            where to save the full detail file
+        cell_sizes: List[float]
+            the grid cell size for each coarser level of detail,
+            levels are numbered from 1 (smallest cell size)
+            up to the number of cell sizes (largest cell size)
+        bundle_size: int (optional)
+            pack and write the spatial data in bundles of this many frames
+            Default: None (pack all frames before writing)
+        n_processes: int (optional)
+            pack the frames in parallel with this many processes
+            Default: None (pack in this process)
+        serializer: FrameSerializer (optional)
+            the backend used to write the frame buffers as JSON
+            Default: None (JsonFrameSerializer with full precision)
+        precision: PrecisionData (optional)
+            round positions, radii, and subpoints to a number
+            of decimal places before serializing
+            Default: None (full precision)
+        compression: str (optional)
+            compress the output files, see write_JSON
+            Default: None (uncompressed)
+        """
+        log.info("Writing level of detail JSON")
+        extension = get_compression_extension(compression)
+        cell_sizes = sorted(cell_sizes)
+        output_paths = [output_path] + [
+            f"{output_path}_lod{level}" for level in range(1, len(cell_sizes) + 1)
+        ]
+        levels = [
+            {
+                "level": level,
+                "cellSize": cell_sizes[level - 1] if level > 0 else 0.0,
+                "file": f"{os.path.basename(path)}.simularium{extension}",
+            }
+            for level, path in enumerate(output_paths)
+        ]
+        for level, path in enumerate(output_paths):
+            level_data = self._data
+            if level > 0:
+                with self.stats.stage("filter") as stage:
+                    level_data = TrajectoryData(
+                        box_size=self._data.box_size,
+                        agent_data=GridClusterFilter(
+                            cell_sizes[level - 1]
+                        ).cluster_agent_data(self._data.agent_data),
+                        time_units=self._data.time_units,
+                        spatial_units=self._data.spatial_units,
+                        plots=self._data.plots,
+                    )
+                    stage.count(level_data.agent_data)
+            TrajectoryConverter._write_JSON(
+                level_data,
+                path,
+                bundle_size,
+                n_processes=n_processes,
+                serializer=serializer,
+                precision=precision,
+                compression=compression,
+                extra_trajectory_info={
+                    "levelOfDetail": level,
+                    "levelsOfDetail": levels,
+                },
+                stats=self.stats,
+            )